@@ -0,0 +1,270 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+import pandas as pd
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from schema_manager import SchemaManager
+from chatbot import DBChatbot
+from deadline import CancelToken
+from llm_factory import LLMFactory
+
+class Session:
+    """One client conversation: its own chatbot context on top of shared schema resources"""
+
+    def __init__(self, session_id: str, schema_name: str, chatbot: DBChatbot):
+        self.session_id = session_id
+        self.schema_name = schema_name
+        self.chatbot = chatbot
+        self.last_used = time.monotonic()
+        self.result_handle = None
+        # Questions within a session run one at a time so the context stays ordered
+        self.lock = asyncio.Lock()
+
+    def set_result_handle(self, result_handle):
+        """Keep only the latest open cursor per session"""
+        if self.result_handle is not None and self.result_handle is not result_handle:
+            self.result_handle.close()
+        self.result_handle = result_handle
+
+    def close(self):
+        self.set_result_handle(None)
+
+
+class ChatService:
+    """Process-wide state: one embedding model, one LLM client and one SchemaManager (engine pool) per schema"""
+
+    def __init__(self, db_url: str, llm_provider: str = "gemini", session_ttl_seconds: float = 1800):
+        self.db_url = db_url
+        self.llm_provider = llm_provider
+        self.session_ttl_seconds = session_ttl_seconds
+        self.base_schema_manager = SchemaManager(db_url)
+        self.llm = LLMFactory.create_llm(llm_provider)
+        self.schema_managers: Dict[str, SchemaManager] = {}
+        self.sessions: Dict[str, Session] = {}
+        self._lock = threading.Lock()
+
+    def available_schemas(self):
+        return self.base_schema_manager.get_available_schemas()
+
+    def schema_manager(self, schema_name: str) -> SchemaManager:
+        """Create each schema's manager once and share it across sessions"""
+        with self._lock:
+            if schema_name not in self.schema_managers:
+                self.schema_managers[schema_name] = SchemaManager(
+                    db_url=self.db_url,
+                    schema_name=schema_name,
+                    model=self.base_schema_manager.model
+                )
+            return self.schema_managers[schema_name]
+
+    def create_session(self, schema_name: str) -> Session:
+        if schema_name not in self.available_schemas():
+            raise KeyError(f"Unknown schema: {schema_name}")
+        chatbot = DBChatbot(self.schema_manager(schema_name), self.llm_provider, llm=self.llm)
+        session = Session(uuid.uuid4().hex, schema_name, chatbot)
+        with self._lock:
+            self.sessions[session.session_id] = session
+        return session
+
+    def get_session(self, session_id: str) -> Session:
+        self.expire_sessions()
+        with self._lock:
+            session = self.sessions.get(session_id)
+        if session is None:
+            raise KeyError(f"Unknown or expired session: {session_id}")
+        session.last_used = time.monotonic()
+        return session
+
+    def close_session(self, session_id: str):
+        with self._lock:
+            session = self.sessions.pop(session_id, None)
+        if session is None:
+            raise KeyError(f"Unknown or expired session: {session_id}")
+        session.close()
+
+    def expire_sessions(self):
+        """Drop sessions idle for longer than the TTL and release their cursors"""
+        cutoff = time.monotonic() - self.session_ttl_seconds
+        with self._lock:
+            expired = [s for s in self.sessions.values() if s.last_used < cutoff and not s.lock.locked()]
+            for session in expired:
+                del self.sessions[session.session_id]
+        for session in expired:
+            session.close()
+
+
+class SessionRequest(BaseModel):
+    schema_name: str
+
+
+class QueryRequest(BaseModel):
+    question: str
+    deadline_seconds: Optional[float] = None
+
+
+def dataframe_records(df: pd.DataFrame):
+    """JSON-safe rows; pandas handles Arrow, datetime and missing values"""
+    if df is None:
+        return None
+    return json.loads(df.to_json(orient="records", date_format="iso"))
+
+
+def to_response(result: Dict) -> Dict:
+    """Replace the DataFrame and cursor in a query result with JSON-safe fields"""
+    response = {key: value for key, value in result.items() if key not in ("data", "result_handle")}
+    data = result.get("data")
+    if data is not None:
+        response["columns"] = [str(col) for col in data.columns]
+        response["data"] = dataframe_records(data)
+        response["row_count"] = len(data)
+    return response
+
+
+def sse_event(event: str, payload) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+
+service: Optional[ChatService] = None
+app = FastAPI(title="Database chatbot API")
+
+
+def get_service() -> ChatService:
+    global service
+    if service is None:
+        load_dotenv()
+        service = ChatService(
+            db_url=os.getenv("DATABASE_CONNECTION_URL") or os.getenv("DATABASE_URL"),
+            llm_provider=os.getenv("API_LLM_PROVIDER", "gemini"),
+            session_ttl_seconds=float(os.getenv("API_SESSION_TTL_SECONDS", "1800"))
+        )
+    return service
+
+
+def lookup_session(session_id: str) -> Session:
+    try:
+        return get_service().get_session(session_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.on_event("startup")
+def startup():
+    # Load the embedding model and LLM client before the first request
+    get_service()
+
+
+@app.get("/health")
+def health():
+    sessions = list(get_service().sessions.values())
+    return {
+        "status": "ok",
+        "sessions": len(sessions),
+        # Questions answered without the LLM vs. through it, over the live sessions
+        "fast_path": sum(session.chatbot.fast_path_stats["fast_path"] for session in sessions),
+        "llm": sum(session.chatbot.fast_path_stats["llm"] for session in sessions)
+    }
+
+
+@app.get("/schemas")
+def schemas():
+    return {"schemas": get_service().available_schemas()}
+
+
+@app.post("/sessions")
+async def create_session(request: SessionRequest):
+    try:
+        # Building a schema's manager may embed its schema, so keep it off the event loop
+        session = await asyncio.to_thread(get_service().create_session, request.schema_name)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"session_id": session.session_id, "schema_name": session.schema_name}
+
+
+@app.delete("/sessions/{session_id}")
+def delete_session(session_id: str):
+    try:
+        get_service().close_session(session_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"closed": session_id}
+
+
+@app.post("/sessions/{session_id}/query")
+async def query(session_id: str, request: QueryRequest):
+    session = lookup_session(session_id)
+    async with session.lock:
+        result = await session.chatbot.aquery(request.question, deadline=request.deadline_seconds)
+        session.set_result_handle(result.get("result_handle"))
+    return to_response(result)
+
+
+@app.post("/sessions/{session_id}/query/stream")
+async def query_stream(session_id: str, request: QueryRequest):
+    session = lookup_session(session_id)
+
+    async def events():
+        cancel_token = CancelToken()
+        try:
+            async with session.lock:
+                async for event, payload in session.chatbot.astream_query(
+                    request.question, deadline=request.deadline_seconds, cancel_token=cancel_token
+                ):
+                    if event == "data":
+                        session.set_result_handle(payload["result_handle"])
+                        data = payload["data"]
+                        payload = {
+                            "columns": [str(col) for col in data.columns],
+                            "data": dataframe_records(data),
+                            "row_count": len(data),
+                            "truncated": payload["result_handle"].truncated if payload["result_handle"] else False
+                        }
+                    elif event == "done":
+                        # Rows were already sent in the "data" event
+                        payload = {key: value for key, value in to_response(payload).items() if key != "data"}
+                    yield sse_event(event, payload)
+        finally:
+            # Client went away mid-stream: stop the database work too
+            cancel_token.cancel()
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/sessions/{session_id}/more")
+async def more(session_id: str):
+    """Next batch of rows from the session's last streamed result"""
+    session = lookup_session(session_id)
+    handle = session.result_handle
+    if handle is None or handle.exhausted:
+        raise HTTPException(status_code=404, detail="No more rows for this session")
+    async with session.lock:
+        df = await asyncio.to_thread(handle.fetch)
+    return {"data": dataframe_records(df), "row_count": len(df), "truncated": handle.truncated}
+
+
+@app.get("/sessions/{session_id}/schema-graph")
+async def schema_graph(session_id: str, tables: Optional[str] = None, hops: int = 1):
+    """FK neighbourhood of comma-separated tables, or of those retrieved for the last question"""
+    session = lookup_session(session_id)
+    graph = await asyncio.to_thread(session.chatbot.schema_manager.schema_graph)
+    focus = tables.split(",") if tables else session.chatbot.last_relevant_tables
+    return graph.to_json(graph.neighbourhood(focus, min(max(hops, 1), 3)), focus)
+
+
+if __name__ == "__main__":
+    import argparse
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the database chatbot over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes; sessions live in one worker, so use sticky routing with more than one")
+    args = parser.parse_args()
+    uvicorn.run("api_server:app", host=args.host, port=args.port, workers=args.workers)
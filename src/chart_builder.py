@@ -0,0 +1,164 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import pyarrow as pa
+from typing import Dict, Optional
+from query_executor import quote_identifier
+
+class ChartBuilder:
+    """Picks a chart for a result and reduces it to a plottable number of points.
+
+    Aggregation runs in SQL when the rows are still on the server, otherwise
+    vectorized over the in-memory result, so the figure never carries every row.
+    """
+
+    def __init__(self, max_points: int = 2000, top_n: int = 30, bins: int = 50):
+        self.max_points = max_points
+        self.top_n = top_n
+        self.bins = bins
+
+    def _is_temporal(self, series: pd.Series) -> bool:
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return True
+        # Arrow DATE columns are temporal but not datetime64
+        return isinstance(series.dtype, pd.ArrowDtype) and pa.types.is_temporal(series.dtype.pyarrow_dtype)
+
+    def _is_numeric(self, series: pd.Series) -> bool:
+        return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+    def _datetimes(self, series: pd.Series) -> np.ndarray:
+        if isinstance(series.dtype, pd.ArrowDtype):
+            series = series.astype(pd.ArrowDtype(pa.timestamp("ns")))
+        return series.to_numpy(dtype="datetime64[ns]", na_value=np.datetime64("NaT"))
+
+    def _numbers(self, series: pd.Series) -> np.ndarray:
+        return series.to_numpy(dtype="float64", na_value=np.nan)
+
+    def infer(self, df: pd.DataFrame) -> Optional[Dict]:
+        """Chart type from dtypes: time series, category totals or a histogram"""
+        if len(df) < 2:
+            return None
+        # Positions rather than names, since join results can repeat column names
+        columns = [df.iloc[:, i] for i in range(len(df.columns))]
+        temporal = [i for i, s in enumerate(columns) if self._is_temporal(s)]
+        numeric = [i for i, s in enumerate(columns) if self._is_numeric(s)]
+        categorical = [i for i in range(len(columns)) if i not in temporal and i not in numeric]
+
+        if temporal and numeric:
+            kind, x, y = "line", temporal[0], numeric[0]
+        elif categorical and numeric:
+            kind, x, y = "bar", categorical[0], numeric[0]
+        elif numeric:
+            kind, x, y = "histogram", None, numeric[0]
+        else:
+            return None
+        return {
+            "kind": kind,
+            "x": x,
+            "y": y,
+            "x_name": None if x is None else str(df.columns[x]),
+            "y_name": str(df.columns[y])
+        }
+
+    def _line(self, x: np.ndarray, y: np.ndarray) -> pd.DataFrame:
+        """Sort by time and average into at most max_points equal-width buckets"""
+        mask = ~np.isnat(x) & ~np.isnan(y)
+        x, y = x[mask], y[mask]
+        order = np.argsort(x, kind="stable")
+        x, y = x[order], y[order]
+        if len(x) <= self.max_points:
+            return pd.DataFrame({"x": x, "y": y})
+
+        ticks = x.astype("int64")
+        start, span = ticks[0], max(ticks[-1] - ticks[0], 1)
+        # Float bucket positions; nanosecond offsets times max_points would overflow int64
+        width = span / self.max_points
+        buckets = np.minimum(((ticks - start) / width).astype("int64"), self.max_points - 1)
+        counts = np.bincount(buckets, minlength=self.max_points)
+        sums = np.bincount(buckets, weights=y, minlength=self.max_points)
+        filled = counts > 0
+        bucket_starts = start + (np.arange(self.max_points) * width).astype("int64")
+        return pd.DataFrame({
+            "x": bucket_starts[filled].astype("datetime64[ns]"),
+            "y": sums[filled] / counts[filled]
+        })
+
+    def _bar(self, x: pd.Series, y: np.ndarray) -> pd.DataFrame:
+        """Total per category, keeping the largest top_n when there are too many to read"""
+        totals = pd.Series(y).groupby(x.astype(str).to_numpy(), sort=False).sum()
+        if len(totals) > self.top_n:
+            totals = totals.nlargest(self.top_n)
+        return pd.DataFrame({"x": totals.index, "y": totals.to_numpy()})
+
+    def _histogram(self, y: np.ndarray) -> pd.DataFrame:
+        counts, edges = np.histogram(y[~np.isnan(y)], bins=self.bins)
+        return pd.DataFrame({"x": (edges[:-1] + edges[1:]) / 2, "y": counts})
+
+    def aggregate(self, df: pd.DataFrame, spec: Dict) -> pd.DataFrame:
+        """Reduce an in-memory result to the points the chart needs"""
+        y = self._numbers(df.iloc[:, spec["y"]])
+        if spec["kind"] == "line":
+            return self._line(self._datetimes(df.iloc[:, spec["x"]]), y)
+        if spec["kind"] == "bar":
+            return self._bar(df.iloc[:, spec["x"]], y)
+        return self._histogram(y)
+
+    def aggregate_sql(self, executor, sql_query: str, spec: Dict, deadline=None) -> pd.DataFrame:
+        """Push the same reduction into MySQL so the full result never leaves the server"""
+        source = f"(\n{sql_query.strip().rstrip(';')}\n) AS _chart"
+        y = quote_identifier(spec["y_name"])
+        if spec["kind"] == "line":
+            x = quote_identifier(spec["x_name"])
+            df = executor.execute(
+                f"SELECT DATE({x}) AS x, AVG({y}) AS y FROM {source} "
+                f"WHERE {x} IS NOT NULL GROUP BY DATE({x}) ORDER BY x",
+                deadline
+            )
+            # Daily points can still be too many for a long range
+            return self._line(self._datetimes(df["x"]), self._numbers(df["y"]))
+        if spec["kind"] == "bar":
+            x = quote_identifier(spec["x_name"])
+            return executor.execute(
+                f"SELECT {x} AS x, SUM({y}) AS y FROM {source} GROUP BY {x} ORDER BY y DESC LIMIT {int(self.top_n)}",
+                deadline
+            )
+
+        bounds = executor.execute(f"SELECT MIN({y}) AS low, MAX({y}) AS high FROM {source}", deadline)
+        low, high = float(bounds["low"].iloc[0]), float(bounds["high"].iloc[0])
+        width = (high - low) / self.bins or 1.0
+        df = executor.execute(
+            f"SELECT LEAST(FLOOR(({y} - {low!r}) / {width!r}), {self.bins - 1}) AS bucket, COUNT(*) AS y "
+            f"FROM {source} WHERE {y} IS NOT NULL GROUP BY bucket ORDER BY bucket",
+            deadline
+        )
+        return pd.DataFrame({"x": low + (self._numbers(df["bucket"]) + 0.5) * width, "y": self._numbers(df["y"])})
+
+    def figure(self, points: pd.DataFrame, spec: Dict, note: str = ""):
+        """Plotly figure for pre-aggregated points"""
+        labels = {"x": spec["x_name"] or spec["y_name"], "y": spec["y_name"] if spec["kind"] != "histogram" else "count"}
+        if spec["kind"] == "line":
+            fig = px.line(points, x="x", y="y", labels=labels, title=f"{spec['y_name']} over time{note}")
+        elif spec["kind"] == "bar":
+            fig = px.bar(points, x="x", y="y", labels=labels, title=f"{spec['y_name']} by {spec['x_name']}{note}")
+        else:
+            fig = px.bar(points, x="x", y="y", labels=labels, title=f"Distribution of {spec['y_name']}{note}")
+            fig.update_layout(bargap=0)
+        fig.update_layout(
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            font=dict(color='white')
+        )
+        return fig
+
+    def build(self, df: pd.DataFrame, executor=None, sql_query: str = None, on_server: bool = False, deadline=None):
+        """Figure for a result, or None when nothing sensible can be plotted"""
+        spec = self.infer(df)
+        if spec is None:
+            return None
+        if on_server and executor is not None and sql_query:
+            try:
+                return self.figure(self.aggregate_sql(executor, sql_query, spec, deadline), spec)
+            except Exception as e:
+                print(f"[ChartBuilder] SQL aggregation failed, charting fetched rows only: {e}")
+                return self.figure(self.aggregate(df, spec), spec, note=f" (first {len(df):,} rows)")
+        return self.figure(self.aggregate(df, spec), spec)
@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Dict, List
+import pandas as pd
+
+class ChatHistoryStore:
+    """Keeps full query results on disk as compressed Parquet with a bounded in-memory LRU cache.
+
+    Chat messages hold only a small preview and the result key; the full DataFrame is
+    reloaded on demand and evicted again once the per-session memory budget is exceeded.
+    """
+
+    def __init__(self, session_id: str = None, base_dir: str = None, memory_budget_bytes: int = 256 * 1024 * 1024,
+                 preview_rows: int = 20, compression: str = "zstd"):
+        self.session_id = session_id or uuid.uuid4().hex
+        base_dir = base_dir or os.path.join(tempfile.gettempdir(), "chat_history")
+        self.directory = os.path.join(base_dir, self.session_id)
+        self.memory_budget_bytes = memory_budget_bytes
+        self.preview_rows = preview_rows
+        self.compression = compression
+        self._columns: Dict[str, List] = {}
+        self._cache: "OrderedDict[str, pd.DataFrame]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    @property
+    def memory_usage(self) -> int:
+        return sum(self._sizes.values())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.parquet")
+
+    def _write(self, key: str, df: pd.DataFrame):
+        # Parquet needs unique string column names, which joins do not guarantee,
+        # so columns are stored by position and their real names kept alongside
+        frame = df.copy(deep=False)
+        frame.columns = [f"c{i}" for i in range(len(df.columns))]
+        frame.to_parquet(self._path(key), compression=self.compression, index=False)
+        self._columns[key] = list(df.columns)
+
+    def _read(self, key: str) -> pd.DataFrame:
+        df = pd.read_parquet(self._path(key), dtype_backend="pyarrow")
+        df.columns = self._columns[key]
+        return df
+
+    def _cache_put(self, key: str, df: pd.DataFrame):
+        """Insert as most recently used, then evict the oldest results over budget"""
+        self._cache[key] = df
+        self._cache.move_to_end(key)
+        self._sizes[key] = int(df.memory_usage(deep=True).sum())
+        while len(self._cache) > 1 and self.memory_usage > self.memory_budget_bytes:
+            evicted, _ = self._cache.popitem(last=False)
+            del self._sizes[evicted]
+
+    def put(self, df: pd.DataFrame, key: str = None) -> str:
+        """Persist a full result (replacing an existing key) and return its key"""
+        key = key or uuid.uuid4().hex
+        with self._lock:
+            self._write(key, df)
+            self._cache_put(key, df)
+        return key
+
+    def get(self, key: str) -> pd.DataFrame:
+        """Full result, read back from disk if it was evicted"""
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            df = self._read(key)
+            self._cache_put(key, df)
+            return df
+
+    def preview(self, df: pd.DataFrame) -> pd.DataFrame:
+        return df.head(self.preview_rows)
+
+    def clear(self):
+        """Drop every stored result for this session"""
+        with self._lock:
+            self._cache.clear()
+            self._sizes.clear()
+            self._columns.clear()
+            shutil.rmtree(self.directory, ignore_errors=True)
+            os.makedirs(self.directory, exist_ok=True)
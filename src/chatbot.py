@@ -1,28 +1,199 @@
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnablePassthrough
+import asyncio
+import os
+import threading
+import time
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
+from contextlib import contextmanager
 from sql_validator import SQLValidator
 from llm_factory import LLMFactory
+from result_summarizer import ResultSummarizer
+from response_templates import ResponseTemplates
+from conversation_memory import ConversationMemory
+from query_executor import QueryExecutor
+from sql_normalizer import sql_fingerprint
+from deadline import Deadline, DeadlineExceeded, QueryCancelled
+from cost_guard import CostGuard, scan_limit
+
+# Shared pool for blocking LLM calls so they can be abandoned at the deadline
+_llm_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm")
+
+# Answers written after the rows have already been returned
+_response_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="response")
+
+@contextmanager
+def _timed(timings, stage):
+    """Record the wall time of a pipeline stage in seconds"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = round(time.perf_counter() - started, 4)
 
 class DBChatbot:
-    def __init__(self, schema_manager, llm_provider="gemini"):
+    def __init__(self, schema_manager, llm_provider="gemini", summary_threshold_rows=None, summary_token_budget=None,
+                 fetch_mode=None, max_rows=None, max_bytes=None, chunk_size=None, deadline_seconds=None,
+                 cost_guard=None, llm=None):
         self.schema_manager = schema_manager
-        self.llm = LLMFactory.create_llm(llm_provider)
+        self.llm = llm or LLMFactory.create_llm(llm_provider)
         self.sql_validator = SQLValidator()
-        self.context = []  # To store previous interactions
+        # Recent turns verbatim plus a rolling summary of older ones, for follow-up questions
+        self.memory = ConversationMemory(
+            recent_turns=int(os.getenv("CONVERSATION_RECENT_TURNS", "3")),
+            token_budget=int(os.getenv("CONVERSATION_TOKEN_BUDGET", "800")),
+            summary_token_budget=int(os.getenv("CONVERSATION_SUMMARY_TOKEN_BUDGET", "250"))
+        )
+        self.last_relevant_tables = []  # Tables retrieved for the latest question
+        
+        # Results with more rows than this are summarized before being sent to the LLM
+        if summary_threshold_rows is None:
+            summary_threshold_rows = int(os.getenv("RESULT_SUMMARY_THRESHOLD_ROWS", "50"))
+        if summary_token_budget is None:
+            summary_token_budget = int(os.getenv("RESULT_SUMMARY_TOKEN_BUDGET", "1500"))
+        self.summary_threshold_rows = summary_threshold_rows
+        self.result_summarizer = ResultSummarizer(token_budget=summary_token_budget)
+        
+        # Empty, single-value, single-row and short list results are answered without the LLM
+        self.local_answers_enabled = os.getenv("LOCAL_ANSWERS_ENABLED", "true").lower() == "true"
+        self.response_templates = ResponseTemplates(max_list_items=int(os.getenv("LOCAL_ANSWER_MAX_LIST", "10")))
+        
+        # "full" loads the whole result, "stream" reads it from a server-side cursor up to the caps
+        self.fetch_mode = fetch_mode or os.getenv("RESULT_FETCH_MODE", "full")
+        self.executor = QueryExecutor(
+            schema_manager.engine,
+            chunk_size=chunk_size or int(os.getenv("RESULT_CHUNK_SIZE", "5000")),
+            max_rows=max_rows or int(os.getenv("RESULT_MAX_ROWS", "10000")),
+            max_bytes=max_bytes or int(os.getenv("RESULT_MAX_BYTES", str(64 * 1024 * 1024))),
+            prepared=os.getenv("QUERY_PREPARED_STATEMENTS", "true").lower() == "true",
+            max_prepared=int(os.getenv("QUERY_PREPARED_CACHE_SIZE", "64"))
+        )
+        
+        # Retrieved tables that get connected through FK join paths
+        self.join_max_tables = int(os.getenv("JOIN_PLANNER_MAX_TABLES", "5"))
+        self.join_max_hops = int(os.getenv("JOIN_PLANNER_MAX_HOPS", "3"))
+        
+        # Overall time budget for one question, shared by every stage
+        self.deadline_seconds = deadline_seconds or float(os.getenv("QUERY_DEADLINE_SECONDS", "60"))
+        
+        # EXPLAIN-based limits checked before generated SQL is executed
+        self.cost_guard = cost_guard or CostGuard(
+            max_estimated_rows=int(os.getenv("COST_GUARD_MAX_ROWS", "10000000")),
+            max_scan_rows=int(os.getenv("COST_GUARD_MAX_SCAN_ROWS", "1000000")),
+            max_sort_rows=int(os.getenv("COST_GUARD_MAX_SORT_ROWS", "1000000")),
+            action=os.getenv("COST_GUARD_ACTION", "limit"),
+            auto_limit=int(os.getenv("COST_GUARD_AUTO_LIMIT", "1000")),
+            huge_table_rows=int(os.getenv("COST_GUARD_HUGE_TABLE_ROWS", "10000000"))
+        )
+        
+        # Profiled columns with at most this many distinct values are listed in the prompt
+        self.stats_low_cardinality = int(os.getenv("TABLE_STATS_LOW_CARDINALITY", "20"))
+        
+        # Simple questions ("how many X", "first 10 X", "columns of X") skip the LLM entirely
+        self.fast_path_enabled = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+        self.fast_path_stats = {"fast_path": 0, "llm": 0}
+        self._fast_path_lock = threading.Lock()
+        
+        # Question literals resolved against the distinct-value index before generation
+        self.value_max_matches = int(os.getenv("VALUE_INDEX_MAX_MATCHES", "5"))
+        self.value_min_similarity = float(os.getenv("VALUE_INDEX_MIN_SIMILARITY", "0.75"))
+        
+    def _start_deadline(self, deadline):
+        """Accept a Deadline, a number of seconds, or None for the configured default"""
+        if isinstance(deadline, Deadline):
+            return deadline
+        return Deadline(deadline if deadline is not None else self.deadline_seconds)
+    
+    def _check(self, stage, deadline, cancel_token):
+        """Stop before a stage once the request is cancelled or out of time"""
+        if cancel_token is not None:
+            cancel_token.check(stage)
+        if deadline is not None:
+            deadline.check(stage)
+    
+    def _invoke_llm(self, chain, payload, stage, deadline=None, cancel_token=None):
+        """Invoke a chain, giving up at the deadline or on cancellation"""
+        self._check(stage, deadline, cancel_token)
+        if deadline is None and cancel_token is None:
+            return chain.invoke(payload)
+        
+        future = _llm_executor.submit(chain.invoke, payload)
+        while True:
+            timeout = 0.25 if deadline is None else min(0.25, deadline.remaining())
+            try:
+                return future.result(timeout=timeout)
+            except FutureTimeoutError:
+                if future.done():
+                    raise
+                # Abandon the call; the client's own request timeout reaps the thread
+                self._check(stage, deadline, cancel_token)
+    
+    async def _ainvoke_llm(self, chain, payload, stage, deadline=None, cancel_token=None):
+        """Async variant of _invoke_llm that cancels the underlying request"""
+        self._check(stage, deadline, cancel_token)
+        if deadline is None and cancel_token is None:
+            return await chain.ainvoke(payload)
         
-    def update_context(self, user_question, response):
-        """Update the context with the latest question and response."""
-        self.context.append({"question": user_question, "response": response})
-        if len(self.context) > 10:  # Limit context size
-            self.context.pop(0)
+        task = asyncio.ensure_future(chain.ainvoke(payload))
+        try:
+            while True:
+                timeout = 0.25 if deadline is None else min(0.25, deadline.remaining())
+                done, _ = await asyncio.wait({task}, timeout=timeout)
+                if done:
+                    return task.result()
+                self._check(stage, deadline, cancel_token)
+        finally:
+            task.cancel()
+    
+    async def _astream_llm(self, chain, payload, stage, deadline=None, cancel_token=None):
+        """Stream a chain's chunks, bounding the wait for each one by the deadline and cancellation.
+        
+        A stream that stalls before its first chunk or between chunks is given up the
+        same way as a stalled ainvoke, rather than only being checked once a chunk arrives.
+        """
+        self._check(stage, deadline, cancel_token)
+        stream = chain.astream(payload).__aiter__()
+        try:
+            while True:
+                task = asyncio.ensure_future(stream.__anext__())
+                try:
+                    while True:
+                        timeout = 0.25 if deadline is None else min(0.25, deadline.remaining())
+                        done, _ = await asyncio.wait({task}, timeout=timeout)
+                        if done:
+                            break
+                        self._check(stage, deadline, cancel_token)
+                finally:
+                    if not task.done():
+                        # Let the pending read unwind before the stream is closed
+                        task.cancel()
+                        await asyncio.wait({task})
+                try:
+                    chunk = task.result()
+                except StopAsyncIteration:
+                    return
+                yield chunk
+                self._check(stage, deadline, cancel_token)
+        finally:
+            aclose = getattr(stream, "aclose", None)
+            if aclose is not None:
+                await aclose()
+    
+    def update_context(self, user_question, response, sql_query=None):
+        """Update the context with the latest question, its SQL and the response."""
+        self.memory.add(user_question, response, sql_query)
         
-    def get_relevant_schema(self, query):
+    def get_relevant_schema(self, query, query_embedding=None, follow_up=True, value_matches=None):
         """Get relevant schema information based on the query"""
+        # Encode once and reuse the embedding for both searches
+        if query_embedding is None:
+            query_embedding = self.schema_manager.encode_query(query)
+        
         # Get both similar tables and direct matches
-        table_matches = self.schema_manager.semantic_table_search(query, min_score=0.6)
-        direct_matches = self.schema_manager.similarity_search(query, k=3, threshold=0.5)
+        table_matches = self.schema_manager.semantic_table_search(query, min_score=0.6, query_embedding=query_embedding)
+        direct_matches = self.schema_manager.similarity_search(query, k=3, threshold=0.5, query_embedding=query_embedding)
         
         # Combine and deduplicate results
         schema_info = []
@@ -41,13 +212,48 @@ class DBChatbot:
                 schema_info.append(match['content'])
                 seen_tables.add(table)
         
+        # A follow-up ("only those from 2023") may not mention the tables it refines
+        if follow_up:
+            for table in self.memory.last_tables():
+                if table not in seen_tables and self.schema_manager.table_text(table):
+                    schema_info.append(self.schema_manager.table_text(table))
+                    seen_tables.add(table)
+        
+        # Literals in the question resolved to stored values; an exact hit brings in its table
+        if value_matches is None:
+            value_matches = self._resolve_values(query)
+        for match in value_matches:
+            if match['score'] == 1.0 and match['table'] not in seen_tables:
+                schema_info.append(self.schema_manager.table_text(match['table']) or f"Table {match['table']}")
+                seen_tables.add(match['table'])
+        
+        # Kept in retrieval order so the UI can focus its ERD on what the question touched
+        self.last_relevant_tables = list(dict.fromkeys(
+            [match['table'] for match in table_matches] + [match['metadata']['table'] for match in direct_matches]
+            + [match['table'] for match in value_matches if match['table'] in seen_tables]
+            + [table for table in self.memory.last_tables() if table in seen_tables]
+        ))
+        join_paths = ""
+        plan = self._plan_joins(self.last_relevant_tables[:self.join_max_tables])
+        if plan:
+            # Bridge tables are needed for the joins even though retrieval missed them
+            for table in plan["bridges"]:
+                schema_info.append(self.schema_manager.table_text(table) or f"Table {table}")
+            self.last_relevant_tables.extend(plan["bridges"])
+            join_paths = f"""
+JOIN PATHS (exact foreign-key joins between the tables above; use these conditions):
+{self.schema_manager.join_planner(self.join_max_hops).skeleton(plan)}
+"""
+        
         schema_text = "\n".join(schema_info)
+        table_stats = self._table_stats_text(self.last_relevant_tables)
+        values_text = self._value_matches_text([match for match in value_matches if match['table'] in seen_tables])
         
         return f"""IMPORTANT: Below is the exact MySQL database schema with correct table and column names.
 Use ONLY these exact names in your query:
 
 {schema_text}
-
+{join_paths}{table_stats}{values_text}
 IMPORTANT RULES FOR MYSQL:
 1. Use ONLY the exact table and column names shown above
 2. Do not use aliases like 'e' or 'd'. Use the exact column names from the schema
@@ -56,21 +262,90 @@ IMPORTANT RULES FOR MYSQL:
 5. Every column reference must exactly match a column from the schema
 6. Do not guess or assume column names - use only what is explicitly shown
 7. Use MySQL-specific functions (e.g., CONCAT instead of ||, DATE_FORMAT instead of TO_CHAR)
-8. For string operations, use MySQL's LIKE operator with % for wildcards"""
+8. For string matching, use = with the exact values listed above when given; otherwise use MySQL's LIKE operator with % for wildcards"""
     
-    def generate_sql(self, user_query):
-        """Generate MySQL-specific SQL query from natural language"""
-        relevant_schema = self.get_relevant_schema(user_query)
-        
-        # If no relevant schema found, return error
-        if not relevant_schema:
-            raise ValueError("No relevant tables found in the database schema for this query.")
+    def _table_stats_text(self, tables):
+        """Approximate table sizes and low-cardinality columns for the prompt, empty without stats"""
+        stats = self.schema_manager.table_stats().get("tables", {})
+        lines = []
+        for table in tables:
+            table_stats = stats.get(table)
+            if not table_stats:
+                continue
+            line = f"- {table}: ~{table_stats['rows']:,} rows"
+            if table_stats["rows"] > self.cost_guard.huge_table_rows:
+                line += " (HUGE: filter on key columns and aggregate, or add a LIMIT)"
+            low_cardinality = [
+                f"{column} ({column_stats['ndv']} distinct)"
+                for column, column_stats in table_stats.get("columns", {}).items()
+                if 0 < (column_stats.get("ndv") or 0) <= self.stats_low_cardinality
+            ]
+            if low_cardinality:
+                line += f"; few distinct values: {', '.join(low_cardinality)}"
+            lines.append(line)
+        if not lines:
+            return ""
+        return "\nTABLE STATISTICS (approximate):\n" + "\n".join(lines) + "\n"
+    
+    def _resolve_values(self, query):
+        """Stored values matching literals in the question, empty when there is no value index"""
+        try:
+            index = self.schema_manager.value_index()
+            if index is None:
+                return []
+            return index.resolve(query, max_matches=self.value_max_matches, min_similarity=self.value_min_similarity)
+        except Exception as e:
+            print(f"[DBChatbot] Value lookup skipped: {e}")
+            return []
+    
+    def _value_matches_text(self, matches):
+        """Equality predicates for the resolved literals"""
+        if not matches:
+            return ""
+        lines = []
+        for match in matches:
+            value = match['value'].replace("'", "''")
+            lines.append(f"- \"{match['phrase']}\" -> {match['table']}.{match['column']} = '{value}'")
+        return (
+            "\nVALUES IN THE QUESTION (exact stored values; filter with = on these columns instead of LIKE):\n"
+            + "\n".join(lines) + "\n"
+        )
+    
+    def _plan_joins(self, tables):
+        """Join plan connecting the retrieved tables, or None when there is nothing to join"""
+        if len(tables) < 2:
+            return None
+        try:
+            plan = self.schema_manager.join_planner(self.join_max_hops).connect(tables)
+        except Exception as e:
+            print(f"[DBChatbot] Join planning skipped: {e}")
+            return None
+        return plan if plan["joins"] else None
+    
+    def _load_context(self, query):
+        """Retrieval work that does not need the embedding: value lookup and the table stats file"""
+        value_matches = self._resolve_values(query)
+        self.schema_manager.table_stats()
+        return value_matches
+    
+    async def aget_relevant_schema(self, query):
+        """Async variant of get_relevant_schema that keeps every blocking step off the event loop.
         
-        # Include context in the prompt
-        context_str = "\n".join([f"Q: {item['question']}\nA: {item['response']}" for item in self.context])
+        The value lookup and stats loading overlap with the query embedding; the vector
+        search, join planning and prompt assembly then run on a worker thread.
+        """
+        query_embedding, value_matches = await asyncio.gather(
+            self.schema_manager.aencode_query(query),
+            asyncio.to_thread(self._load_context, query)
+        )
+        return await asyncio.to_thread(
+            self.get_relevant_schema, query, query_embedding, True, value_matches
+        )
         
+    def _sql_chain(self, relevant_schema):
+        """Build the SQL generation chain for the given schema text"""
         prompt = ChatPromptTemplate.from_messages([
-            ("system", f"""You are a MySQL query generator. Your ONLY job is to convert natural language questions into MySQL-compatible SQL queries.
+            ("system", """You are a MySQL query generator. Your ONLY job is to convert natural language questions into MySQL-compatible SQL queries.
             
 Schema information:
 {relevant_schema}
@@ -85,18 +360,25 @@ CRITICAL RULES FOR MYSQL:
    - Use LIMIT for row limiting (not FETCH or ROWNUM)
    - Use % as wildcard in LIKE expressions
 5. If you can't find an exact column or join path in the schema, respond with 'INVALID_QUERY'
+6. Use the conversation below only to resolve follow-ups ("those", "the same", "now by month")
+
+Conversation so far:
+{history}
 """),
             ("human", "{question}")
         ])
         
-        chain = (
-            {"schema": lambda x: relevant_schema, "question": RunnablePassthrough()}
+        # Schema and history are passed as variables so braces in stored values and SQL stay literal
+        history = self.memory.render()
+        return (
+            {"relevant_schema": lambda x: relevant_schema, "history": lambda x: history, "question": RunnablePassthrough()}
             | prompt
             | self.llm
             | (lambda x: x.content)
         )
         
-        raw_response = chain.invoke(user_query)
+    def _clean_sql(self, raw_response):
+        """Extract the SQL statement from a raw LLM response"""
         print(f"[DBChatbot] Raw LLM response:\n{raw_response}")
         
         # Clean up the response - strip markdown code blocks
@@ -110,18 +392,41 @@ CRITICAL RULES FOR MYSQL:
         
         print(f"[DBChatbot] Cleaned SQL query:\n{sql_query}")
         
+        if sql_query.strip() == 'INVALID_QUERY':
+            raise ValueError("This question cannot be answered using the available database schema.")
+        
         if not sql_query.upper().strip().startswith('SELECT'):
             print(f"[DBChatbot] ERROR: Query doesn't start with SELECT: {sql_query[:50]}...")
             raise ValueError("No valid SQL query found in the response")
         
-        if sql_query == 'INVALID_QUERY':
-            raise ValueError("This question cannot be answered using the available database schema.")
-        
         return sql_query
     
-    def generate_response(self, sql_result, user_question):
-        """Generate natural language response from SQL results"""
-        prompt = ChatPromptTemplate.from_messages([
+    def generate_sql(self, user_query, relevant_schema=None, deadline=None, cancel_token=None):
+        """Generate MySQL-specific SQL query from natural language"""
+        if relevant_schema is None:
+            relevant_schema = self.get_relevant_schema(user_query)
+        
+        # If no relevant schema found, return error
+        if not relevant_schema:
+            raise ValueError("No relevant tables found in the database schema for this query.")
+        
+        raw_response = self._invoke_llm(self._sql_chain(relevant_schema), user_query, "SQL generation", deadline, cancel_token)
+        return self._clean_sql(raw_response)
+    
+    async def agenerate_sql(self, user_query, relevant_schema=None, deadline=None, cancel_token=None):
+        """Async variant of generate_sql using the LLM's ainvoke API"""
+        if relevant_schema is None:
+            relevant_schema = await self.aget_relevant_schema(user_query)
+        
+        if not relevant_schema:
+            raise ValueError("No relevant tables found in the database schema for this query.")
+        
+        raw_response = await self._ainvoke_llm(self._sql_chain(relevant_schema), user_query, "SQL generation", deadline, cancel_token)
+        return self._clean_sql(raw_response)
+    
+    def _response_prompt(self):
+        """Build the natural language answer prompt"""
+        return ChatPromptTemplate.from_messages([
             ("system", """Given the following MySQL query results and the original question, 
              generate a natural language response that answers the user's question in a clear 
              and concise way.
@@ -130,58 +435,406 @@ CRITICAL RULES FOR MYSQL:
              Results: {results}"""),
             ("human", "Please provide a natural language summary of these results.")
         ])
+    
+    def _response_chain(self):
+        """Build the natural language answer chain"""
+        return self._response_prompt() | self.llm | (lambda x: x.content)
+    
+    def _format_results(self, sql_result):
+        """Render results for the prompt, summarizing anything above the size threshold"""
+        if isinstance(sql_result, pd.DataFrame) and len(sql_result) > self.summary_threshold_rows:
+            try:
+                return self.result_summarizer.summarize(sql_result)
+            except Exception as e:
+                # The query succeeded, so fall back to a plain sample rather than failing it
+                print(f"[DBChatbot] Result summary skipped: {e}")
+                return sql_result.head(self.summary_threshold_rows).to_string(index=False)
+        return str(sql_result)
+    
+    def _local_response(self, sql_result, user_question, sql_query):
+        """Templated answer for simple result shapes, or None when the LLM should answer"""
+        if not self.local_answers_enabled:
+            return None
+        try:
+            return self.response_templates.render(user_question, sql_query, sql_result)
+        except Exception as e:
+            print(f"[DBChatbot] Local answer skipped: {e}")
+            return None
+    
+    def generate_response(self, sql_result, user_question, deadline=None, cancel_token=None, sql_query=None):
+        """Generate natural language response from SQL results"""
+        local = self._local_response(sql_result, user_question, sql_query)
+        if local is not None:
+            return local
+        payload = {"results": self._format_results(sql_result), "question": user_question}
+        return self._invoke_llm(self._response_chain(), payload, "response generation", deadline, cancel_token)
+    
+    async def agenerate_response(self, sql_result, user_question, deadline=None, cancel_token=None, sql_query=None):
+        """Async variant of generate_response"""
+        local = self._local_response(sql_result, user_question, sql_query)
+        if local is not None:
+            return local
+        payload = {"results": self._format_results(sql_result), "question": user_question}
+        return await self._ainvoke_llm(self._response_chain(), payload, "response generation", deadline, cancel_token)
+    
+    def _validate_sql(self, sql_query):
+        """Run the validators, returning an error result or None when the query is valid"""
+        # Validate SQL query with query operation type and MySQL dialect
+        is_valid, validation_message = self.sql_validator.validate(sql_query, operation_type="query")
+        if not is_valid:
+            return {
+                "success": False,
+                "error": f"MySQL validation failed: {validation_message}",
+                "sql_query": sql_query
+            }
+        
+        # Additional MySQL-specific function validation
+        is_valid_mysql, mysql_validation_message = self.sql_validator.validate_mysql_functions(sql_query)
+        if not is_valid_mysql:
+            return {
+                "success": False,
+                "error": f"MySQL function validation failed: {mysql_validation_message}",
+                "sql_query": sql_query
+            }
+        
+        return None
+    
+    def _rewrite_chain(self):
+        """Build the chain that asks the LLM for a cheaper version of a query"""
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", """You are a MySQL performance expert. The query below answers the user's question
+but its execution plan is too expensive.
+
+Original question: {question}
+Query:
+{sql}
+
+Plan problems: {issues}
+
+Rewrite the query so it answers the same question more cheaply: filter on indexed columns,
+join on keys, aggregate instead of returning raw rows, and add a LIMIT where a sample is enough.
+ONLY output the SQL query - no explanations, no markdown. If no cheaper query exists, respond with 'INVALID_QUERY'."""),
+            ("human", "Rewrite the query.")
+        ])
+        
+        return prompt | self.llm | (lambda x: x.content)
+    
+    def _guard_cost(self, user_question, sql_query, deadline=None, cancel_token=None):
+        """Check the EXPLAIN plan, returning the (possibly rewritten) query, the plan and an error result"""
+        self._check("cost check", deadline, cancel_token)
+        
+        # Raw rows from a huge table are always capped, whatever the plan estimates
+        table_rows = {
+            table: table_stats["rows"]
+            for table, table_stats in self.schema_manager.table_stats().get("tables", {}).items()
+        }
+        sql_query, size_action = self.cost_guard.cap_huge_tables(sql_query, table_rows)
+        if size_action:
+            print(f"[DBChatbot] {size_action}")
+        
+        try:
+            plan = self.cost_guard.analyze(self.executor.explain(sql_query), row_limit=scan_limit(sql_query))
+        except Exception as e:
+            print(f"[DBChatbot] EXPLAIN failed, skipping cost guard: {e}")
+            return sql_query, None, None
+        
+        plan["action"] = size_action
+        if not plan["violations"]:
+            return sql_query, plan, None
+        
+        issues = "; ".join(plan["violations"])
+        print(f"[DBChatbot] Cost guard flagged query: {issues}")
+        
+        settled_query, action = self.cost_guard.settle(sql_query, plan, capped=size_action is not None)
+        if action:
+            plan["action"] = action
+            return settled_query, plan, None
+        
+        if self.cost_guard.action == "rewrite":
+            payload = {"question": user_question, "sql": sql_query, "issues": issues}
+            raw_response = self._invoke_llm(self._rewrite_chain(), payload, "cost rewrite", deadline, cancel_token)
+            try:
+                rewritten = self._clean_sql(raw_response)
+                rewritten_plan = None
+                if self._validate_sql(rewritten) is None:
+                    rewritten_plan = self.cost_guard.analyze(self.executor.explain(rewritten), row_limit=scan_limit(rewritten))
+            except Exception as e:
+                print(f"[DBChatbot] Cost rewrite failed: {e}")
+                rewritten_plan = None
+            
+            if rewritten_plan is not None and not rewritten_plan["violations"]:
+                rewritten_plan["action"] = "rewritten for a cheaper plan"
+                rewritten_plan["original_violations"] = plan["violations"]
+                return rewritten, rewritten_plan, None
         
-        chain = prompt | self.llm | (lambda x: x.content)
-        return chain.invoke({"results": str(sql_result), "question": user_question})
+        plan["action"] = "rejected"
+        return sql_query, plan, {
+            "success": False,
+            "error": f"Query rejected as too expensive: {issues}",
+            "sql_query": sql_query,
+            "plan": plan
+        }
     
-    def query(self, user_question):
-        """Main method to handle user queries"""
+    def _execute_sql(self, sql_query, deadline=None, cancel_token=None):
+        """Execute a validated query, returning the fetched rows and an open handle in stream mode"""
+        if self.fetch_mode != "stream":
+            return self.executor.execute(sql_query, deadline, cancel_token), None
+        
+        result_handle = self.executor.stream(sql_query, deadline, cancel_token)
         try:
+            result = result_handle.fetch(deadline=deadline, cancel_token=cancel_token)
+        except Exception:
+            result_handle.close()
+            raise
+        return result, result_handle
+    
+    def _success_result(self, sql_query, response, result, result_handle, plan=None):
+        """Build the result dictionary returned to callers"""
+        output = {
+            "success": True,
+            "response": response,
+            "sql_query": sql_query,
+            # Same id for every literal variant of the query, for logging and caching
+            "fingerprint": sql_fingerprint(sql_query),
+            "data": result
+        }
+        if plan is not None:
+            output["plan"] = plan
+        if result_handle is not None:
+            output["result_handle"] = result_handle
+            output["truncated"] = result_handle.truncated
+        return output
+    
+    def _error_result(self, error, sql_query=None):
+        """Build the failure dictionary returned to callers"""
+        if isinstance(error, (DeadlineExceeded, QueryCancelled)):
+            return {
+                "success": False,
+                "error": str(error),
+                "sql_query": sql_query,
+                "cancelled": isinstance(error, QueryCancelled)
+            }
+        return {
+            "success": False,
+            "error": str(error),
+            # Generation errors are ValueErrors raised before any usable SQL exists
+            "sql_query": None if isinstance(error, ValueError) else sql_query
+        }
+    
+    def _fast_path(self, user_question):
+        """Intent compiled locally from the question, or None to take the LLM path"""
+        intent = None
+        if self.fast_path_enabled:
+            try:
+                intent = self.schema_manager.intent_matcher().match(user_question)
+            except Exception as e:
+                print(f"[DBChatbot] Intent matching skipped: {e}")
+        with self._fast_path_lock:
+            self.fast_path_stats["fast_path" if intent else "llm"] += 1
+            if intent:
+                print(f"[DBChatbot] Fast path ({intent['intent']} on {intent['table']}); totals: {self.fast_path_stats}")
+        return intent
+    
+    def _run_intent(self, user_question, intent, deadline=None, cancel_token=None, update_context=True):
+        """Execute a fast-path intent and answer it from a template"""
+        self.last_relevant_tables = [intent["table"]]
+        result, result_handle = self._execute_sql(intent["sql"], deadline, cancel_token)
+        response = self.schema_manager.intent_matcher().answer(intent, result)
+        if update_context:
+            self.update_context(user_question, response, intent["sql"])
+        output = self._success_result(intent["sql"], response, result, result_handle)
+        output["fast_path"] = intent["intent"]
+        return output
+    
+    def query(self, user_question, deadline=None, cancel_token=None, relevant_schema=None, update_context=True,
+              defer_response=False):
+        """Main method to handle user queries.
+        
+        With defer_response, SQL and rows are returned as soon as the query has run; an
+        answer that needs the LLM is left as None and written in the background, with
+        "response_future" resolving to it.
+        """
+        timings = {}
+        output = self._run_query(user_question, deadline, cancel_token, relevant_schema, update_context, timings,
+                                 defer_response)
+        output["timings"] = timings
+        return output
+    
+    def _defer_response(self, result, user_question, sql_query, deadline, cancel_token, update_context, timings):
+        """Write the answer on a background thread and return its future"""
+        # Recorded now so a follow-up asked before the answer arrives still sees this turn's SQL
+        turn = self.memory.add(user_question, None, sql_query) if update_context else None
+        
+        def respond():
+            with _timed(timings, "response"):
+                response = self.generate_response(result, user_question, deadline, cancel_token, sql_query)
+            if turn is not None:
+                self.memory.set_response(turn, response)
+            return response
+        
+        return _response_executor.submit(respond)
+    
+    def _run_query(self, user_question, deadline, cancel_token, relevant_schema, update_context, timings,
+                   defer_response=False):
+        """Run the query pipeline, recording per-stage timings"""
+        deadline = self._start_deadline(deadline)
+        try:
+            intent = self._fast_path(user_question)
+            if intent is not None:
+                with _timed(timings, "execution"):
+                    return self._run_intent(user_question, intent, deadline, cancel_token, update_context)
+            
+            if relevant_schema is None:
+                with _timed(timings, "retrieval"):
+                    relevant_schema = self.get_relevant_schema(user_question)
+            
             # Generate SQL query
-            sql_query = self.generate_sql(user_question)
-            
-            # Validate SQL query with query operation type and MySQL dialect
-            is_valid, validation_message = self.sql_validator.validate(sql_query, operation_type="query")
-            if not is_valid:
-                return {
-                    "success": False,
-                    "error": f"MySQL validation failed: {validation_message}",
-                    "sql_query": sql_query
-                }
-            
-            # Additional MySQL-specific function validation
-            is_valid_mysql, mysql_validation_message = self.sql_validator.validate_mysql_functions(sql_query)
-            if not is_valid_mysql:
-                return {
-                    "success": False,
-                    "error": f"MySQL function validation failed: {mysql_validation_message}",
-                    "sql_query": sql_query
-                }
+            with _timed(timings, "generation"):
+                sql_query = self.generate_sql(user_question, relevant_schema, deadline, cancel_token)
+            
+            with _timed(timings, "validation"):
+                validation_error = self._validate_sql(sql_query)
+            if validation_error:
+                return validation_error
+            
+            # Check the execution plan before running anything expensive
+            with _timed(timings, "cost_check"):
+                sql_query, plan, cost_error = self._guard_cost(user_question, sql_query, deadline, cancel_token)
+            if cost_error:
+                return cost_error
             
             # Execute query
-            result = pd.read_sql(sql_query, self.schema_manager.engine)
+            with _timed(timings, "execution"):
+                result, result_handle = self._execute_sql(sql_query, deadline, cancel_token)
+            
+            if defer_response and self._local_response(result, user_question, sql_query) is None:
+                output = self._success_result(sql_query, None, result, result_handle, plan)
+                output["response_future"] = self._defer_response(
+                    result, user_question, sql_query, deadline, cancel_token, update_context, timings
+                )
+                return output
             
             # Generate response with original question
-            response = self.generate_response(result, user_question)
+            with _timed(timings, "response"):
+                response = self.generate_response(result, user_question, deadline, cancel_token, sql_query)
             
             # Update context with the latest question and response
-            self.update_context(user_question, response)
+            if update_context:
+                self.update_context(user_question, response, sql_query)
             
-            return {
-                "success": True,
-                "response": response,
-                "sql_query": sql_query,
-                "raw_result": result.to_dict('records')
-            }
-        except ValueError as ve:
-            return {
-                "success": False,
-                "error": str(ve),
-                "sql_query": None
+            return self._success_result(sql_query, response, result, result_handle, plan)
+        except Exception as e:
+            return self._error_result(e, sql_query if 'sql_query' in locals() else None)
+    
+    def iter_query_many(self, questions, max_concurrency=4, deadline_seconds=None):
+        """Answer independent questions concurrently, yielding (index, result) as each finishes"""
+        questions = list(questions)
+        if not questions:
+            return
+        
+        # One embedding batch for every question, then cheap per-question ranking
+        started = time.perf_counter()
+        embeddings = self.schema_manager.encode_queries(questions)
+        schemas = [
+            self.get_relevant_schema(question, query_embedding=embedding, follow_up=False)
+            for question, embedding in zip(questions, embeddings)
+        ]
+        retrieval_share = round((time.perf_counter() - started) / len(questions), 4)
+        
+        with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="batch") as pool:
+            futures = {
+                pool.submit(self.query, question, deadline_seconds, None, schema, False): index
+                for index, (question, schema) in enumerate(zip(questions, schemas))
             }
+            for future in as_completed(futures):
+                result = future.result()
+                result["timings"]["retrieval"] = retrieval_share
+                yield futures[future], result
+    
+    def query_many(self, questions, max_concurrency=4, deadline_seconds=None):
+        """Answer independent questions concurrently, returning results in input order"""
+        questions = list(questions)
+        results = [None] * len(questions)
+        for index, result in self.iter_query_many(questions, max_concurrency, deadline_seconds):
+            results[index] = result
+        return results
+    
+    async def aquery(self, user_question, deadline=None, cancel_token=None):
+        """Async variant of query so one event loop can serve many concurrent chats"""
+        deadline = self._start_deadline(deadline)
+        try:
+            intent = await asyncio.to_thread(self._fast_path, user_question)
+            if intent is not None:
+                return await asyncio.to_thread(self._run_intent, user_question, intent, deadline, cancel_token)
+            
+            sql_query = await self.agenerate_sql(user_question, deadline=deadline, cancel_token=cancel_token)
+            
+            validation_error = self._validate_sql(sql_query)
+            if validation_error:
+                return validation_error
+            
+            sql_query, plan, cost_error = await asyncio.to_thread(
+                self._guard_cost, user_question, sql_query, deadline, cancel_token
+            )
+            if cost_error:
+                return cost_error
+            
+            # The engine pool is thread-safe, so blocking DB work runs on a worker thread
+            result, result_handle = await asyncio.to_thread(self._execute_sql, sql_query, deadline, cancel_token)
+            
+            response = await self.agenerate_response(result, user_question, deadline, cancel_token, sql_query)
+            self.update_context(user_question, response, sql_query)
+            
+            return self._success_result(sql_query, response, result, result_handle, plan)
         except Exception as e:
-            return {
-                "success": False,
-                "error": str(e),
-                "sql_query": sql_query if 'sql_query' in locals() else None
-            } 
\ No newline at end of file
+            return self._error_result(e, sql_query if 'sql_query' in locals() else None)
+    
+    async def astream_query(self, user_question, deadline=None, cancel_token=None):
+        """Async generator of (event, payload) pairs: "sql", "data", "token"... then "done" or "error" """
+        deadline = self._start_deadline(deadline)
+        try:
+            intent = await asyncio.to_thread(self._fast_path, user_question)
+            if intent is not None:
+                yield "sql", {"sql_query": intent["sql"], "plan": None}
+                output = await asyncio.to_thread(self._run_intent, user_question, intent, deadline, cancel_token)
+                yield "data", {"data": output["data"], "result_handle": output.get("result_handle")}
+                yield "token", output["response"]
+                yield "done", output
+                return
+            
+            sql_query = await self.agenerate_sql(user_question, deadline=deadline, cancel_token=cancel_token)
+            
+            validation_error = self._validate_sql(sql_query)
+            if validation_error:
+                yield "error", validation_error
+                return
+            
+            sql_query, plan, cost_error = await asyncio.to_thread(
+                self._guard_cost, user_question, sql_query, deadline, cancel_token
+            )
+            if cost_error:
+                yield "error", cost_error
+                return
+            yield "sql", {"sql_query": sql_query, "plan": plan}
+            
+            result, result_handle = await asyncio.to_thread(self._execute_sql, sql_query, deadline, cancel_token)
+            yield "data", {"data": result, "result_handle": result_handle}
+            
+            # Stream the answer token by token instead of waiting for the whole response
+            response = self._local_response(result, user_question, sql_query)
+            if response is not None:
+                yield "token", response
+            else:
+                chunks = []
+                payload = {"results": self._format_results(result), "question": user_question}
+                async for chunk in self._astream_llm(
+                    self._response_prompt() | self.llm, payload, "response generation", deadline, cancel_token
+                ):
+                    chunks.append(chunk.content)
+                    yield "token", chunk.content
+                response = "".join(chunks)
+            self.update_context(user_question, response, sql_query)
+            
+            yield "done", self._success_result(sql_query, response, result, result_handle, plan)
+        except Exception as e:
+            yield "error", self._error_result(e, sql_query if 'sql_query' in locals() else None)
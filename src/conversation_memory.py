@@ -0,0 +1,106 @@
+import re
+from typing import Dict, List
+
+def sql_tables(sql_query: str) -> List[str]:
+    """Tables named after FROM or JOIN, in order of appearance"""
+    return list(dict.fromkeys(re.findall(r"\b(?:FROM|JOIN)\s+`?(\w+)`?", sql_query or "", re.IGNORECASE)))
+
+
+class ConversationMemory:
+    """Bounded context for follow-up questions.
+
+    The last few turns are kept verbatim (question, SQL, tables and a short answer);
+    older turns are compressed into one line each in a rolling summary, whose oldest
+    lines fold into a list of earlier tables once it outgrows its budget.
+    """
+
+    def __init__(self, recent_turns: int = 3, token_budget: int = 800, summary_token_budget: int = 250,
+                 answer_chars: int = 300, chars_per_token: int = 4):
+        self.recent_turns = recent_turns
+        self.token_budget = token_budget
+        self.summary_token_budget = summary_token_budget
+        self.answer_chars = answer_chars
+        self.chars_per_token = chars_per_token
+        self.turns: List[Dict] = []
+        self.summary: List[str] = []
+        self.earlier_tables: List[str] = []
+
+    def _tokens(self, text: str) -> int:
+        """Rough token estimate used for budgeting"""
+        return len(text) // self.chars_per_token + 1
+
+    def add(self, question: str, response: str, sql_query: str = None) -> Dict:
+        turn = {
+            "question": question,
+            "sql_query": sql_query,
+            "tables": sql_tables(sql_query),
+            "response": (response or "")[:self.answer_chars]
+        }
+        self.turns.append(turn)
+        while len(self.turns) > self.recent_turns:
+            self._compress(self.turns.pop(0))
+        return turn
+
+    def set_response(self, turn: Dict, response: str):
+        """Fill in the answer of a turn recorded before its answer was ready"""
+        turn["response"] = (response or "")[:self.answer_chars]
+
+    def _compress(self, turn: Dict):
+        """Fold a turn that left the recent window into the rolling summary"""
+        line = f'- "{turn["question"]}"'
+        if turn["tables"]:
+            line += f" (tables: {', '.join(turn['tables'])})"
+        where = re.search(r"\bWHERE\b(.*?)(\bGROUP\b|\bORDER\b|\bLIMIT\b|$)", turn["sql_query"] or "",
+                          re.IGNORECASE | re.DOTALL)
+        if where:
+            line += f" filtered by {' '.join(where.group(1).split())[:120]}"
+        self.summary.append(line)
+
+        while len(self.summary) > 1 and self._tokens("\n".join(self.summary)) > self.summary_token_budget:
+            dropped = self.summary.pop(0)
+            tables = re.search(r"\(tables: ([^)]*)\)", dropped)
+            if tables:
+                self.earlier_tables = list(dict.fromkeys(self.earlier_tables + tables.group(1).split(", ")))
+
+    def last_tables(self) -> List[str]:
+        """Tables queried by the most recent turn"""
+        return self.turns[-1]["tables"] if self.turns else []
+
+    def _turn_text(self, turn: Dict) -> str:
+        lines = [f"Q: {turn['question']}"]
+        if turn["sql_query"]:
+            lines.append(f"SQL: {' '.join(turn['sql_query'].split())}")
+        if turn["response"]:
+            lines.append(f"A: {turn['response']}")
+        return "\n".join(lines)
+
+    def render(self) -> str:
+        """Summary and recent turns within the token budget, newest turns kept first"""
+        if not self.turns and not self.summary:
+            return "(no previous questions)"
+
+        sections = []
+        if self.earlier_tables:
+            sections.append(f"Tables used earlier: {', '.join(self.earlier_tables)}")
+        if self.summary:
+            sections.append("Earlier questions:\n" + "\n".join(self.summary))
+        used = self._tokens("\n".join(sections))
+
+        recent = []
+        for turn in reversed(self.turns):
+            text = self._turn_text(turn)
+            if used + self._tokens(text) > self.token_budget:
+                # Too long verbatim: fall back to the question alone
+                text = f"Q: {turn['question']}"
+                if used + self._tokens(text) > self.token_budget:
+                    break
+            recent.insert(0, text)
+            used += self._tokens(text)
+        if recent:
+            sections.append("Recent questions (oldest first):\n" + "\n\n".join(recent))
+        return "\n\n".join(sections)
+
+    def clear(self):
+        self.turns = []
+        self.summary = []
+        self.earlier_tables = []
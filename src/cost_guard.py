@@ -0,0 +1,160 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+def has_limit(sql_query: str) -> bool:
+    """True if the outermost query already ends with a LIMIT clause"""
+    sql_query = sql_query.strip().rstrip(';').rstrip()
+    return re.search(r"\bLIMIT\s+\d+(\s*(,|OFFSET)\s*\d+)?\s*$", sql_query, re.IGNORECASE) is not None
+
+
+def outer_limit(sql_query: str):
+    """Rows the outermost LIMIT lets through (count plus offset), or None without one"""
+    sql_query = sql_query.strip().rstrip(';').rstrip()
+    match = re.search(r"\bLIMIT\s+(\d+)(?:\s*(,|OFFSET)\s*(\d+))?\s*$", sql_query, re.IGNORECASE)
+    if match is None:
+        return None
+    if match.group(2) == ",":
+        # LIMIT offset, count
+        return int(match.group(1)) + int(match.group(3))
+    return int(match.group(1)) + int(match.group(3) or 0)
+
+
+def scan_limit(sql_query: str):
+    """Row cap of a query that stops reading once its LIMIT is filled, or None.
+
+    EXPLAIN's per-scan row estimates ignore LIMIT. Without ORDER BY, GROUP BY, DISTINCT
+    or aggregates the server stops scanning after that many rows, so the cap bounds the work.
+    """
+    if is_aggregate(sql_query) or re.search(r"\bORDER\s+BY\b|\bDISTINCT\b", sql_query, re.IGNORECASE):
+        return None
+    return outer_limit(sql_query)
+
+
+def add_limit(sql_query: str, limit: int) -> str:
+    """Append a LIMIT to a query that does not already end with one"""
+    sql_query = sql_query.strip().rstrip(';').rstrip()
+    if has_limit(sql_query):
+        return sql_query
+    return f"{sql_query}\nLIMIT {int(limit)}"
+
+
+def is_aggregate(sql_query: str) -> bool:
+    """True if the query aggregates or groups instead of returning raw rows"""
+    return re.search(r"\b(COUNT|SUM|AVG|MIN|MAX|GROUP_CONCAT)\s*\(|\bGROUP\s+BY\b", sql_query, re.IGNORECASE) is not None
+
+
+class CostGuard:
+    """Reads EXPLAIN FORMAT=JSON plans and flags queries that exceed the configured limits"""
+
+    ACTIONS = ("reject", "limit", "rewrite")
+
+    def __init__(self, max_estimated_rows: int = 10_000_000, max_scan_rows: int = 1_000_000,
+                 max_sort_rows: int = 1_000_000, action: str = "limit", auto_limit: int = 1000,
+                 huge_table_rows: int = 10_000_000):
+        if action not in self.ACTIONS:
+            raise ValueError(f"Unknown cost guard action: {action}")
+        self.max_estimated_rows = max_estimated_rows
+        self.max_scan_rows = max_scan_rows
+        self.max_sort_rows = max_sort_rows
+        self.action = action
+        self.auto_limit = auto_limit
+        self.huge_table_rows = huge_table_rows
+
+    def huge_tables(self, sql_query: str, table_rows: Dict[str, int]) -> List[str]:
+        """Tables read by the query whose profiled row count exceeds huge_table_rows"""
+        return [
+            table for table, rows in table_rows.items()
+            if rows > self.huge_table_rows and re.search(
+                rf"(\bFROM|\bJOIN|,)\s*`?{re.escape(table)}`?(?![\w$])", sql_query, re.IGNORECASE
+            )
+        ]
+
+    def cap_huge_tables(self, sql_query: str, table_rows: Dict[str, int]) -> Tuple[str, Optional[str]]:
+        """Raw rows from a huge table are always capped: the query with auto_limit added, and the action"""
+        if has_limit(sql_query) or is_aggregate(sql_query):
+            return sql_query, None
+        huge = self.huge_tables(sql_query, table_rows)
+        if not huge:
+            return sql_query, None
+        return add_limit(sql_query, self.auto_limit), f"added LIMIT {self.auto_limit} (huge tables: {', '.join(huge)})"
+
+    def settle(self, sql_query: str, plan: Dict, capped: bool = False) -> Tuple[str, Optional[str]]:
+        """Query to run despite the plan's violations and the action taken, or None for the action
+        when the query has to be rewritten or rejected.
+
+        A query capped by cap_huge_tables runs as capped, and under the "limit" action a
+        query that already has a LIMIT keeps it rather than being rejected.
+        """
+        if capped:
+            return sql_query, plan.get("action")
+        if self.action == "limit":
+            if has_limit(sql_query):
+                return sql_query, "kept existing LIMIT"
+            return add_limit(sql_query, self.auto_limit), f"added LIMIT {self.auto_limit}"
+        return sql_query, None
+
+    def _walk(self, node, tables: List[Dict], flags: Dict):
+        """Collect table accesses and sort/temporary flags from any depth of the plan"""
+        if isinstance(node, list):
+            for item in node:
+                self._walk(item, tables, flags)
+            return
+        if not isinstance(node, dict):
+            return
+
+        for key, value in node.items():
+            if key == "table" and isinstance(value, dict):
+                tables.append({
+                    "table": value.get("table_name"),
+                    "access_type": value.get("access_type"),
+                    "key": value.get("key"),
+                    "rows": int(value.get("rows_examined_per_scan") or 0),
+                    "join_buffer": value.get("using_join_buffer")
+                })
+            elif key == "using_filesort" and value:
+                flags["using_filesort"] = True
+            elif key == "using_temporary_table" and value:
+                flags["using_temporary"] = True
+            self._walk(value, tables, flags)
+
+    def analyze(self, explain_json: Dict, row_limit: int = None) -> Dict:
+        """Summarize a plan and list the limits it violates.
+
+        row_limit is the scan_limit of the query: reading stops after that many rows, so
+        the estimate is capped at it and full scans are not flagged.
+        """
+        tables = []
+        flags = {"using_filesort": False, "using_temporary": False}
+        self._walk(explain_json, tables, flags)
+
+        # Nested-loop estimate: every table is scanned once per row of the tables before it
+        estimated_rows = 1
+        for table in tables:
+            estimated_rows *= max(table["rows"], 1)
+        if not tables:
+            estimated_rows = 0
+        if row_limit is not None:
+            estimated_rows = min(estimated_rows, row_limit)
+
+        query_block = explain_json.get("query_block", {})
+        plan = {
+            "query_cost": query_block.get("cost_info", {}).get("query_cost"),
+            "estimated_rows": estimated_rows,
+            "row_limit": row_limit,
+            "tables": tables,
+            **flags
+        }
+
+        violations = []
+        if estimated_rows > self.max_estimated_rows:
+            violations.append(f"estimated {estimated_rows:,} rows examined (limit {self.max_estimated_rows:,})")
+        for table in tables if row_limit is None else []:
+            if table["access_type"] == "ALL" and table["rows"] > self.max_scan_rows:
+                violations.append(f"full table scan of {table['table']} (~{table['rows']:,} rows)")
+            if table["join_buffer"] and not table["key"] and table["rows"] > self.max_scan_rows:
+                violations.append(f"unindexed join to {table['table']} ({table['join_buffer']})")
+        if (flags["using_filesort"] or flags["using_temporary"]) and estimated_rows > self.max_sort_rows:
+            violations.append(f"filesort/temporary table over ~{estimated_rows:,} rows")
+
+        plan["violations"] = violations
+        return plan
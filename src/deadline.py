@@ -0,0 +1,77 @@
+import threading
+import time
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a request runs past its overall time budget"""
+
+
+class QueryCancelled(Exception):
+    """Raised when a request is cancelled before it finishes"""
+
+
+class Deadline:
+    """Wall-clock budget shared by every stage of one request"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def check(self, stage: str):
+        """Raise if the deadline passed before the given stage"""
+        if self.expired():
+            raise DeadlineExceeded(f"Request exceeded its {self.seconds:g}s deadline during {stage}")
+
+
+class CancelToken:
+    """Cancels a request from another thread, killing its running MySQL statement"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.cancelled = False
+        self._engine = None
+        self._thread_id = None
+
+    def attach(self, engine, thread_id: int):
+        """Register the MySQL connection currently executing for this request"""
+        with self._lock:
+            self._engine = engine
+            self._thread_id = thread_id
+            cancelled = self.cancelled
+        if cancelled:
+            self.kill_query()
+
+    def detach(self):
+        with self._lock:
+            self._engine = None
+            self._thread_id = None
+
+    def cancel(self):
+        """Mark the request cancelled and stop any statement still running on the server"""
+        with self._lock:
+            self.cancelled = True
+        self.kill_query()
+
+    def kill_query(self):
+        """Issue KILL QUERY for the attached connection from a separate connection"""
+        with self._lock:
+            engine, thread_id = self._engine, self._thread_id
+        if engine is None or thread_id is None:
+            return
+        try:
+            with engine.connect() as conn:
+                conn.exec_driver_sql(f"KILL QUERY {int(thread_id)}")
+            print(f"[CancelToken] Killed query on connection {thread_id}")
+        except Exception as e:
+            print(f"[CancelToken] Failed to kill query on connection {thread_id}: {e}")
+
+    def check(self, stage: str):
+        """Raise if the request was cancelled before the given stage"""
+        if self.cancelled:
+            raise QueryCancelled(f"Query cancelled during {stage}")
@@ -0,0 +1,231 @@
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional, Tuple
+from graphviz import Digraph
+from schema_graph import load_catalog
+
+class ErdService:
+    """Renders ERDs in the background and caches the PNGs on disk by schema fingerprint.
+
+    The cache directory is shared by every process that points at it, so the schema
+    builder and the query interface reuse each other's renders. While a changed
+    schema is re-rendering, the last good image is served.
+    """
+
+    def __init__(self, cache_dir: str = None, dpi: int = 300, render_timeout: float = 60, keep_versions: int = 3,
+                 metadata_ttl: float = 300):
+        self.cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), "erd_cache")
+        self.dpi = dpi
+        self.render_timeout = render_timeout
+        self.keep_versions = keep_versions
+        self.metadata_ttl = metadata_ttl
+        # schema -> (loaded_at, columns, relationships, fingerprint); spares the catalog queries on every rerun
+        self._metadata: Dict[str, Tuple[float, List, List, str]] = {}
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="erd")
+        self._pending = {}
+        self._errors: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _schema_dir(self, schema_name: str) -> str:
+        return os.path.join(self.cache_dir, schema_name)
+
+    def _image_path(self, schema_name: str, fingerprint: str) -> str:
+        return os.path.join(self._schema_dir(schema_name), f"{fingerprint}.png")
+
+    def load_metadata(self, engine, schema_name: str) -> Tuple[List, List]:
+        """Columns and foreign keys from INFORMATION_SCHEMA through the pooled engine"""
+        return load_catalog(engine, schema_name)
+
+    def _current(self, engine, schema_name: str) -> Tuple[List, List, str]:
+        """Catalog and fingerprint of a schema, reloaded only once the cached copy is older than metadata_ttl"""
+        with self._lock:
+            cached = self._metadata.get(schema_name)
+        if cached is not None and time.monotonic() - cached[0] < self.metadata_ttl:
+            return cached[1:]
+        columns, relationships = self.load_metadata(engine, schema_name)
+        fingerprint = self.fingerprint(columns, relationships)
+        with self._lock:
+            self._metadata[schema_name] = (time.monotonic(), columns, relationships, fingerprint)
+        return columns, relationships, fingerprint
+
+    def invalidate(self, schema_name: str = None):
+        """Forget the cached catalog of one schema, or of all, after a schema change"""
+        with self._lock:
+            if schema_name is None:
+                self._metadata.clear()
+            else:
+                self._metadata.pop(schema_name, None)
+
+    def fingerprint(self, columns: List, relationships: List) -> str:
+        """Hash of everything the diagram shows, plus the render settings"""
+        payload = json.dumps({"columns": columns, "relationships": relationships, "dpi": self.dpi}, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+    def build_source(self, columns: List, relationships: List) -> str:
+        """Graphviz source for the diagram"""
+        dot = Digraph("ERD", format="png")
+        dot.attr(
+            rankdir="LR",
+            splines="polyline",  # Changed from ortho to polyline for better label handling
+            nodesep="1.0",    # Increased node separation
+            ranksep="1.5",    # Increased rank separation
+            concentrate="false" # Disabled edge concentration for clearer labels
+        )
+
+        # Set global graph attributes for better quality
+        dot.attr('graph',
+            fontname="Arial",
+            fontsize="16",
+            pad="0.5",
+            dpi=str(self.dpi)
+        )
+
+        # Set node attributes
+        dot.attr('node',
+            fontname="Arial",
+            fontsize="12",
+            shape="none",
+            margin="0",
+            style="rounded"
+        )
+
+        # Set edge attributes
+        dot.attr('edge',
+            fontname="Arial",
+            fontsize="10",
+            len="1.5"
+        )
+
+        # Add tables and relationships
+        tables = {}
+        for table, column, column_type in columns:
+            if table not in tables:
+                tables[table] = []
+            tables[table].append(f"{column} ({column_type})")
+
+        # Create table nodes with enhanced HTML-like labels
+        for table, cols in tables.items():
+            label = f'''<<TABLE BORDER="0" CELLBORDER="1" CELLSPACING="0" CELLPADDING="8">
+                <TR><TD PORT="header" BGCOLOR="#E0E0E0"><FONT POINT-SIZE="14"><B>{table}</B></FONT></TD></TR>'''
+
+            for col in cols:
+                label += f'<TR><TD PORT="{col.split()[0]}" ALIGN="LEFT"><FONT POINT-SIZE="12">{col}</FONT></TD></TR>'
+            label += '</TABLE>>'
+
+            dot.node(table, label=label)
+
+        # Add relationships with improved styling
+        for table, column, ref_table, ref_column, *_ in relationships:
+            dot.edge(
+                f"{table}:{column}:e",
+                f"{ref_table}:{ref_column}:w",
+                dir="both",
+                arrowhead="crowodot",
+                arrowtail="teedot",
+                color="#666666",
+                penwidth="1.0"
+            )
+        return dot.source
+
+    def _render(self, schema_name: str, fingerprint: str, source: str):
+        """Run dot with a timeout and publish the PNG atomically"""
+        try:
+            result = subprocess.run(
+                ["dot", "-Tpng"], input=source.encode("utf-8"),
+                capture_output=True, timeout=self.render_timeout, check=True
+            )
+            os.makedirs(self._schema_dir(schema_name), exist_ok=True)
+            path = self._image_path(schema_name, fingerprint)
+            partial = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(partial, "wb") as f:
+                f.write(result.stdout)
+            os.replace(partial, path)
+            self._prune(schema_name)
+        except subprocess.TimeoutExpired:
+            self._errors[fingerprint] = f"ERD rendering timed out after {self.render_timeout:g}s"
+        except subprocess.CalledProcessError as e:
+            self._errors[fingerprint] = f"Graphviz failed: {e.stderr.decode('utf-8', 'replace').strip()}"
+        except Exception as e:
+            self._errors[fingerprint] = str(e)
+        finally:
+            with self._lock:
+                self._pending.pop(fingerprint, None)
+
+    def _prune(self, schema_name: str):
+        """Keep only the newest few renders per schema"""
+        images = sorted(glob.glob(os.path.join(self._schema_dir(schema_name), "*.png")), key=os.path.getmtime, reverse=True)
+        for path in images[self.keep_versions:]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _last_good(self, schema_name: str) -> Optional[str]:
+        images = glob.glob(os.path.join(self._schema_dir(schema_name), "*.png"))
+        return max(images, key=os.path.getmtime) if images else None
+
+    def get(self, engine, schema_name: str, wait: float = 0) -> Tuple[Optional[bytes], str, Optional[str]]:
+        """Current ERD as (png_bytes, state, error).
+
+        state is "ready" for the current schema, "stale" when an older image is shown
+        while the new one renders, "rendering" when there is nothing to show yet and
+        "failed" when rendering the current schema failed.
+        """
+        columns, relationships, fingerprint = self._current(engine, schema_name)
+        path = self._image_path(schema_name, fingerprint)
+
+        if not os.path.exists(path) and fingerprint not in self._errors:
+            with self._lock:
+                future = self._pending.get(fingerprint)
+                if future is None:
+                    future = self._executor.submit(
+                        self._render, schema_name, fingerprint, self.build_source(columns, relationships)
+                    )
+                    self._pending[fingerprint] = future
+            if wait > 0:
+                try:
+                    future.result(timeout=wait)
+                except FutureTimeoutError:
+                    pass
+
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                return f.read(), "ready", None
+
+        error = self._errors.get(fingerprint)
+        last_good = self._last_good(schema_name)
+        if last_good:
+            with open(last_good, "rb") as f:
+                return f.read(), "failed" if error else "stale", error
+        return None, "failed" if error else "rendering", error
+
+    def retry(self, engine, schema_name: str):
+        """Forget a failed render so the next get() tries again"""
+        _, _, fingerprint = self._current(engine, schema_name)
+        self._errors.pop(fingerprint, None)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_erd_service() -> ErdService:
+    """Process-wide service configured from the environment"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = ErdService(
+                cache_dir=os.getenv("ERD_CACHE_DIR"),
+                dpi=int(os.getenv("ERD_DPI", "300")),
+                render_timeout=float(os.getenv("ERD_RENDER_TIMEOUT", "60")),
+                metadata_ttl=float(os.getenv("ERD_METADATA_TTL_SECONDS", "300"))
+            )
+        return _service
@@ -0,0 +1,174 @@
+import re
+from typing import Dict, List, Optional
+import pandas as pd
+from query_executor import quote_identifier
+
+_FILLER = r"(?:the\s+|all\s+(?:the\s+)?)?"
+_TABLE_SUFFIX = r"(?:\s+(?:table|records|rows|entries))?"
+
+_COUNT = re.compile(
+    rf"^(?:how\s+many|count(?:\s+the)?|(?:what\s+is\s+the\s+)?(?:total\s+)?number\s+of)\s+"
+    rf"(?:rows|records|entries)?\s*(?:in|of)?\s*{_FILLER}(?P<table>.+?){_TABLE_SUFFIX}"
+    rf"(?:\s+(?:are\s+there|do\s+we\s+have|exist|there\s+are))?$"
+)
+_FIRST_ROWS = re.compile(
+    rf"^(?:show|list|display|give|get|fetch)(?:\s+me)?\s+(?:the\s+)?(?:(?P<first>first|some|sample)\s+)?"
+    rf"(?P<limit>\d+)?\s*(?:(?:rows|records)\s+(?:of|from)\s+|(?P<columns>.+?)\s+(?:of|from|for)\s+)?{_FILLER}(?P<table>.+?){_TABLE_SUFFIX}$"
+)
+# Words that ask for an ordering the fast path cannot know, so the LLM has to write the ORDER BY
+_RANKING = re.compile(
+    r"\b(?:top|bottom|best|worst|most|least|highest|lowest|largest|smallest|biggest|"
+    r"latest|newest|oldest|earliest|recent|last)\b"
+)
+_COLUMNS = re.compile(
+    rf"^(?:(?:list|show|display|what\s+are)(?:\s+me)?\s+(?:the\s+)?(?:columns|fields)\s+(?:of|in)\s+|describe\s+)"
+    rf"{_FILLER}(?P<table>.+?){_TABLE_SUFFIX}$"
+)
+
+
+def _singular(word: str) -> str:
+    if word.endswith("ies") and len(word) > 3:
+        return word[:-3] + "y"
+    if word.endswith(("ses", "xes", "ches", "shes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def _plural(word: str) -> str:
+    if word.endswith("y") and len(word) > 1 and word[-2] not in "aeiou":
+        return word[:-1] + "ies"
+    if word.endswith(("s", "x", "ch", "sh")):
+        return word + "es"
+    return word + "s"
+
+
+def name_variants(name: str) -> set:
+    """Lower-case spellings a user might use for a table or column name"""
+    spaced = " ".join(name.lower().replace("_", " ").split())
+    variants = set()
+    for form in {name.lower(), spaced}:
+        head, _, last = form.rpartition(" ")
+        prefix = f"{head} " if head else ""
+        variants |= {form, prefix + _singular(last), prefix + _plural(_singular(last))}
+    return variants
+
+
+class IntentMatcher:
+    """Compiles trivially templatable questions straight to SQL from the schema catalog.
+
+    Table and column synonyms come from their names (spaced, singular and plural) and
+    from short comments. A question only matches when the whole phrase resolves to
+    exactly one table, so anything less certain is left to the LLM.
+    """
+
+    def __init__(self, tables: List[Dict], schema_name: str = None, default_rows: int = 10, max_rows: int = 1000):
+        self.schema_name = schema_name
+        self.default_rows = default_rows
+        self.max_rows = max_rows
+        self._table_synonyms: Dict[str, set] = {}
+        self._column_synonyms: Dict[str, Dict[str, set]] = {}
+
+        for table in tables:
+            name = table["table"]
+            synonyms = name_variants(name)
+            description = (table.get("description") or "").strip().rstrip(".")
+            if description and len(description.split()) <= 3:
+                synonyms |= name_variants(description)
+            for synonym in synonyms:
+                self._table_synonyms.setdefault(synonym, set()).add(name)
+
+            column_synonyms = {}
+            for column in table.get("columns", []):
+                variants = name_variants(column["name"])
+                comment = (column.get("description") or "").strip().rstrip(".")
+                if comment and len(comment.split()) <= 3:
+                    variants |= name_variants(comment)
+                for variant in variants:
+                    column_synonyms.setdefault(variant, set()).add(column["name"])
+            self._column_synonyms[name] = column_synonyms
+
+    def _table(self, phrase: str) -> Optional[str]:
+        """The single table a phrase names, or None when unknown or ambiguous"""
+        tables = self._table_synonyms.get(" ".join(phrase.split()))
+        return next(iter(tables)) if tables and len(tables) == 1 else None
+
+    def _columns(self, table: str, phrase: str) -> Optional[List[str]]:
+        """Columns of a table named in a list like "name and email", or None if any part is unknown"""
+        columns = []
+        for part in re.split(r"\s*,\s*|\s+and\s+", phrase):
+            part = re.sub(r"^(?:the|their|its)\s+", "", part.strip())
+            if not part:
+                continue
+            # "customer names" -> "names" when the table name prefixes the column
+            candidates = self._column_synonyms[table].get(part)
+            if not candidates:
+                for variant in name_variants(table):
+                    if part.startswith(variant + " "):
+                        candidates = self._column_synonyms[table].get(part[len(variant) + 1:])
+                        break
+            if not candidates or len(candidates) != 1:
+                return None
+            columns.append(next(iter(candidates)))
+        return list(dict.fromkeys(columns)) or None
+
+    def match(self, question: str) -> Optional[Dict]:
+        """Intent with compiled SQL, or None when the question is not a confident match"""
+        text = " ".join(question.lower().strip().rstrip("?.!").split())
+
+        match = _COLUMNS.match(text)
+        if match and self._table(match.group("table")):
+            table = self._table(match.group("table"))
+            schema = f"'{self.schema_name}'" if self.schema_name else "DATABASE()"
+            return {
+                "intent": "columns",
+                "table": table,
+                "sql": (
+                    "SELECT COLUMN_NAME AS `column`, COLUMN_TYPE AS `type`, IS_NULLABLE AS `nullable`, "
+                    "COLUMN_KEY AS `key`, COLUMN_COMMENT AS `comment`\n"
+                    "FROM INFORMATION_SCHEMA.COLUMNS\n"
+                    f"WHERE TABLE_SCHEMA = {schema} AND TABLE_NAME = '{table}'\n"
+                    "ORDER BY ORDINAL_POSITION"
+                )
+            }
+
+        match = _COUNT.match(text)
+        if match and self._table(match.group("table")):
+            table = self._table(match.group("table"))
+            return {
+                "intent": "count",
+                "table": table,
+                "sql": f"SELECT COUNT(*) AS row_count FROM {quote_identifier(table)}"
+            }
+
+        match = None if _RANKING.search(text) else _FIRST_ROWS.match(text)
+        if match and (match.group("first") or match.group("limit")) and self._table(match.group("table")):
+            table = self._table(match.group("table"))
+            columns = None
+            if match.group("columns"):
+                columns = self._columns(table, match.group("columns"))
+                if columns is None:
+                    return None
+            limit = min(int(match.group("limit") or self.default_rows), self.max_rows)
+            select = ", ".join(quote_identifier(column) for column in columns) if columns else "*"
+            return {
+                "intent": "first_rows",
+                "table": table,
+                "limit": limit,
+                "sql": f"SELECT {select} FROM {quote_identifier(table)} LIMIT {limit}"
+            }
+        return None
+
+    def answer(self, intent: Dict, result: pd.DataFrame) -> str:
+        """Templated natural-language answer for a fast-path result"""
+        table = intent["table"]
+        if intent["intent"] == "count":
+            count = int(result.iloc[0, 0]) if len(result) else 0
+            return f"The {table} table has {count:,} row{'' if count == 1 else 's'}."
+        if intent["intent"] == "columns":
+            names = ", ".join(str(name) for name in result["column"]) if len(result) else ""
+            return f"The {table} table has {len(result)} column{'' if len(result) == 1 else 's'}: {names}."
+        if not len(result):
+            return f"The {table} table is empty."
+        return f"Here {'is' if len(result) == 1 else 'are'} the first {len(result):,} row{'' if len(result) == 1 else 's'} of {table}."
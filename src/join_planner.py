@@ -0,0 +1,96 @@
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+from schema_graph import SchemaGraph
+
+class JoinPlanner:
+    """Finds the tables and FK conditions needed to join a set of tables.
+
+    Shortest paths are cached per source table, so all-pairs paths fill in lazily
+    as questions touch different tables instead of being computed up front.
+    """
+
+    def __init__(self, graph: SchemaGraph, max_hops: int = 3):
+        self.graph = graph
+        self.max_hops = max_hops
+        self._trees: Dict[str, Dict[str, Tuple[Optional[str], Optional[Tuple]]]] = {}
+
+    def _tree(self, source: str) -> Dict[str, Tuple[Optional[str], Optional[Tuple]]]:
+        """BFS tree from source: node -> (parent towards source, foreign key to the parent)"""
+        if source not in self._trees:
+            tree = {source: (None, None)}
+            depth = {source: 0}
+            queue = deque([source])
+            while queue:
+                table = queue.popleft()
+                if depth[table] == self.max_hops:
+                    continue
+                for neighbour, foreign_keys in self.graph.adjacency.get(table, {}).items():
+                    if neighbour not in tree:
+                        tree[neighbour] = (table, foreign_keys[0])
+                        depth[neighbour] = depth[table] + 1
+                        queue.append(neighbour)
+            self._trees[source] = tree
+        return self._trees[source]
+
+    def path(self, source: str, target: str) -> Optional[List[Tuple[str, Tuple]]]:
+        """Steps from target back to source as (table, foreign key joining it), or None if too far apart"""
+        tree = self._tree(source)
+        if target not in tree:
+            return None
+        steps = []
+        node = target
+        while tree[node][0] is not None:
+            parent, edge = tree[node]
+            steps.append((parent, edge))
+            node = parent
+        return steps
+
+    def connect(self, tables: List[str]) -> Dict:
+        """Greedy Steiner tree: repeatedly attach the closest remaining table by its shortest path"""
+        tables = [table for table in dict.fromkeys(tables) if table in self.graph.adjacency]
+        if not tables:
+            return {"tables": [], "bridges": [], "joins": [], "unreachable": []}
+
+        joined = [tables[0]]
+        joins = []
+        remaining = tables[1:]
+        unreachable = []
+        while remaining:
+            best = None
+            for target in remaining:
+                tree = self._tree(target)
+                for table in joined:
+                    if table in tree:
+                        steps = self.path(target, table)
+                        if best is None or len(steps) < len(best[2]):
+                            best = (target, table, steps)
+            if best is None:
+                unreachable.extend(remaining)
+                break
+
+            target, _, steps = best
+            remaining.remove(target)
+            # Steps lead from the joined table back to the target, each adding one new table
+            for new_table, edge in steps:
+                if new_table not in joined:
+                    joined.append(new_table)
+                    joins.append((new_table, edge))
+
+        return {
+            "tables": joined,
+            "bridges": [table for table in joined if table not in tables],
+            "joins": joins,
+            "unreachable": unreachable
+        }
+
+    def skeleton(self, plan: Dict) -> str:
+        """FROM/JOIN clause with the exact FK conditions, every column pair of a composite key included"""
+        if not plan["tables"]:
+            return ""
+        lines = [f"FROM {plan['tables'][0]}"]
+        for new_table, foreign_key in plan["joins"]:
+            condition = " AND ".join(
+                f"{table}.{column} = {ref_table}.{ref_column}" for table, column, ref_table, ref_column in foreign_key
+            )
+            lines.append(f"JOIN {new_table} ON {condition}")
+        return "\n".join(lines)
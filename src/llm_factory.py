@@ -1,5 +1,6 @@
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_openai import ChatOpenAI
+from replay_llm import ReplayChatModel
 import os
 
 class LLMFactory:
@@ -21,5 +22,18 @@ class LLMFactory:
                 max_retries=2,
                 streaming=True
             )
+        elif provider == "replay":
+            # Offline stand-in that replays (and optionally records) prompt/response pairs
+            mode = os.getenv("LLM_REPLAY_MODE", "replay")
+            recorder = None
+            if mode != "replay":
+                recorder = LLMFactory.create_llm(os.getenv("LLM_RECORD_PROVIDER", "gemini"))
+            return ReplayChatModel(
+                store_path=os.getenv("LLM_REPLAY_STORE", "./llm_recordings/recordings.jsonl"),
+                mode=mode,
+                recorder=recorder,
+                latency=float(os.getenv("LLM_REPLAY_LATENCY", "0")),
+                tokens_per_second=float(os.getenv("LLM_REPLAY_TOKENS_PER_SECOND", "0"))
+            )
         else:
             raise ValueError(f"Unsupported LLM provider: {provider}") 
\ No newline at end of file
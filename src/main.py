@@ -1,9 +1,67 @@
+import argparse
+import json
 import os
+import sys
+from contextlib import redirect_stdout
 from dotenv import load_dotenv
 from schema_manager import SchemaManager
 from chatbot import DBChatbot
 
-def main():
+def parse_args():
+    parser = argparse.ArgumentParser(description="Ask questions about your database from the command line")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="Answer the questions in FILE (one per line, '-' for stdin) and print JSONL results")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Maximum number of questions processed at once in batch mode")
+    parser.add_argument("--output", metavar="FILE",
+                        help="Write JSONL results to FILE instead of stdout")
+    parser.add_argument("--llm-provider", default="gemini",
+                        help="LLM provider: gemini, sambanova, or replay for recorded offline responses")
+    return parser.parse_args()
+
+def read_questions(path):
+    """Read one question per line, skipping blank lines and # comments"""
+    handle = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        return [line.strip() for line in handle if line.strip() and not line.strip().startswith("#")]
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+def to_jsonl_record(index, question, result):
+    """Flatten a query result into a JSON-serializable record"""
+    data = result.get("data")
+    record = {
+        "index": index,
+        "question": question,
+        "success": result["success"],
+        "sql_query": result.get("sql_query"),
+        "fingerprint": result.get("fingerprint"),
+        "fast_path": result.get("fast_path"),
+        "response": result.get("response"),
+        "error": result.get("error"),
+        "row_count": len(data) if data is not None else None,
+        "columns": list(data.columns) if data is not None else None,
+        "timings": result.get("timings", {})
+    }
+    if result.get("plan"):
+        record["plan"] = result["plan"]
+    return record
+
+def run_batch(chatbot, args, stdout):
+    """Answer a file of questions concurrently, streaming one JSON line per finished question"""
+    questions = read_questions(args.batch)
+    output = open(args.output, "w", encoding="utf-8") if args.output else stdout
+    try:
+        for index, result in chatbot.iter_query_many(questions, max_concurrency=args.concurrency):
+            record = to_jsonl_record(index, questions[index], result)
+            output.write(json.dumps(record, default=str) + "\n")
+            output.flush()
+    finally:
+        if output is not stdout:
+            output.close()
+
+def create_chatbot(llm_provider="gemini"):
     load_dotenv()
     
     # Initialize SchemaManager
@@ -16,7 +74,19 @@ def main():
         schema_manager.update_vector_store()
     
     # Initialize chatbot
-    chatbot = DBChatbot(schema_manager)
+    return DBChatbot(schema_manager, llm_provider)
+
+def main():
+    args = parse_args()
+    if args.batch:
+        # Keep stdout clean for JSONL; diagnostic prints go to stderr
+        stdout = sys.stdout
+        with redirect_stdout(sys.stderr):
+            chatbot = create_chatbot(args.llm_provider)
+            run_batch(chatbot, args, stdout)
+        return
+    
+    chatbot = create_chatbot(args.llm_provider)
     
     # Example usage
     while True:
@@ -32,4 +102,4 @@ def main():
             print("\nError:", result["error"])
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main() 
@@ -7,11 +7,22 @@ import streamlit as st
 from dotenv import load_dotenv
 from schema_manager import SchemaManager
 from chatbot import DBChatbot
+from deadline import CancelToken, Deadline
+from chat_history_store import ChatHistoryStore
+from chart_builder import ChartBuilder
+from result_exporter import ResultExporter
+from erd_service import get_erd_service
+from schema_browser import SchemaIndex, render_schema_browser
 import pandas as pd
-import plotly.express as px
 from streamlit_lottie import st_lottie
 import requests
-import tempfile
+import json
+import threading
+import time
+import math
+
+# Loaded before any decorator below reads its settings from the environment
+load_dotenv()
 
 # Custom CSS for better styling
 def load_css():
@@ -187,21 +198,41 @@ def load_css():
         </style>
     """, unsafe_allow_html=True)
 
+@st.cache_data(ttl=24 * 3600, show_spinner=False)
 def load_lottie_url(url: str):
-    r = requests.get(url)
+    r = requests.get(url, timeout=5)
     if r.status_code != 200:
         return None
     return r.json()
 
+def log_render_time(name, started):
+    """Print how long a part of the page took when RENDER_TIMINGS is set"""
+    if os.getenv("RENDER_TIMINGS"):
+        print(f"[render] {name}: {(time.perf_counter() - started) * 1000:.0f} ms")
+
 def initialize_session_state():
     if 'chat_history' not in st.session_state:
         st.session_state.chat_history = []
     
     if 'base_schema_manager' not in st.session_state:
-        load_dotenv()
         db_url = os.getenv("DATABASE_CONNECTION_URL")
         st.session_state.base_schema_manager = SchemaManager(db_url)
     
+    if 'history_store' not in st.session_state:
+        # Full results live on disk; chat messages keep only a preview
+        st.session_state.history_store = ChatHistoryStore(
+            base_dir=os.getenv("CHAT_HISTORY_DIR"),
+            memory_budget_bytes=int(os.getenv("CHAT_HISTORY_MEMORY_MB", "256")) * 1024 * 1024,
+            preview_rows=int(os.getenv("CHAT_HISTORY_PREVIEW_ROWS", "20"))
+        )
+    
+    if 'chart_builder' not in st.session_state:
+        st.session_state.chart_builder = ChartBuilder(
+            max_points=int(os.getenv("CHART_MAX_POINTS", "2000")),
+            top_n=int(os.getenv("CHART_TOP_CATEGORIES", "30")),
+            bins=int(os.getenv("CHART_HISTOGRAM_BINS", "50"))
+        )
+    
     # Add schema selection if not already set
     if 'schema_name' not in st.session_state:
         available_schemas = st.session_state.base_schema_manager.get_available_schemas()
@@ -350,79 +381,480 @@ def initialize_session_state():
             st.session_state.chatbot = DBChatbot(schema_manager, llm_provider)
             st.session_state.schema_info = schema_manager.get_schema_info()
 
+def render_load_more(message, key):
+    """Offer to pull the next batch of rows from a streamed result"""
+    result_handle = message.get("result_handle")
+    if result_handle is None or result_handle.exhausted:
+        return
+    
+    st.caption(f"Fetched the first {message['row_count']:,} rows. More rows are available.")
+    if st.button("⬇️ Load more rows", key=key):
+        more = result_handle.fetch()
+        history_store = st.session_state.history_store
+        data = pd.concat([history_store.get(message["result_key"]), more], ignore_index=True)
+        history_store.put(data, key=message["result_key"])
+        message["row_count"] = len(data)
+        message.pop("chart", None)
+        st.rerun(scope="fragment")
+
+def render_plan(plan):
+    """Show the EXPLAIN summary the cost guard attached to a result"""
+    if not plan:
+        return
+    
+    with st.expander("🧭 View Execution Plan", expanded=False):
+        if plan.get("action"):
+            st.warning(f"Cost guard: {plan['action']}")
+        for violation in plan.get("original_violations", plan.get("violations", [])):
+            st.caption(f"⚠️ {violation}")
+        flags = [name for name in ("using_filesort", "using_temporary") if plan.get(name)]
+        st.caption(
+            f"Estimated rows examined: {plan['estimated_rows']:,}"
+            + (f" | Query cost: {plan['query_cost']}" if plan.get("query_cost") else "")
+            + (f" | {', '.join(flags)}" if flags else "")
+        )
+        if plan.get("tables"):
+            st.dataframe(pd.DataFrame(plan["tables"]), use_container_width=True, hide_index=True)
+
+def store_result(message, data):
+    """Spill the full result to the history store and keep only a preview on the message"""
+    history_store = st.session_state.history_store
+    message["data"] = history_store.preview(data)
+    message["row_count"] = len(data)
+    if not data.empty:
+        message["result_key"] = history_store.put(data)
+
+@st.cache_data(ttl=300, max_entries=64, show_spinner=False)
+def fetch_result_page(schema_name, sql_query, page_number, page_size, sort_column, descending):
+    """One page of a result re-queried from the database; repeated reruns reuse it"""
+    chatbot = st.session_state.chatbot
+    return chatbot.executor.page(
+        sql_query, page_number, page_size, sort_column, descending,
+        deadline=Deadline(chatbot.deadline_seconds)
+    )
+
+def render_result_pager(message, key):
+    """Page through a large result, sending only the visible page to the browser"""
+    page_size = int(os.getenv("RESULT_PAGE_SIZE", "100"))
+    columns = list(message["data"].columns)
+    
+    # Rows still waiting on an open cursor are only reachable by asking the database again
+    result_handle = message.get("result_handle")
+    on_server = result_handle is not None and not result_handle.exhausted
+    total_rows = message.get("total_rows") if on_server else message["row_count"]
+    
+    sort_col, order_col, page_col = st.columns([2, 1, 1])
+    with sort_col:
+        sort_index = st.selectbox(
+            "Sort by", [None] + list(range(len(columns))), key=f"sort_{key}",
+            format_func=lambda i: "Query order" if i is None else str(columns[i])
+        )
+    with order_col:
+        descending = st.selectbox("Order", ["Ascending", "Descending"], key=f"order_{key}") == "Descending"
+    with page_col:
+        page_count = math.ceil(total_rows / page_size) if total_rows else None
+        page_number = st.number_input("Page", min_value=1, max_value=page_count, value=1, key=f"page_{key}") - 1
+    
+    if on_server:
+        if total_rows is None and st.button("🔢 Count all rows", key=f"count_{key}"):
+            chatbot = st.session_state.chatbot
+            try:
+                message["total_rows"] = chatbot.executor.count(message["sql"], deadline=Deadline(chatbot.deadline_seconds))
+            except Exception as e:
+                # The count wraps the query in a derived table too, so it fails the same way as paging
+                st.warning(f"Could not count the rows on the server ({e}).")
+            else:
+                st.rerun(scope="fragment")
+        try:
+            page = fetch_result_page(
+                st.session_state.schema_name, message["sql"], page_number, page_size,
+                None if sort_index is None else sort_index + 1, descending
+            )
+        except Exception as e:
+            # e.g. duplicate column names cannot be wrapped in a derived table
+            st.warning(f"Could not page on the server ({e}); showing fetched rows only.")
+            on_server = False
+    
+    if not on_server:
+        data = st.session_state.history_store.get(message["result_key"])
+        if sort_index is not None:
+            order = data.iloc[:, sort_index].sort_values(ascending=not descending, kind="stable").index
+            data = data.loc[order]
+        page = data.iloc[page_number * page_size:(page_number + 1) * page_size]
+        total_rows = len(data)
+    
+    first_row = page_number * page_size + 1
+    if page.empty:
+        st.caption("No rows on this page.")
+    else:
+        st.caption(
+            f"Rows {first_row:,}-{first_row + len(page) - 1:,}"
+            + (f" of {total_rows:,}" if total_rows else "")
+        )
+    return page
+
+def message_chart(message):
+    """Build a message's chart over its whole result once; reruns reuse the cached figure"""
+    if "chart" not in message:
+        chatbot = st.session_state.chatbot
+        result_handle = message.get("result_handle")
+        try:
+            message["chart"] = st.session_state.chart_builder.build(
+                st.session_state.history_store.get(message["result_key"]),
+                executor=chatbot.executor,
+                sql_query=message["sql"],
+                on_server=result_handle is not None and not result_handle.exhausted,
+                deadline=Deadline(chatbot.deadline_seconds)
+            )
+        except Exception as e:
+            print(f"Chart generation failed: {e}")
+            message["chart"] = None
+    return message["chart"]
+
+def render_result_data(message, key):
+    """Show a result's rows and chart, reading the full result back only when asked for"""
+    with st.expander("📊 View Data & Visualizations", expanded=False):
+        data = message["data"]
+        result_handle = message.get("result_handle")
+        if message["row_count"] > len(data) or (result_handle is not None and not result_handle.exhausted):
+            if st.toggle("Browse all rows", key=f"browse_{key}"):
+                data = render_result_pager(message, key)
+            else:
+                st.caption(f"Previewing {len(data):,} of {message['row_count']:,} fetched rows.")
+        
+        col1, col2 = st.columns([2, 1])
+        with col1:
+            st.dataframe(
+                data,
+                use_container_width=True,
+                hide_index=True
+            )
+            render_load_more(message, key=f"load_more_{key}")
+        
+        with col2:
+            fig = message_chart(message)
+            if fig is not None:
+                st.plotly_chart(fig, use_container_width=True)
+        
+        render_export(message, key)
+
+def result_exporter():
+    """Per-session exporter on the current chatbot's executor"""
+    chatbot = st.session_state.chatbot
+    exporter = st.session_state.get("result_exporter")
+    if exporter is None or exporter.executor is not chatbot.executor:
+        exporter = ResultExporter(
+            chatbot.executor,
+            session_id=st.session_state.history_store.session_id,
+            base_dir=os.getenv("EXPORT_DIR"),
+            chunk_size=int(os.getenv("EXPORT_CHUNK_SIZE", "50000"))
+        )
+        st.session_state.result_exporter = exporter
+    return exporter
+
+def render_export(message, key):
+    """Re-run the answer's SQL on a server-side cursor and stream every row to a file"""
+    format_col, button_col = st.columns([2, 1])
+    with format_col:
+        file_format = st.radio(
+            "Export format", ResultExporter.FORMATS, horizontal=True,
+            format_func=str.upper, key=f"export_format_{key}"
+        )
+    with button_col:
+        start = st.button("📤 Export all rows", key=f"export_{key}")
+    
+    if start:
+        result_handle = message.get("result_handle")
+        on_server = result_handle is not None and not result_handle.exhausted
+        total_rows = message.get("total_rows") if on_server else message["row_count"]
+        progress = st.progress(0.0, text="Exporting...")
+        
+        def report(rows):
+            if total_rows:
+                progress.progress(min(rows / total_rows, 1.0), text=f"Exported {rows:,} of {total_rows:,} rows")
+            else:
+                progress.progress(0.0, text=f"Exported {rows:,} rows")
+        
+        try:
+            message["export"] = result_exporter().export(
+                message["sql"], file_format,
+                deadline=Deadline(float(os.getenv("EXPORT_DEADLINE_SECONDS", "600"))),
+                progress_callback=report
+            )
+        except Exception as e:
+            st.error(f"Export failed: {e}")
+        progress.empty()
+    
+    export = message.get("export")
+    if export and os.path.exists(export["path"]):
+        st.caption(f"✅ Exported {export['rows']:,} rows ({export['bytes'] / 1024 / 1024:.1f} MB) to `{export['path']}`")
+        # The browser download is served from memory, so very large files stay on disk only
+        if export["bytes"] <= int(os.getenv("EXPORT_DOWNLOAD_MAX_MB", "200")) * 1024 * 1024:
+            with open(export["path"], "rb") as f:
+                st.download_button(
+                    f"⬇️ Download {export['format'].upper()}", f,
+                    file_name=os.path.basename(export["path"]),
+                    mime="text/csv" if export["format"] == "csv" else "application/vnd.apache.parquet",
+                    key=f"download_{key}"
+                )
+        else:
+            st.caption("Too large to download through the browser; collect it from the server path above.")
+
+def release_result_handles():
+    """Close open server-side cursors held by older messages"""
+    for message in st.session_state.chat_history:
+        result_handle = message.pop("result_handle", None)
+        if result_handle is not None:
+            result_handle.close()
+
+def cancel_active_query():
+    """Cancel callback; kills the statement of the question that is still running, if any"""
+    cancel_token = st.session_state.get("active_cancel_token")
+    if cancel_token is not None:
+        cancel_token.cancel()
+
+def render_cancel_button():
+    """Cancel control, drawn outside the chat fragment.
+
+    A click inside a fragment requests a fragment rerun, which does not interrupt the
+    fragment run that is polling the query. A click out here requests a full rerun,
+    which does, and the polling loop's cleanup then cancels the query.
+    """
+    st.button("⏹️ Cancel running query", key="cancel_query", on_click=cancel_active_query,
+              help="Stops the question that is currently running")
+
+def run_query_with_cancel(prompt):
+    """Run the chatbot on a worker thread so a Cancel click can kill the running query"""
+    chatbot = st.session_state.chatbot
+    cancel_token = CancelToken()
+    st.session_state.active_cancel_token = cancel_token
+    outcome = {}
+    worker = threading.Thread(
+        target=lambda: outcome.update(result=chatbot.query(prompt, cancel_token=cancel_token, defer_response=True)),
+        daemon=True
+    )
+    
+    status = st.empty()
+    started = time.perf_counter()
+    worker.start()
+    try:
+        # The worker stops soon after the token is cancelled, so the loop ends with its error result
+        while worker.is_alive():
+            status.caption(f"🤔 Thinking... {time.perf_counter() - started:.0f}s")
+            worker.join(timeout=0.25)
+    finally:
+        st.session_state.pop("active_cancel_token", None)
+        if worker.is_alive():
+            cancel_token.cancel()
+            st.session_state.chat_history.append({
+                "role": "assistant",
+                "content": "⏹️ Query cancelled",
+                "data": pd.DataFrame()
+            })
+    status.empty()
+    return outcome["result"]
+
+@st.fragment(run_every=float(os.getenv("SUMMARY_POLL_SECONDS", "1")))
+def render_pending_answer(message):
+    """Answer text that fills in once its background summary finishes; the rows are already shown"""
+    future = message.get("response_future")
+    if future is not None and future.done():
+        try:
+            message["content"] = future.result()
+        except Exception as e:
+            message["content"] = f"⚠️ Could not write a summary: {e}"
+        message.pop("response_future", None)
+    
+    if message.get("response_future") is not None:
+        st.caption("📝 Writing the summary...")
+    else:
+        st.write(message["content"])
+
 def display_chat_history():
     for i, message in enumerate(st.session_state.chat_history):
         with st.chat_message(message["role"]):
-            st.write(message["content"])
+            if message.get("response_future") is not None:
+                render_pending_answer(message)
+            else:
+                st.write(message["content"])
             
             # For assistant messages, show SQL and results immediately after the response
             if message["role"] == "assistant" and "sql" in message:
                 with st.expander("🔍 View SQL Query", expanded=False):
                     st.code(message["sql"], language="sql")
+                render_plan(message.get("plan"))
                 
                 if "data" in message and not message["data"].empty:
-                    with st.expander("📊 View Data & Visualizations", expanded=False):
-                        col1, col2 = st.columns([2, 1])
-                        with col1:
-                            st.dataframe(
-                                message["data"],
-                                use_container_width=True,
-                                hide_index=True
-                            )
-                        
-                        with col2:
-                            try:
-                                numeric_cols = message["data"].select_dtypes(include=['float64', 'int64']).columns
-                                if len(numeric_cols) >= 1:
-                                    fig = px.bar(message["data"], 
-                                               x=message["data"].columns[0], 
-                                               y=numeric_cols[0],
-                                               title="Data Visualization")
-                                    fig.update_layout(
-                                        plot_bgcolor='rgba(0,0,0,0)',
-                                        paper_bgcolor='rgba(0,0,0,0)',
-                                        font=dict(color='white')
-                                    )
-                                    st.plotly_chart(fig, use_container_width=True)
-                            except Exception:
-                                pass
+                    render_result_data(message, key=i)
 
-def display_schema_viewer():
-    with st.expander("📚 Database Schema Browser"):
-        # Single line legend
-        st.markdown("""
-        <div class='schema-legend'>
-            <span class='legend-item'>📋 Table</span>
-            <span class='legend-item'>🔑 Primary Key</span>
-            <span class='legend-item'>🔗 Foreign Key</span>
-            <span class='legend-item'>📝 Column</span>
-            <span class='legend-item'>🔢 Type</span>
-        </div>
-        """, unsafe_allow_html=True)
+@st.fragment
+def chat_panel():
+    """Chat input, history and answers; reruns on its own without redrawing the static panels"""
+    started = time.perf_counter()
+    prompt = st.chat_input("Ask a question about your database...")
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    # Scrollable chat history
+    st.markdown('<div class="chat-history-container">', unsafe_allow_html=True)
+    display_chat_history()
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    # Handle chat input
+    if prompt:
+        # Display user message
+        with st.chat_message("user"):
+            st.write(prompt)
+        st.session_state.chat_history.append({"role": "user", "content": prompt})
         
-        # Display tables
-        for table in st.session_state.schema_info:
-            st.markdown(f"""
-            <div class='table-card-compact'>
-                <div class='table-header'>📋 {table['table_name']}</div>
-                <div class='column-list-compact'>
-            """, unsafe_allow_html=True)
-            
-            for col in table['columns']:
-                col_name = f"📝 {col['name']}"
-                if col['primary_key']:
-                    col_name += " 🔑"
-                if col['foreign_key']['is_fk']:
-                    col_name += " 🔗"
+        # Get and display assistant response
+        with st.chat_message("assistant"):
+            with st.spinner("🤔 Thinking..."):
+                result = run_query_with_cancel(prompt)
+                
+                if result["success"]:
+                    # Store response data
+                    response_data = {
+                        "role": "assistant",
+                        "content": result["response"] or "",
+                        "sql": result["sql_query"],
+                        "plan": result.get("plan")
+                    }
+                    if result.get("response_future") is not None:
+                        response_data["response_future"] = result["response_future"]
+                    store_result(response_data, result["data"])
                     
-                st.markdown(f"""
-                    <div class='column-item'>
-                        <span class='column-name'>{col_name}</span>
-                        <span class='column-type'>🔢 {col['type']}</span>
-                    </div>
-                """, unsafe_allow_html=True)
-            
-            st.markdown("</div></div>", unsafe_allow_html=True)
+                    # Only the latest answer keeps its cursor open for "Load more rows"
+                    release_result_handles()
+                    if result.get("result_handle") is not None:
+                        response_data["result_handle"] = result["result_handle"]
+                    
+                    # Display response; rows below show while a deferred answer is still being written
+                    if "response_future" in response_data:
+                        render_pending_answer(response_data)
+                    else:
+                        st.write(response_data["content"])
+                    
+                    # Display SQL query
+                    with st.expander("🔍 View SQL Query", expanded=False):
+                        st.code(response_data["sql"], language="sql")
+                    render_plan(response_data["plan"])
+                    
+                    # Display data and visualizations
+                    if not response_data["data"].empty:
+                        render_result_data(response_data, key=len(st.session_state.chat_history))
+                    
+                    # Add to chat history after displaying
+                    st.session_state.chat_history.append(response_data)
+                else:
+                    error_message = f"❌ Error: {result['error']}"
+                    st.error(error_message)
+                    render_plan(result.get("plan"))
+                    st.session_state.chat_history.append({
+                        "role": "assistant",
+                        "content": error_message,
+                        "data": pd.DataFrame(),
+                        "plan": result.get("plan")
+                    })
+    log_render_time("chat panel", started)
+
+def render_erd(engine):
+    """ERD from the shared cache; while a changed schema re-renders the previous image is shown"""
+    erd_image, state, error = get_erd_service().get(
+        engine, st.session_state.schema_name, wait=float(os.getenv("ERD_WAIT_SECONDS", "5"))
+    )
+    if state == "stale":
+        st.caption("🔄 Schema changed; showing the previous diagram while the new one renders.")
+    elif state == "rendering":
+        st.info("🔄 The diagram is still rendering and will appear on the next refresh.")
+    elif state == "failed":
+        st.error(f"Failed to generate ERD: {error}")
+        if st.button("🔄 Retry ERD", key="retry_erd"):
+            get_erd_service().retry(engine, st.session_state.schema_name)
+            st.rerun()
+    return erd_image
+
+def focus_erd_on_last_question():
+    """Focus the ERD on the tables retrieved for the latest question, read when clicked.
+
+    Asking a question only reruns the chat fragment, so the tables are looked up here
+    rather than captured when the ERD panel was last drawn.
+    """
+    graph = st.session_state.chatbot.schema_manager.schema_graph()
+    tables = [table for table in st.session_state.chatbot.last_relevant_tables if table in graph.adjacency]
+    if tables:
+        st.session_state.erd_focus = tables
+    else:
+        st.toast("Ask a question first; no tables were retrieved yet.")
+
+@st.fragment
+def erd_panel():
+    """Full ERD for small schemas, or the FK neighbourhood of a few focus tables for large ones"""
+    engine = st.session_state.chatbot.schema_manager.engine
+    # Loaded once per schema; changing the focus only walks its in-memory adjacency
+    graph = st.session_state.chatbot.schema_manager.schema_graph()
+    large = len(graph.tables) > int(os.getenv("ERD_FULL_MAX_TABLES", "60"))
+    
+    mode = st.radio(
+        "Diagram", ["Neighbourhood", "Full schema"], index=0 if large else 1,
+        horizontal=True, key="erd_mode", label_visibility="collapsed"
+    )
+    if mode == "Full schema":
+        if large:
+            st.caption(f"⚠️ {len(graph.tables):,} tables: the full diagram is slow to render and hard to read.")
+        with st.spinner("Generating Entity Relationship Diagram..."):
+            erd_image = render_erd(engine)
+            if erd_image:
+                # Create columns with wider center for ultra-compact display
+                left_col, center_col, right_col = st.columns([1, 4, 1])
+                with center_col:
+                    st.image(erd_image, use_container_width=True)
+        return
+    
+    if "erd_focus" not in st.session_state:
+        last_tables = [table for table in st.session_state.chatbot.last_relevant_tables if table in graph.adjacency]
+        st.session_state.erd_focus = last_tables or graph.tables[:1]
+    
+    focus_col, hops_col, last_col = st.columns([4, 1, 1])
+    with focus_col:
+        focus = st.multiselect("Focus tables", graph.tables, key="erd_focus")
+    with hops_col:
+        hops = st.number_input("Hops", min_value=1, max_value=3, value=1, key="erd_hops")
+    with last_col:
+        st.button(
+            "🎯 Last question", key="erd_focus_last", on_click=focus_erd_on_last_question,
+            help="Focus on the tables retrieved for the last question"
+        )
+    
+    tables = graph.neighbourhood(focus, hops)
+    if not tables:
+        st.info("Pick one or more tables to see their neighbourhood.")
+        return
+    max_tables = int(os.getenv("ERD_NEIGHBOURHOOD_MAX_TABLES", "80"))
+    if len(tables) > max_tables:
+        st.caption(f"Showing the nearest {max_tables} of {len(tables):,} tables.")
+        tables = tables[:max_tables]
+    
+    # Laid out as SVG in the browser, so only this small subgraph is ever sent
+    st.graphviz_chart(graph.to_dot(tables, focus), use_container_width=True)
+    st.download_button(
+        "⬇️ Download graph JSON",
+        data=json.dumps(graph.to_json(tables, focus)),
+        file_name=f"{st.session_state.schema_name}_neighbourhood.json",
+        mime="application/json",
+        key="erd_json"
+    )
+
+@st.cache_resource(ttl=600, show_spinner=False)
+def cached_schema_index(schema_name, _schema_info):
+    """Search index over the reflected schema, built once per schema"""
+    return SchemaIndex(_schema_info)
+
+def display_schema_viewer():
+    with st.expander("📚 Database Schema Browser"):
+        render_schema_browser(
+            cached_schema_index(st.session_state.schema_name, st.session_state.schema_info),
+            key="query_schema_browser"
+        )
 
 def main():
     # Force set the port before any Streamlit commands
@@ -437,6 +869,7 @@ def main():
         initial_sidebar_state="expanded"
     )
     
+    started = time.perf_counter()
     load_css()
     
     # Initialize session state first
@@ -478,7 +911,13 @@ def main():
             st.markdown(f"{icon} {feature}")
         
         if st.button("🗑️ Clear Chat History"):
+            release_result_handles()
+            st.session_state.history_store.clear()
             st.session_state.chat_history = []
+            if st.session_state.get("chatbot") is not None:
+                st.session_state.chatbot.memory.clear()
+            if st.session_state.get("result_exporter") is not None:
+                st.session_state.result_exporter.clear()
             st.rerun()
     
     # Chat input at the top
@@ -489,206 +928,14 @@ def main():
     
     # ERD Section with minimal height
     st.subheader("Entity Relationship Diagram")
-    with st.spinner("Generating Entity Relationship Diagram..."):
-        erd_path, error = get_schema_erd()
-        if erd_path:
-            # Create columns with wider center for ultra-compact display
-            left_col, center_col, right_col = st.columns([1, 4, 1])
-            with center_col:
-                st.image(erd_path, use_container_width=True)
-        else:
-            st.error(f"Failed to generate ERD: {error}")
+    erd_panel()
     
     st.divider()
     
-    # Chat input and history
-    prompt = st.chat_input("Ask a question about your database...")
-    st.markdown('</div>', unsafe_allow_html=True)
-    
-    # Scrollable chat history
-    st.markdown('<div class="chat-history-container">', unsafe_allow_html=True)
-    display_chat_history()
-    st.markdown('</div>', unsafe_allow_html=True)
-    
-    # Handle chat input
-    if prompt:
-        # Display user message
-        with st.chat_message("user"):
-            st.write(prompt)
-        st.session_state.chat_history.append({"role": "user", "content": prompt})
-        
-        # Get and display assistant response
-        with st.chat_message("assistant"):
-            with st.spinner("🤔 Thinking..."):
-                result = st.session_state.chatbot.query(prompt)
-                
-                if result["success"]:
-                    # Store response data
-                    response_data = {
-                        "role": "assistant",
-                        "content": result["response"],
-                        "sql": result["sql_query"],
-                        "data": pd.DataFrame(result["raw_result"])
-                    }
-                    
-                    # Display response
-                    st.write(response_data["content"])
-                    
-                    # Display SQL query
-                    with st.expander("🔍 View SQL Query", expanded=False):
-                        st.code(response_data["sql"], language="sql")
-                    
-                    # Display data and visualizations
-                    if not response_data["data"].empty:
-                        with st.expander("📊 View Data & Visualizations", expanded=False):
-                            col1, col2 = st.columns([2, 1])
-                            with col1:
-                                st.dataframe(
-                                    response_data["data"],
-                                    use_container_width=True,
-                                    hide_index=True
-                                )
-                            
-                            with col2:
-                                try:
-                                    numeric_cols = response_data["data"].select_dtypes(
-                                        include=['float64', 'int64']
-                                    ).columns
-                                    if len(numeric_cols) >= 1:
-                                        fig = px.bar(response_data["data"], 
-                                                   x=response_data["data"].columns[0], 
-                                                   y=numeric_cols[0],
-                                                   title="Data Visualization")
-                                        fig.update_layout(
-                                            plot_bgcolor='rgba(0,0,0,0)',
-                                            paper_bgcolor='rgba(0,0,0,0)',
-                                            font=dict(color='white')
-                                        )
-                                        st.plotly_chart(fig, use_container_width=True)
-                                except Exception:
-                                    pass
-                    
-                    # Add to chat history after displaying
-                    st.session_state.chat_history.append(response_data)
-                else:
-                    error_message = f"❌ Error: {result['error']}"
-                    st.error(error_message)
-                    st.session_state.chat_history.append({
-                        "role": "assistant",
-                        "content": error_message,
-                        "data": pd.DataFrame()
-                    })
-def get_schema_erd():
-    """Generate high-quality ERD using MySQL INFORMATION_SCHEMA"""
-    try:
-        import mysql.connector
-        from graphviz import Digraph
-        from urllib.parse import urlparse
-        
-        # Use system temp directory instead of local folder
-        temp_dir = tempfile.gettempdir()
-        output_file = os.path.join(temp_dir, f"{st.session_state.schema_name}_erd")
-        
-        # Parse database URL for connection
-        db_url = os.getenv("DATABASE_CONNECTION_URL")
-        parsed = urlparse(db_url)
-        
-        # Connect to MySQL database
-        conn = mysql.connector.connect(
-            host=parsed.hostname,
-            user=parsed.username,
-            password=parsed.password,
-            database=st.session_state.schema_name,
-            port=parsed.port or 3306
-        )
-        cursor = conn.cursor()
-
-        # Get table columns and relationships
-        cursor.execute("""
-            SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE
-            FROM INFORMATION_SCHEMA.COLUMNS
-            WHERE TABLE_SCHEMA = %s;
-        """, (st.session_state.schema_name,))
-        columns = cursor.fetchall()
+    render_cancel_button()
+    # Only the chat area reruns when a question is asked
+    chat_panel()
+    log_render_time("full page", started)
 
-        cursor.execute("""
-            SELECT TABLE_NAME, COLUMN_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME
-            FROM INFORMATION_SCHEMA.KEY_COLUMN_USAGE
-            WHERE TABLE_SCHEMA = %s AND REFERENCED_TABLE_NAME IS NOT NULL;
-        """, (st.session_state.schema_name,))
-        relationships = cursor.fetchall()
-
-        # Generate ERD with enhanced settings
-        dot = Digraph("ERD", format="png")
-        dot.attr(
-            rankdir="LR",
-            splines="polyline",  # Changed from ortho to polyline for better label handling
-            nodesep="1.0",    # Increased node separation
-            ranksep="1.5",    # Increased rank separation
-            concentrate="false" # Disabled edge concentration for clearer labels
-        )
-        
-        # Set global graph attributes for better quality
-        dot.attr('graph',
-            fontname="Arial",
-            fontsize="16",
-            pad="0.5",
-            dpi="300"  # Higher DPI for better quality
-        )
-        
-        # Set node attributes
-        dot.attr('node',
-            fontname="Arial",
-            fontsize="12",
-            shape="none",
-            margin="0",
-            style="rounded"
-        )
-        
-        # Set edge attributes
-        dot.attr('edge',
-            fontname="Arial",
-            fontsize="10",
-            len="1.5"
-        )
-
-        # Add tables and relationships
-        tables = {}
-        for table, column, column_type in columns:
-            if table not in tables:
-                tables[table] = []
-            tables[table].append(f"{column} ({column_type})")
-
-        # Create table nodes with enhanced HTML-like labels
-        for table, cols in tables.items():
-            label = f'''<<TABLE BORDER="0" CELLBORDER="1" CELLSPACING="0" CELLPADDING="8">
-                <TR><TD PORT="header" BGCOLOR="#E0E0E0"><FONT POINT-SIZE="14"><B>{table}</B></FONT></TD></TR>'''
-            
-            for col in cols:
-                label += f'<TR><TD PORT="{col.split()[0]}" ALIGN="LEFT"><FONT POINT-SIZE="12">{col}</FONT></TD></TR>'
-            label += '</TABLE>>'
-            
-            dot.node(table, label=label)
-
-        # Add relationships with improved styling
-        for table, column, ref_table, ref_column in relationships:
-            dot.edge(
-                f"{table}:{column}:e",
-                f"{ref_table}:{ref_column}:w",
-                dir="both",
-                arrowhead="crowodot",
-                arrowtail="teedot",
-                color="#666666",
-                penwidth="1.0"
-            )
-
-        dot.render(output_file, cleanup=True, format="png")
-        cursor.close()
-        conn.close()
-        return f"{output_file}.png", None
-            
-    except Exception as e:
-        return None, f"Failed to generate ERD: {str(e)}"
-    
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,291 @@
+import json
+import re
+import threading
+import pandas as pd
+from collections import OrderedDict
+from contextlib import contextmanager
+from sqlalchemy import text
+from deadline import CancelToken, DeadlineExceeded, QueryCancelled
+from cost_guard import has_limit
+from sql_normalizer import normalize_sql, sql_fingerprint
+
+def with_max_execution_time(sql_query: str, milliseconds: int) -> str:
+    """Add a MySQL MAX_EXECUTION_TIME optimizer hint to a SELECT"""
+    hint = f"MAX_EXECUTION_TIME({max(1, int(milliseconds))})"
+
+    # Merge into an existing hint comment, since MySQL only honours the first one
+    existing = re.match(r"\s*SELECT\s+/\*\+", sql_query, re.IGNORECASE)
+    if existing:
+        return f"{sql_query[:existing.end()]} {hint}{sql_query[existing.end():]}"
+    return re.sub(r"^\s*SELECT\b", lambda m: f"{m.group(0)} /*+ {hint} */", sql_query, count=1, flags=re.IGNORECASE)
+
+
+def quote_identifier(name) -> str:
+    """Backtick-quote a table or column name for MySQL"""
+    return "`" + str(name).replace("`", "``") + "`"
+
+
+def page_sql(sql_query: str, page_size: int, offset: int, sort_column: int = None, descending: bool = False) -> str:
+    """Restrict a query to one page, optionally sorted by a 1-based column position"""
+    sql_query = sql_query.strip().rstrip(';').rstrip()
+    limit = f"LIMIT {int(page_size)} OFFSET {int(offset)}"
+    if sort_column is None and not has_limit(sql_query):
+        # Limiting the query itself keeps its own ORDER BY in effect
+        return f"{sql_query}\n{limit}"
+    # Positions avoid quoting issues with generated column names
+    order = f"ORDER BY {int(sort_column)} {'DESC' if descending else 'ASC'}\n" if sort_column else ""
+    return f"SELECT * FROM (\n{sql_query}\n) AS _page\n{order}{limit}"
+
+
+def count_sql(sql_query: str) -> str:
+    """Count the rows a query returns without fetching them"""
+    sql_query = sql_query.strip().rstrip(';').rstrip()
+    return f"SELECT COUNT(*) FROM (\n{sql_query}\n) AS _count"
+
+
+class ResultHandle:
+    """Open server-side cursor that hands out a result in capped batches"""
+
+    def __init__(self, connection, chunks, max_rows: int, max_bytes: int, guard, thread_id: int):
+        self.connection = connection
+        self._chunks = chunks
+        self._guard = guard
+        self.thread_id = thread_id
+        self._pending = None
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.columns = None
+        self.rows_fetched = 0
+        self.exhausted = False
+
+    @property
+    def truncated(self) -> bool:
+        """True while more rows remain on the server"""
+        return not self.exhausted
+
+    def _next_chunk(self):
+        """Return the buffered remainder or the next chunk from the cursor"""
+        if self._pending is not None:
+            chunk, self._pending = self._pending, None
+            return chunk
+        try:
+            return next(self._chunks)
+        except StopIteration:
+            self.close()
+            return None
+
+    def fetch(self, max_rows: int = None, max_bytes: int = None, deadline=None, cancel_token=None) -> pd.DataFrame:
+        """Pull chunks until the row or byte cap is hit or the cursor is exhausted"""
+        max_rows = max_rows or self.max_rows
+        max_bytes = max_bytes or self.max_bytes
+
+        frames = []
+        rows = 0
+        size = 0
+        with self._guard(self.connection, deadline, cancel_token, self.thread_id):
+            while not self.exhausted and rows < max_rows and size < max_bytes:
+                chunk = self._next_chunk()
+                if chunk is None:
+                    break
+                if self.columns is None:
+                    self.columns = list(chunk.columns)
+
+                # Keep whatever exceeds the row cap for the next fetch
+                remaining = max_rows - rows
+                if len(chunk) > remaining:
+                    self._pending = chunk.iloc[remaining:]
+                    chunk = chunk.iloc[:remaining]
+
+                frames.append(chunk)
+                rows += len(chunk)
+                size += int(chunk.memory_usage(deep=True).sum())
+
+        self.rows_fetched += rows
+        if not frames:
+            return pd.DataFrame(columns=self.columns or [])
+        return pd.concat(frames, ignore_index=True)
+
+    def close(self):
+        """Release the cursor and return the connection to the pool"""
+        if self.exhausted:
+            return
+        self.exhausted = True
+        self._pending = None
+        try:
+            self._chunks.close()
+        finally:
+            self.connection.close()
+
+
+class QueryExecutor:
+    def __init__(self, engine, chunk_size: int = 5000, max_rows: int = 10000, max_bytes: int = 64 * 1024 * 1024,
+                 dtype_backend: str = "pyarrow", prepared: bool = False, max_prepared: int = 64):
+        self.engine = engine
+        # Arrow-backed columns avoid per-value Python objects for strings, decimals and nullable ints
+        self.dtype_backend = dtype_backend
+        self.chunk_size = chunk_size
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        # Server-side prepared statements, cached per pooled connection by statement shape
+        self.prepared = prepared
+        self.max_prepared = max_prepared
+        self.prepared_stats = {"hits": 0, "misses": 0, "fallbacks": 0}
+        self._stats_lock = threading.Lock()
+
+    def _connection_id(self, connection) -> int:
+        """MySQL thread id of a connection, used as the KILL QUERY target"""
+        return connection.exec_driver_sql("SELECT CONNECTION_ID()").scalar()
+
+    @contextmanager
+    def _guard(self, connection, deadline=None, cancel_token=None, thread_id=None):
+        """Bound a statement by the request deadline and make it killable via KILL QUERY"""
+        if deadline is None and cancel_token is None:
+            yield
+            return
+
+        token = cancel_token or CancelToken()
+        token.check("execution")
+        if deadline is not None:
+            deadline.check("execution")
+
+        if thread_id is None:
+            thread_id = self._connection_id(connection)
+        token.attach(self.engine, thread_id)
+
+        # Backstop for statements the optimizer hint does not cover
+        watchdog = None
+        if deadline is not None:
+            watchdog = threading.Timer(deadline.remaining(), token.kill_query)
+            watchdog.daemon = True
+            watchdog.start()
+        try:
+            yield
+        except Exception as e:
+            if token.cancelled:
+                raise QueryCancelled("Query cancelled during execution") from e
+            if deadline is not None and deadline.expired():
+                raise DeadlineExceeded(f"Query exceeded its {deadline.seconds:g}s deadline during execution") from e
+            raise
+        finally:
+            if watchdog is not None:
+                watchdog.cancel()
+            token.detach()
+
+    def _count(self, outcome: str):
+        with self._stats_lock:
+            self.prepared_stats[outcome] += 1
+
+    def _prepare(self, connection, sql_query: str) -> str:
+        """Bind the query's literals and return the EXECUTE statement for its cached prepared shape"""
+        shape, params = normalize_sql(sql_query)
+        fingerprint = sql_fingerprint(sql_query)
+        # connection.info lives as long as the DBAPI connection, like the server-side statements
+        statements = connection.info.setdefault("prepared_statements", OrderedDict())
+        name = f"stmt_{fingerprint}"
+        if fingerprint in statements:
+            statements.move_to_end(fingerprint)
+            self._count("hits")
+            print(f"[QueryExecutor] Prepared statement cache hit: {fingerprint} ({self.prepared_stats})")
+        else:
+            connection.execute(text("SET @_shape = :shape"), {"shape": shape})
+            connection.exec_driver_sql(f"PREPARE {name} FROM @_shape")
+            statements[fingerprint] = name
+            self._count("misses")
+            while len(statements) > self.max_prepared:
+                _, evicted = statements.popitem(last=False)
+                connection.exec_driver_sql(f"DEALLOCATE PREPARE {evicted}")
+
+        if not params:
+            return f"EXECUTE {name}"
+        names = [f"p{position}" for position in range(len(params))]
+        connection.execute(
+            text("SET " + ", ".join(f"@{param} = :{param}" for param in names)),
+            dict(zip(names, params))
+        )
+        return f"EXECUTE {name} USING " + ", ".join(f"@{param}" for param in names)
+
+    def _forget_prepared(self, connection, sql_query: str):
+        """Drop a statement whose prepared execution failed so the next call prepares it again"""
+        statements = connection.info.get("prepared_statements", {})
+        name = statements.pop(sql_fingerprint(sql_query), None)
+        if name:
+            try:
+                connection.exec_driver_sql(f"DEALLOCATE PREPARE {name}")
+            except Exception:
+                pass
+
+    def _execute_prepared(self, connection, sql_query: str, deadline=None, cancel_token=None) -> pd.DataFrame:
+        """Run through the prepared statement cache, falling back to plain text for unpreparable queries.
+
+        A prepared shape cannot carry a per-call MAX_EXECUTION_TIME hint, so the deadline
+        is enforced by the KILL QUERY watchdog alone.
+        """
+        try:
+            statement = self._prepare(connection, sql_query)
+        except Exception as e:
+            print(f"[QueryExecutor] Could not prepare statement, running as text: {e}")
+            self._count("fallbacks")
+            statement = None
+
+        if statement is not None:
+            try:
+                with self._guard(connection, deadline, cancel_token):
+                    return pd.read_sql(statement, connection, dtype_backend=self.dtype_backend)
+            except (DeadlineExceeded, QueryCancelled):
+                raise
+            except Exception as e:
+                # e.g. user variables collating differently from the literals they replaced
+                print(f"[QueryExecutor] Prepared execution failed, running as text: {e}")
+                self._forget_prepared(connection, sql_query)
+                self._count("fallbacks")
+
+        if deadline is not None:
+            sql_query = with_max_execution_time(sql_query, deadline.remaining() * 1000)
+        with self._guard(connection, deadline, cancel_token):
+            return pd.read_sql(sql_query, connection, dtype_backend=self.dtype_backend)
+
+    def explain(self, sql_query: str) -> dict:
+        """Return the parsed EXPLAIN FORMAT=JSON plan for a query"""
+        with self.engine.connect() as connection:
+            raw_plan = connection.exec_driver_sql(f"EXPLAIN FORMAT=JSON {sql_query}").scalar()
+        return json.loads(raw_plan)
+
+    def execute(self, sql_query: str, deadline=None, cancel_token=None) -> pd.DataFrame:
+        """Execute a query and load the full result"""
+        if self.prepared:
+            with self.engine.connect() as connection:
+                return self._execute_prepared(connection, sql_query, deadline, cancel_token)
+
+        if deadline is None and cancel_token is None:
+            return pd.read_sql(sql_query, self.engine, dtype_backend=self.dtype_backend)
+
+        if deadline is not None:
+            sql_query = with_max_execution_time(sql_query, deadline.remaining() * 1000)
+        with self.engine.connect() as connection:
+            with self._guard(connection, deadline, cancel_token):
+                return pd.read_sql(sql_query, connection, dtype_backend=self.dtype_backend)
+
+    def page(self, sql_query: str, page_number: int, page_size: int, sort_column: int = None, descending: bool = False,
+             deadline=None, cancel_token=None) -> pd.DataFrame:
+        """Re-run a query for a single page, sorted and sliced by the database"""
+        paged = page_sql(sql_query, page_size, page_number * page_size, sort_column, descending)
+        return self.execute(paged, deadline, cancel_token)
+
+    def count(self, sql_query: str, deadline=None, cancel_token=None) -> int:
+        """Total rows of a query's result"""
+        return int(self.execute(count_sql(sql_query), deadline, cancel_token).iloc[0, 0])
+
+    def stream(self, sql_query: str, deadline=None, cancel_token=None) -> ResultHandle:
+        """Execute a query on an unbuffered server-side cursor and return a handle to its chunks"""
+        # No MAX_EXECUTION_TIME here: an unbuffered statement keeps running while the
+        # user pages through it, so each fetch is bounded by the KILL QUERY watchdog instead
+        connection = self.engine.connect().execution_options(stream_results=True)
+        try:
+            # Captured up front; the connection is busy once the unbuffered result is open
+            thread_id = self._connection_id(connection)
+            with self._guard(connection, deadline, cancel_token, thread_id):
+                chunks = pd.read_sql(sql_query, connection, chunksize=self.chunk_size, dtype_backend=self.dtype_backend)
+        except Exception:
+            connection.close()
+            raise
+        return ResultHandle(connection, iter(chunks), self.max_rows, self.max_bytes, self._guard, thread_id)
@@ -0,0 +1,119 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from pydantic import PrivateAttr
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+class ReplayChatModel(BaseChatModel):
+    """Chat model that replays recorded prompt/response pairs from a local JSONL store.
+
+    Modes:
+        replay - only serve recorded responses, failing on unknown prompts
+        record - always call the recorder model and store its response
+        auto   - replay when recorded, otherwise record
+    """
+
+    store_path: str
+    mode: str = "replay"
+    recorder: Optional[BaseChatModel] = None
+    latency: float = 0.0
+    tokens_per_second: float = 0.0
+
+    _responses: Dict[str, str] = PrivateAttr(default_factory=dict)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    def model_post_init(self, __context: Any) -> None:
+        if self.mode not in ("replay", "record", "auto"):
+            raise ValueError(f"Unsupported replay mode: {self.mode}")
+        if self.mode != "replay" and self.recorder is None:
+            raise ValueError(f"Replay mode '{self.mode}' needs a recorder model")
+        self._load()
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def _load(self):
+        """Load recorded pairs; later lines win so re-recorded prompts replace older ones"""
+        if not os.path.exists(self.store_path):
+            return
+        with open(self.store_path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._responses[entry["key"]] = entry["response"]
+        print(f"[ReplayChatModel] Loaded {len(self._responses)} recorded responses from {self.store_path}")
+
+    def _serialize(self, messages: List[BaseMessage]) -> List[Dict]:
+        return [{"type": m.type, "content": m.content} for m in messages]
+
+    def _key(self, messages: List[BaseMessage]) -> str:
+        """Stable hash of the prompt messages"""
+        payload = json.dumps(self._serialize(messages), sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _save(self, key: str, messages: List[BaseMessage], response: str):
+        """Append a recorded pair to the store"""
+        with self._lock:
+            self._responses[key] = response
+            directory = os.path.dirname(self.store_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.store_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({
+                    "key": key,
+                    "messages": self._serialize(messages),
+                    "response": response
+                }, ensure_ascii=False) + "\n")
+
+    def _lookup(self, key: str) -> Optional[str]:
+        if self.mode == "record":
+            return None
+        return self._responses.get(key)
+
+    def _missing(self, key: str):
+        raise ValueError(
+            f"No recorded response for prompt {key[:12]}; record it first with LLM_REPLAY_MODE=record or auto"
+        )
+
+    def _delay(self, response: str) -> float:
+        """Simulated latency: fixed overhead plus generation time at the configured token rate"""
+        delay = self.latency
+        if self.tokens_per_second > 0:
+            delay += (len(response) / 4) / self.tokens_per_second
+        return delay
+
+    def _result(self, response: str) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=response))])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        key = self._key(messages)
+        response = self._lookup(key)
+        if response is None:
+            if self.mode == "replay":
+                self._missing(key)
+            response = self.recorder.invoke(messages).content
+            self._save(key, messages, response)
+        else:
+            time.sleep(self._delay(response))
+        return self._result(response)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs: Any) -> ChatResult:
+        key = self._key(messages)
+        response = self._lookup(key)
+        if response is None:
+            if self.mode == "replay":
+                self._missing(key)
+            response = (await self.recorder.ainvoke(messages)).content
+            await asyncio.to_thread(self._save, key, messages, response)
+        else:
+            await asyncio.sleep(self._delay(response))
+        return self._result(response)
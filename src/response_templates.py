@@ -0,0 +1,109 @@
+import numbers
+import re
+from datetime import date, datetime
+from decimal import Decimal
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+from conversation_memory import sql_tables
+
+_AGGREGATES = {"COUNT": "number", "SUM": "total", "AVG": "average", "MIN": "minimum", "MAX": "maximum"}
+# Words that mark a column as an identifier, year or code, whose digits must not be grouped
+_IDENTIFIER_WORDS = {"id", "ids", "key", "code", "zip", "zipcode", "postcode", "phone", "sku", "isbn", "ean", "number", "no"}
+_YEAR_WORDS = {"year", "yr"}
+
+
+def is_identifier_column(column) -> bool:
+    """Whether a column holds ids, years or codes rather than quantities"""
+    if column is None:
+        return False
+    name = re.sub(r"([a-z])([A-Z])", r"\1_\2", str(column)).lower()
+    words = [word for word in re.split(r"[^a-z0-9]+", name) if word]
+    return bool(words) and (words[-1] in _IDENTIFIER_WORDS or any(word in _YEAR_WORDS for word in words))
+
+
+class ResponseTemplates:
+    """Answers simple result shapes locally instead of with a second LLM call.
+
+    Covers empty results, a single value, a single row and short single-column lists;
+    anything larger is left to the LLM.
+    """
+
+    def __init__(self, max_list_items: int = 10, max_row_columns: int = 8):
+        self.max_list_items = max_list_items
+        self.max_row_columns = max_row_columns
+
+    def format_value(self, value, column=None) -> str:
+        """Human-readable numbers, dates and booleans; ids, years and codes keep their digits as-is"""
+        if value is None or (not isinstance(value, (list, tuple)) and pd.isna(value)):
+            return "no value"
+        if isinstance(value, (bool, np.bool_)):
+            return "yes" if value else "no"
+        grouping = "" if is_identifier_column(column) else ","
+        if isinstance(value, numbers.Integral):
+            # Python and NumPy ints are formatted exactly; BIGINT ids do not survive float()
+            return f"{int(value):{grouping}}"
+        if isinstance(value, Decimal):
+            if value == value.to_integral_value():
+                return f"{int(value):{grouping}}"
+            return f"{value:{grouping}.2f}" if abs(value) >= 1 else f"{value.normalize():f}"
+        if isinstance(value, numbers.Real):
+            number = float(value)
+            if number.is_integer() and abs(number) < 1e15:
+                return f"{int(number):{grouping}}"
+            return f"{number:{grouping}.2f}" if abs(number) >= 1 else f"{number:.4g}"
+        if isinstance(value, (pd.Timestamp, datetime)):
+            if (value.hour, value.minute, value.second) == (0, 0, 0):
+                return f"{value:%B} {value.day}, {value.year}"
+            return f"{value:%B} {value.day}, {value.year} {value:%H:%M}"
+        if isinstance(value, date):
+            return f"{value:%B} {value.day}, {value.year}"
+        return str(value)
+
+    def format_list(self, values: List[str]) -> str:
+        if len(values) <= 1:
+            return "".join(values)
+        return f"{', '.join(values[:-1])} and {values[-1]}"
+
+    def _label(self, column: str, sql_query: str) -> str:
+        """Readable name for a result column, using the SQL when the column is an expression"""
+        column = str(column)
+        function = re.match(r"^\s*(COUNT|SUM|AVG|MIN|MAX)\s*\(\s*(?:DISTINCT\s+)?([^)]*)\)\s*$", column, re.IGNORECASE)
+        if function:
+            kind = _AGGREGATES[function.group(1).upper()]
+            target = function.group(2).split(".")[-1].strip("` ")
+            if kind == "number":
+                tables = sql_tables(sql_query)
+                subject = target if target and target != "*" else (tables[0] if tables else "rows")
+                return f"the number of {subject.replace('_', ' ')}"
+            return f"the {kind} {target.replace('_', ' ')}".rstrip()
+        if re.search(r"[()*]", column):
+            return "the result"
+        return f"the {column.replace('_', ' ').strip().lower()}"
+
+    def render(self, question: str, sql_query: str, result) -> Optional[str]:
+        """Templated answer, or None when the result needs the LLM"""
+        if not isinstance(result, pd.DataFrame):
+            return None
+        rows, columns = result.shape
+
+        if rows == 0:
+            return f'No matching rows were found for "{question.strip()}".'
+
+        if rows == 1 and columns == 1:
+            label = self._label(result.columns[0], sql_query)
+            return f"{label[0].upper()}{label[1:]} is {self.format_value(result.iat[0, 0], result.columns[0])}."
+
+        if rows == 1 and columns <= self.max_row_columns:
+            fields = [
+                f"{str(column).replace('_', ' ')}: {self.format_value(result.iat[0, position], column)}"
+                for position, column in enumerate(result.columns)
+            ]
+            return f"Here is the matching row: {'; '.join(fields)}."
+
+        if columns == 1 and rows <= self.max_list_items:
+            values = [self.format_value(value, result.columns[0]) for value in result.iloc[:, 0]]
+            column = str(result.columns[0]).replace("_", " ")
+            return f"Found {rows} results ({column}): {self.format_list(values)}."
+
+        return None
@@ -0,0 +1,96 @@
+import os
+import shutil
+import tempfile
+import uuid
+from typing import Callable, Dict, List
+import pyarrow as pa
+import pyarrow.parquet as pq
+from query_executor import QueryExecutor
+
+def unique_names(columns: List) -> List[str]:
+    """String column names with duplicates from joins suffixed, as Parquet requires"""
+    seen = {}
+    names = []
+    for column in columns:
+        name = str(column)
+        seen[name] = seen.get(name, 0) + 1
+        names.append(name if seen[name] == 1 else f"{name}_{seen[name]}")
+    return names
+
+
+class ResultExporter:
+    """Streams a query's full result to CSV or Parquet on disk in constant memory.
+
+    The query is re-run on a server-side cursor and written chunk by chunk, so the
+    export size is bounded by disk rather than by the in-memory result caps.
+    """
+
+    FORMATS = ("csv", "parquet")
+
+    def __init__(self, executor: QueryExecutor, session_id: str = None, base_dir: str = None,
+                 chunk_size: int = 50000, compression: str = "zstd"):
+        self.executor = executor
+        base_dir = base_dir or os.path.join(tempfile.gettempdir(), "exports")
+        self.directory = os.path.join(base_dir, session_id or uuid.uuid4().hex)
+        self.chunk_size = chunk_size
+        self.compression = compression
+        os.makedirs(self.directory, exist_ok=True)
+
+    def export(self, sql_query: str, file_format: str = "csv", deadline=None, cancel_token=None,
+               progress_callback: Callable[[int], None] = None) -> Dict:
+        """Write every row of the query to a new file and return its path and row count"""
+        if file_format not in self.FORMATS:
+            raise ValueError(f"Unknown export format: {file_format}")
+
+        path = os.path.join(self.directory, f"export_{uuid.uuid4().hex[:12]}.{file_format}")
+        partial = f"{path}.partial"
+        handle = self.executor.stream(sql_query, deadline, cancel_token)
+        csv_file = None
+        parquet_writer = None
+        rows = 0
+        started = False
+        completed = False
+        try:
+            if file_format == "csv":
+                csv_file = open(partial, "w", newline="", encoding="utf-8")
+            while not handle.exhausted:
+                chunk = handle.fetch(max_rows=self.chunk_size, deadline=deadline, cancel_token=cancel_token)
+                if chunk.empty and started:
+                    continue
+
+                if csv_file is not None:
+                    chunk.to_csv(csv_file, header=not started, index=False)
+                else:
+                    chunk = chunk.copy(deep=False)
+                    chunk.columns = unique_names(chunk.columns)
+                    table = pa.Table.from_pandas(chunk, preserve_index=False)
+                    if parquet_writer is None:
+                        # All-null columns in the first chunk would otherwise fix the type to null
+                        schema = pa.schema([
+                            pa.field(field.name, pa.string()) if pa.types.is_null(field.type) else field
+                            for field in table.schema
+                        ], metadata=table.schema.metadata)
+                        parquet_writer = pq.ParquetWriter(partial, schema, compression=self.compression)
+                    parquet_writer.write_table(table.cast(parquet_writer.schema))
+
+                started = True
+                rows += len(chunk)
+                if progress_callback:
+                    progress_callback(rows)
+            completed = True
+        finally:
+            handle.close()
+            if csv_file is not None:
+                csv_file.close()
+            if parquet_writer is not None:
+                parquet_writer.close()
+            if not completed and os.path.exists(partial):
+                os.remove(partial)
+
+        os.replace(partial, path)
+        return {"path": path, "rows": rows, "bytes": os.path.getsize(path), "format": file_format}
+
+    def clear(self):
+        """Delete every export of this session"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
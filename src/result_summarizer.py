@@ -0,0 +1,124 @@
+import pandas as pd
+import pyarrow as pa
+from typing import List
+
+class ResultSummarizer:
+    """Builds a compact, token-bounded description of a query result for the LLM"""
+
+    def __init__(self, token_budget: int = 1500, top_k: int = 5, chars_per_token: int = 4):
+        self.token_budget = token_budget
+        self.top_k = top_k
+        self.chars_per_token = chars_per_token
+
+    def _format_number(self, value) -> str:
+        """Compact numeric formatting that tolerates missing values"""
+        if pd.isna(value):
+            return "n/a"
+        return f"{float(value):.6g}"
+
+    def _tokens(self, text: str) -> int:
+        """Rough token estimate used for budgeting"""
+        return len(text) // self.chars_per_token + 1
+
+    def _is_numeric(self, series: pd.Series) -> bool:
+        """Numeric columns, including Arrow decimals that select_dtypes("number") leaves out"""
+        return pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype)
+
+    def _is_temporal(self, series: pd.Series) -> bool:
+        """Datetime columns, including Arrow date32 and time types"""
+        if pd.api.types.is_datetime64_any_dtype(series.dtype):
+            return True
+        return isinstance(series.dtype, pd.ArrowDtype) and pa.types.is_temporal(series.dtype.pyarrow_dtype)
+
+    def _column_stats(self, df: pd.DataFrame) -> List[str]:
+        """Per-column statistics, computed column-wise rather than per row"""
+        lines = []
+
+        numeric_cols = [c for c in df.columns if self._is_numeric(df[c])]
+        for col in numeric_cols:
+            # Arrow decimal128 columns (MySQL DECIMAL) are cast so min/max/mean are plain floats
+            values = df[col].astype("float64")
+            lines.append(
+                f"- {col}: min={self._format_number(values.min())}, max={self._format_number(values.max())}, "
+                f"mean={self._format_number(values.mean())}, nulls={int(values.isna().sum())}"
+            )
+
+        datetime_cols = [c for c in df.columns if self._is_temporal(df[c])]
+        for col in datetime_cols:
+            lines.append(f"- {col}: earliest={df[col].min()}, latest={df[col].max()}")
+
+        other_cols = [c for c in df.columns if c not in numeric_cols and c not in datetime_cols]
+        for col in other_cols:
+            try:
+                counts = df[col].value_counts(dropna=True)
+            except TypeError:
+                # Unhashable values such as decoded JSON lists or dicts
+                counts = df[col].dropna().astype(str).value_counts()
+            top = ", ".join(f"{value!s} ({count})" for value, count in counts.head(self.top_k).items())
+            lines.append(f"- {col}: {len(counts)} distinct values; top: {top}")
+
+        return lines
+
+    def _sample(self, df: pd.DataFrame, budget_tokens: int) -> str:
+        """Head/tail sample shrunk until it fits the remaining budget"""
+        rows = min(len(df), 10)
+        while rows > 0:
+            half = max(rows // 2, 1)
+            if len(df) <= rows:
+                sample = df.to_string(index=False)
+            else:
+                sample = "\n".join([
+                    f"First {half} rows:",
+                    df.head(half).to_string(index=False),
+                    f"Last {half} rows:",
+                    df.tail(half).to_string(index=False, header=False)
+                ])
+            if self._tokens(sample) <= budget_tokens:
+                return sample
+            rows -= 2
+        return ""
+
+    def _unique_columns(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Suffix repeated column names (SELECT a.id, b.id) so each name selects one column"""
+        if df.columns.is_unique:
+            return df
+        seen = {}
+        names = []
+        for column in df.columns:
+            name = str(column)
+            seen[name] = seen.get(name, 0) + 1
+            names.append(name if seen[name] == 1 else f"{name}_{seen[name]}")
+        df = df.copy(deep=False)
+        df.columns = names
+        return df
+
+    def summarize(self, df: pd.DataFrame) -> str:
+        """Summarize a result set within the configured token budget"""
+        df = self._unique_columns(df)
+        lines = [
+            "This is a summary of a large result set, not the full data.",
+            f"Row count: {len(df)}",
+            "Columns: " + ", ".join(f"{col} ({dtype})" for col, dtype in df.dtypes.items()),
+            "Column statistics:"
+        ]
+
+        header = "\n".join(lines)
+        used = self._tokens(header)
+
+        # Keep the stats that fit, leaving room for at least a small sample
+        stats_budget = int(self.token_budget * 0.6) - used
+        for line in self._column_stats(df):
+            cost = self._tokens(line)
+            if cost > stats_budget:
+                lines.append("- (remaining column statistics omitted)")
+                break
+            lines.append(line)
+            stats_budget -= cost
+            used += cost
+
+        sample = self._sample(df, self.token_budget - used)
+        if sample:
+            lines.append("Sample rows:")
+            lines.append(sample)
+
+        return "\n".join(lines)
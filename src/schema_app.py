@@ -5,12 +5,11 @@ from schema_designer import SchemaDesigner
 from schema_assistant import SchemaAssistant
 import requests
 from sqlalchemy import text
-import pandas as pd
 import time
-import tempfile
 import sys
 import streamlit as st
-import graphviz
+from erd_service import get_erd_service
+from schema_browser import SchemaIndex, render_schema_browser
 
 def load_lottie_url(url: str):
     r = requests.get(url)
@@ -328,172 +327,70 @@ def initialize_session_state():
     
     return True
 
-def get_schema_erd():
-    """Generate high-quality ERD using MySQL INFORMATION_SCHEMA"""
-    try:
-        import mysql.connector
-        from graphviz import Digraph
-        from urllib.parse import urlparse
-        
-        # Use system temp directory instead of local folder
-        temp_dir = tempfile.gettempdir()
-        output_file = os.path.join(temp_dir, f"{st.session_state.schema_name}_erd")
-        
-        # Parse database URL for connection
-        db_url = os.getenv("DATABASE_CONNECTION_URL")
-        parsed = urlparse(db_url)
-        
-        # Connect to MySQL database
-        conn = mysql.connector.connect(
-            host=parsed.hostname,
-            user=parsed.username,
-            password=parsed.password,
-            database=st.session_state.schema_name,
-            port=parsed.port or 3306
-        )
-        cursor = conn.cursor()
-
-        # Get table columns and relationships
-        cursor.execute("""
-            SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE
-            FROM INFORMATION_SCHEMA.COLUMNS
-            WHERE TABLE_SCHEMA = %s;
-        """, (st.session_state.schema_name,))
-        columns = cursor.fetchall()
+@st.cache_data(show_spinner=False)
+def cached_schema_info(schema_name, _schema_manager):
+    """Reflected schema, reused until a change invalidates it"""
+    return _schema_manager.get_schema_info()
 
-        cursor.execute("""
-            SELECT TABLE_NAME, COLUMN_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME
-            FROM INFORMATION_SCHEMA.KEY_COLUMN_USAGE
-            WHERE TABLE_SCHEMA = %s AND REFERENCED_TABLE_NAME IS NOT NULL;
-        """, (st.session_state.schema_name,))
-        relationships = cursor.fetchall()
-
-        # Generate ERD with enhanced settings
-        dot = Digraph("ERD", format="png")
-        dot.attr(
-            rankdir="LR",
-            splines="polyline",  # Changed from ortho to polyline for better label handling
-            nodesep="1.0",    # Increased node separation
-            ranksep="1.5",    # Increased rank separation
-            concentrate="false" # Disabled edge concentration for clearer labels
-        )
-        
-        # Set global graph attributes for better quality
-        dot.attr('graph',
-            fontname="Arial",
-            fontsize="16",
-            pad="0.5",
-            dpi="300"  # Higher DPI for better quality
-        )
-        
-        # Set node attributes
-        dot.attr('node',
-            fontname="Arial",
-            fontsize="12",
-            shape="none",
-            margin="0",
-            style="rounded"
-        )
-        
-        # Set edge attributes
-        dot.attr('edge',
-            fontname="Arial",
-            fontsize="10",
-            len="1.5"
-        )
+def render_erd(engine):
+    """ERD from the shared cache; while a changed schema re-renders the previous image is shown"""
+    erd_image, state, error = get_erd_service().get(
+        engine, st.session_state.schema_name, wait=float(os.getenv("ERD_WAIT_SECONDS", "5"))
+    )
+    if state == "stale":
+        st.caption("🔄 Schema changed; showing the previous diagram while the new one renders.")
+    elif state == "rendering":
+        st.info("🔄 The diagram is still rendering and will appear on the next refresh.")
+    elif state == "failed":
+        st.error(f"Failed to generate ERD: {error}")
+        if st.button("🔄 Retry ERD", key="retry_erd"):
+            get_erd_service().retry(engine, st.session_state.schema_name)
+            st.rerun()
+    return erd_image
 
-        # Add tables and relationships
-        tables = {}
-        for table, column, column_type in columns:
-            if table not in tables:
-                tables[table] = []
-            tables[table].append(f"{column} ({column_type})")
-        
-        for table, cols in tables.items():
-            # Enhanced HTML-like label with better styling
-            label = f'''<<TABLE BORDER="0" CELLBORDER="1" CELLSPACING="0" CELLPADDING="8">
-                <TR><TD PORT="header" BGCOLOR="#4CAF50" COLOR="white"><B>{table}</B></TD></TR>'''
-            
-            # Add columns with alternating background colors for better readability
-            for i, col in enumerate(cols):
-                bg_color = '#f8f8f8' if i % 2 == 0 else 'white'
-                label += f'<TR><TD PORT="{col.split()[0]}" BGCOLOR="{bg_color}" ALIGN="LEFT">{col}</TD></TR>'
-            label += '</TABLE>>'
-            
-            dot.node(table, label=label)
+@st.cache_resource(show_spinner=False)
+def cached_schema_index(schema_name, _schema_manager):
+    """Search index for the schema browser, rebuilt only after a schema change"""
+    return SchemaIndex(cached_schema_info(schema_name, _schema_manager))
 
-        # Add relationships with improved styling and xlabel
-        for table, column, ref_table, ref_column in relationships:
-            dot.edge(
-                f"{table}:{column}:e",
-                f"{ref_table}:{ref_column}:w",
-                arrowhead="crow",
-                arrowtail="none",
-                color="#2196F3",
-                penwidth="1.5",
-                xlabel=f"{column} → {ref_column}"  # Changed from label to xlabel
-            )
+def invalidate_schema_caches():
+    """Drop cached schema views after the schema changes"""
+    cached_schema_info.clear()
+    cached_schema_index.clear()
+    get_erd_service().invalidate(st.session_state.get("schema_name"))
 
-        # Render with higher DPI and better quality settings
-        dot.render(output_file, cleanup=True, format="png")
-        cursor.close()
-        conn.close()
-        return f"{output_file}.png", None
-            
-    except Exception as e:
-        return None, f"Failed to generate ERD: {str(e)}"
+def log_render_time(name, started):
+    """Print how long a part of the page took when RENDER_TIMINGS is set"""
+    if os.getenv("RENDER_TIMINGS"):
+        print(f"[render] {name}: {(time.perf_counter() - started) * 1000:.0f} ms")
 
 def display_schema_viewer():
     """Display schema structure and ERD"""
     # ERD Section first
     st.subheader("Entity Relationship Diagram")
     with st.spinner("Generating Entity Relationship Diagram..."):
-        erd_path, error = get_schema_erd()
-        if erd_path:
+        erd_image = render_erd(st.session_state.schema_manager.engine)
+        if erd_image:
             # Create three columns to center the image
             left_col, center_col, right_col = st.columns([1, 2, 1])
             
             with center_col:
-                st.image(erd_path, width=800)
+                st.image(erd_image, width=800)
                 st.download_button(
                     label="Download ERD",
-                    data=open(erd_path, "rb").read(),
+                    data=erd_image,
                     file_name=f"{st.session_state.schema_name}_erd.png",
                     mime="image/png",
                     use_container_width=True
                 )
-        else:
-            st.error(f"Failed to generate ERD: {error}")
     
     st.divider()
     
     # Table details
-    schema_info = st.session_state.schema_manager.get_schema_info()
-    for table in schema_info:
-        with st.expander(f"📋 {table['table_name']}", expanded=False):
-            columns = []
-            for col in table['columns']:
-                col_type = col['type']
-                attributes = []
-                if col.get('primary_key'):
-                    attributes.append('🔑 PK')
-                if col.get('foreign_key', {}).get('is_fk'):
-                    attributes.append('🔗 FK')
-                if not col.get('nullable', True):
-                    attributes.append('Required')
-                
-                columns.append({
-                    'Column': col['name'],
-                    'Type': col_type,
-                    'Attributes': ' | '.join(attributes) if attributes else ''
-                })
-            
-            df = pd.DataFrame(columns)
-            st.dataframe(
-                df,
-                hide_index=True,
-                use_container_width=True
-            )
+    render_schema_browser(
+        cached_schema_index(st.session_state.schema_name, st.session_state.schema_manager),
+        key="schema_viewer_browser"
+    )
 
 def display_schema_history():
     """Display schema modification history"""
@@ -512,6 +409,37 @@ def display_schema_history():
     except Exception as e:
         st.error(f"Error displaying history: {str(e)}")
 
+@st.fragment
+def schema_command_panel():
+    """Command input and history; reruns on its own until the schema actually changes"""
+    # Reduce text area height from 100 to 80
+    user_input = st.text_area(
+        "What would you like to do with the schema?", 
+        value=st.session_state.schema_input,
+        placeholder="e.g., Create a new users table with email and password columns",
+        height=80,  # Reduced from 100
+        key="schema_input"
+    )
+    
+    if st.button("🚀 Execute Changes", type="primary", use_container_width=True):
+        with st.spinner("Processing..."):
+            result = st.session_state.assistant.process_command(user_input)
+            if result['success']:
+                st.success("Successfully executed SQL")
+                st.code(result['sql'], language='sql')
+                time.sleep(0.5)
+                # New schema version: redraw the whole page, ERD included
+                invalidate_schema_caches()
+                st.rerun()
+            else:
+                st.error(result['error'])
+    
+    # History section with reduced padding
+    st.markdown('<div class="schema-history" style="margin-top: 1rem;">', unsafe_allow_html=True)
+    st.markdown("### 📝 Schema Modification History")
+    display_schema_history()
+    st.markdown('</div>', unsafe_allow_html=True)
+
 def schema_assistant_tab():
     # Initialize schema_input if not present
     if 'schema_input' not in st.session_state:
@@ -547,31 +475,7 @@ def schema_assistant_tab():
     col1, col2 = st.columns([3, 2])
     
     with col1:
-        # Reduce text area height from 100 to 80
-        user_input = st.text_area(
-            "What would you like to do with the schema?", 
-            value=st.session_state.schema_input,
-            placeholder="e.g., Create a new users table with email and password columns",
-            height=80,  # Reduced from 100
-            key="schema_input"
-        )
-        
-        if st.button("🚀 Execute Changes", type="primary", use_container_width=True):
-            with st.spinner("Processing..."):
-                result = st.session_state.assistant.process_command(user_input)
-                if result['success']:
-                    st.success("Successfully executed SQL")
-                    st.code(result['sql'], language='sql')
-                    time.sleep(0.5)
-                    st.rerun()
-                else:
-                    st.error(result['error'])
-        
-        # History section with reduced padding
-        st.markdown('<div class="schema-history" style="margin-top: 1rem;">', unsafe_allow_html=True)
-        st.markdown("### 📝 Schema Modification History")
-        display_schema_history()
-        st.markdown('</div>', unsafe_allow_html=True)
+        schema_command_panel()
     
     with col2:
         # Current schema viewer
@@ -585,40 +489,16 @@ def display_current_schema():
     # ERD Section - Increased image width
     with st.expander("Entity Relationship Diagram", expanded=True):
         with st.spinner("Generating ERD..."):
-            erd_path, error = get_schema_erd()
-            if erd_path:
+            erd_image = render_erd(st.session_state.schema_manager.engine)
+            if erd_image:
                 # Increased image width by 20%
-                st.image(erd_path, width=None, use_container_width=True)
-            else:
-                st.error(f"Failed to generate ERD: {error}")
+                st.image(erd_image, width=None, use_container_width=True)
     
-    # Table details remain the same
-    schema_info = st.session_state.schema_manager.get_schema_info()
-    for table in schema_info:
-        with st.expander(f"📋 {table['table_name']}", expanded=False):
-            columns = []
-            for col in table['columns']:
-                col_type = col['type']
-                attributes = []
-                if col.get('primary_key'):
-                    attributes.append('🔑 PK')
-                if col.get('foreign_key', {}).get('is_fk'):
-                    attributes.append('🔗 FK')
-                if not col.get('nullable', True):
-                    attributes.append('Required')
-                
-                columns.append({
-                    'Column': col['name'],
-                    'Type': col_type,
-                    'Attributes': ' | '.join(attributes) if attributes else ''
-                })
-            
-            df = pd.DataFrame(columns)
-            st.dataframe(
-                df,
-                hide_index=True,
-                use_container_width=True
-            )
+    # Table details, searchable and paginated
+    render_schema_browser(
+        cached_schema_index(st.session_state.schema_name, st.session_state.schema_manager),
+        key="current_schema_browser"
+    )
 
 def delete_current_schema():
     """Delete current schema and clean up resources"""
@@ -641,6 +521,8 @@ def delete_current_schema():
             conn.execute(text(f"DROP SCHEMA IF EXISTS {schema_name}"))
             conn.commit()
         
+        invalidate_schema_caches()
+        
         # Clear session state
         print(f"[DEBUG] Clearing session state")
         for key in ['schema_name', 'schema_manager', 'designer', 'assistant']:
@@ -737,6 +619,8 @@ def delete_database():
             conn.execute(text(f"DROP DATABASE IF EXISTS {schema_name}"))
         print("[DEBUG] Database dropped successfully")
         
+        invalidate_schema_caches()
+        
         # Clear session state
         print("[DEBUG] Clearing session state")
         for key in ['schema_name', 'schema_manager', 'designer', 'assistant']:
@@ -762,6 +646,7 @@ def main():
         initial_sidebar_state="expanded"
     )
     
+    started = time.perf_counter()
     load_css()
     
     # Initialize basic SchemaManager for getting schemas
@@ -880,6 +765,8 @@ def main():
                 st.markdown('</div>', unsafe_allow_html=True)
             
             query_database_tab()
+    
+    log_render_time("full page", started)
 
 if __name__ == "__main__":
     main() 
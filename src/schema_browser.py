@@ -0,0 +1,125 @@
+import math
+import os
+from typing import Dict, List
+import pandas as pd
+import streamlit as st
+
+class SchemaIndex:
+    """In-memory search index over table and column names and comments"""
+
+    def __init__(self, schema_info: List[Dict]):
+        self.tables = {table["table_name"]: table for table in schema_info}
+        self.names = sorted(self.tables)
+        self._names_lower = {name: name.lower() for name in self.names}
+        self._columns_lower = {
+            name: " ".join(col["name"].lower() for col in table["columns"])
+            for name, table in self.tables.items()
+        }
+        self._comments_lower = {
+            name: " ".join(
+                [(table.get("table_description") or "").lower()]
+                + [(col.get("column_description") or "").lower() for col in table["columns"]]
+            )
+            for name, table in self.tables.items()
+        }
+        self._column_frames: Dict[str, pd.DataFrame] = {}
+
+    def search(self, query: str) -> List[str]:
+        """Tables matching every term, ranked by where the terms matched"""
+        terms = query.lower().split()
+        if not terms:
+            return self.names
+
+        ranked = []
+        for name in self.names:
+            table_name, columns, comments = self._names_lower[name], self._columns_lower[name], self._comments_lower[name]
+            score = 0
+            for term in terms:
+                if table_name == term:
+                    score += 8
+                elif table_name.startswith(term):
+                    score += 4
+                elif term in table_name:
+                    score += 3
+                elif term in columns:
+                    score += 2
+                elif term in comments:
+                    score += 1
+                else:
+                    break
+            else:
+                ranked.append((-score, name))
+        return [name for _, name in sorted(ranked)]
+
+    def summary(self, names: List[str]) -> pd.DataFrame:
+        """One row per table, used for the paginated table list"""
+        return pd.DataFrame([
+            {
+                "Table": name,
+                "Columns": len(self.tables[name]["columns"]),
+                "References": ", ".join(sorted({
+                    ref["table"]
+                    for col in self.tables[name]["columns"]
+                    for ref in col.get("foreign_key", {}).get("references", [])
+                })),
+                "Description": self.tables[name].get("table_description") or ""
+            }
+            for name in names
+        ], columns=["Table", "Columns", "References", "Description"])
+
+    def columns(self, name: str) -> pd.DataFrame:
+        """Column details for one table, built the first time it is opened"""
+        if name not in self._column_frames:
+            rows = []
+            for col in self.tables[name]["columns"]:
+                attributes = []
+                if col.get("primary_key"):
+                    attributes.append("🔑 PK")
+                if col.get("foreign_key", {}).get("is_fk"):
+                    references = ", ".join(
+                        f"{ref['table']}.{ref['column']}" for ref in col["foreign_key"].get("references", [])
+                    )
+                    attributes.append(f"🔗 FK → {references}")
+                if not col.get("nullable", True):
+                    attributes.append("Required")
+                rows.append({
+                    "Column": col["name"],
+                    "Type": col["type"],
+                    "Attributes": " | ".join(attributes),
+                    "Description": col.get("column_description") or ""
+                })
+            self._column_frames[name] = pd.DataFrame(rows, columns=["Column", "Type", "Attributes", "Description"])
+        return self._column_frames[name]
+
+
+@st.fragment
+def render_schema_browser(index: SchemaIndex, key: str = "schema_browser"):
+    """Search, page through tables and open the columns of the selected ones only"""
+    page_size = int(os.getenv("SCHEMA_BROWSER_PAGE_SIZE", "50"))
+
+    search_col, page_col = st.columns([4, 1])
+    with search_col:
+        query = st.text_input(
+            "Search tables", key=f"{key}_search",
+            placeholder="Table, column or description, e.g. customer email"
+        )
+    matches = index.search(query)
+    page_count = max(math.ceil(len(matches) / page_size), 1)
+    with page_col:
+        page = st.number_input("Page", min_value=1, max_value=page_count, value=1, key=f"{key}_page") - 1
+
+    names = matches[page * page_size:(page + 1) * page_size]
+    st.caption(f"{len(matches):,} of {len(index.names):,} tables · page {page + 1} of {page_count} · select rows to see columns")
+    selection = st.dataframe(
+        index.summary(names),
+        hide_index=True,
+        use_container_width=True,
+        on_select="rerun",
+        selection_mode="multi-row",
+        key=f"{key}_tables_{query}_{page}"
+    )
+
+    for row in selection.selection.rows:
+        name = names[row]
+        st.markdown(f"**📋 {name}**")
+        st.dataframe(index.columns(name), hide_index=True, use_container_width=True)
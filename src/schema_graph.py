@@ -0,0 +1,122 @@
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+from sqlalchemy import text
+
+def load_catalog(engine, schema_name: str = None) -> Tuple[List, List]:
+    """Columns and foreign keys from INFORMATION_SCHEMA; defaults to the connection's database.
+
+    Foreign keys are (table, column, ref_table, ref_column, constraint) rows, with the
+    columns of a composite key in key order.
+    """
+    with engine.connect() as conn:
+        columns = conn.execute(text("""
+            SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE
+            FROM INFORMATION_SCHEMA.COLUMNS
+            WHERE TABLE_SCHEMA = COALESCE(:schema, DATABASE())
+            ORDER BY TABLE_NAME, ORDINAL_POSITION
+        """), {"schema": schema_name}).fetchall()
+        relationships = conn.execute(text("""
+            SELECT TABLE_NAME, COLUMN_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME, CONSTRAINT_NAME
+            FROM INFORMATION_SCHEMA.KEY_COLUMN_USAGE
+            WHERE TABLE_SCHEMA = COALESCE(:schema, DATABASE()) AND REFERENCED_TABLE_NAME IS NOT NULL
+            ORDER BY TABLE_NAME, CONSTRAINT_NAME, ORDINAL_POSITION
+        """), {"schema": schema_name}).fetchall()
+    return [tuple(row) for row in columns], [tuple(row) for row in relationships]
+
+
+class SchemaGraph:
+    """Foreign-key graph of a schema with precomputed adjacency for fast neighbourhood queries"""
+
+    def __init__(self, columns: List, relationships: List):
+        self.columns: Dict[str, List[Tuple[str, str]]] = {}
+        for table, column, column_type in columns:
+            self.columns.setdefault(table, []).append((column, column_type))
+
+        # Column pairs, grouped into foreign keys by constraint; rows without a name are single-column keys
+        self.edges = [tuple(edge[:4]) for edge in relationships]
+        grouped: Dict[Tuple, List[Tuple]] = {}
+        for position, edge in enumerate(relationships):
+            constraint = edge[4] if len(edge) > 4 else None
+            grouped.setdefault((edge[0], constraint or position), []).append(tuple(edge[:4]))
+        self.foreign_keys = [tuple(pairs) for pairs in grouped.values()]
+
+        # Undirected adjacency: table -> neighbour -> foreign keys between them, each a tuple of column pairs
+        self.adjacency: Dict[str, Dict[str, List[Tuple]]] = {table: {} for table in self.columns}
+        for foreign_key in self.foreign_keys:
+            table, _, ref_table, _ = foreign_key[0]
+            self.adjacency.setdefault(table, {}).setdefault(ref_table, []).append(foreign_key)
+            self.adjacency.setdefault(ref_table, {}).setdefault(table, []).append(foreign_key)
+
+    @classmethod
+    def from_engine(cls, engine, schema_name: str = None) -> "SchemaGraph":
+        return cls(*load_catalog(engine, schema_name))
+
+    @property
+    def tables(self) -> List[str]:
+        return sorted(self.adjacency)
+
+    def neighbourhood(self, focus: Iterable[str], hops: int = 1) -> List[str]:
+        """Tables within `hops` foreign keys of any focus table, nearest first"""
+        distance = {table: 0 for table in focus if table in self.adjacency}
+        queue = deque(distance)
+        while queue:
+            table = queue.popleft()
+            if distance[table] == hops:
+                continue
+            for neighbour in self.adjacency[table]:
+                if neighbour not in distance:
+                    distance[neighbour] = distance[table] + 1
+                    queue.append(neighbour)
+        return list(distance)
+
+    def subgraph_edges(self, tables: Iterable[str]) -> List[Tuple]:
+        selected = set(tables)
+        return [edge for edge in self.edges if edge[0] in selected and edge[2] in selected]
+
+    def to_dot(self, tables: List[str], focus: Iterable[str] = (), max_columns: int = 12) -> str:
+        """Graphviz source for a subgraph, small enough to lay out in the browser"""
+        focus = set(focus)
+        edges = self.subgraph_edges(tables)
+        key_columns = {(edge[0], edge[1]) for edge in edges} | {(edge[2], edge[3]) for edge in edges}
+
+        lines = [
+            "digraph ERD {",
+            '  graph [rankdir=LR, splines=polyline, nodesep=0.6, ranksep=1.0, fontname="Arial"];',
+            '  node [shape=none, margin=0, fontname="Arial", fontsize=11];',
+            '  edge [fontname="Arial", fontsize=9, color="#666666", dir=both, arrowhead=crowodot, arrowtail=teedot];'
+        ]
+        for table in tables:
+            header_color = "#FFD54F" if table in focus else "#E0E0E0"
+            rows = [f'<TR><TD PORT="header" BGCOLOR="{header_color}"><B>{table}</B></TD></TR>']
+            # Keep join columns visible and cap the rest so wide tables stay readable
+            columns = self.columns.get(table, [])
+            shown = [c for c in columns if (table, c[0]) in key_columns]
+            shown += [c for c in columns if (table, c[0]) not in key_columns][:max(max_columns - len(shown), 0)]
+            for column, column_type in shown:
+                rows.append(f'<TR><TD PORT="{column}" ALIGN="LEFT">{column} ({column_type})</TD></TR>')
+            if len(columns) > len(shown):
+                rows.append(f'<TR><TD ALIGN="LEFT"><I>… {len(columns) - len(shown)} more columns</I></TD></TR>')
+            label = '<TABLE BORDER="0" CELLBORDER="1" CELLSPACING="0" CELLPADDING="4">' + "".join(rows) + "</TABLE>"
+            lines.append(f'  "{table}" [label=<{label}>];')
+        for table, column, ref_table, ref_column in edges:
+            lines.append(f'  "{table}":"{column}":e -> "{ref_table}":"{ref_column}":w;')
+        lines.append("}")
+        return "\n".join(lines)
+
+    def to_json(self, tables: List[str], focus: Iterable[str] = ()) -> Dict:
+        """Node/edge lists for client-side graph rendering"""
+        focus = set(focus)
+        return {
+            "nodes": [
+                {
+                    "id": table,
+                    "focus": table in focus,
+                    "columns": [{"name": column, "type": column_type} for column, column_type in self.columns.get(table, [])]
+                }
+                for table in tables
+            ],
+            "edges": [
+                {"source": table, "source_column": column, "target": ref_table, "target_column": ref_column}
+                for table, column, ref_table, ref_column in self.subgraph_edges(tables)
+            ]
+        }
@@ -1,14 +1,21 @@
 import numpy as np
+import asyncio
 import json
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 from sentence_transformers import SentenceTransformer
 from sqlalchemy import create_engine, MetaData, text
 from typing import List, Dict
 from numpy.linalg import norm
+from schema_graph import SchemaGraph
+from join_planner import JoinPlanner
+from table_profiler import TableProfiler, load_stats, save_stats
+from value_index import ValueIndex
+from intent_matcher import IntentMatcher
 
 class SchemaManager:
-    def __init__(self, db_url: str, schema_name: str = None, vector_store_path="./vector_store", model_path="./models", skip_embeddings=False):
+    def __init__(self, db_url: str, schema_name: str = None, vector_store_path="./vector_store", model_path="./models", skip_embeddings=False, model=None):
         self.db_url = db_url.rstrip('/')  # Remove trailing slash if present
         self.schema_name = schema_name
         self.model_path = model_path
@@ -28,6 +35,8 @@ class SchemaManager:
         self.embeddings_file = os.path.join(self.vector_store_path, "embeddings.npy")
         self.texts_file = os.path.join(self.vector_store_path, "texts.json")
         self.metadata_file = os.path.join(self.vector_store_path, "metadata.json")
+        self.stats_file = os.path.join(self.vector_store_path, "stats.json")
+        self.values_file = os.path.join(self.vector_store_path, "values.json")
         
         print(f"Embeddings file: {self.embeddings_file}")
         print(f"Texts file: {self.texts_file}")
@@ -39,13 +48,31 @@ class SchemaManager:
         self.schema_metadata = []
         self.normalized_embeddings = None
         
+        # FK graph and join planner, built from the catalog on first use
+        self._schema_graph = None
+        self._join_planner = None
+        self._intent_matcher = None
+        
+        # Table and column statistics, loaded from stats_file on first use
+        self._table_stats = None
+        
+        # Distinct-value index for grounding question literals, loaded from values_file on first use
+        self._value_index = None
+        self._value_index_loaded = False
+        
+        # Single worker so concurrent async callers never run the model in parallel
+        self._embedding_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed")
+        
         # Initialize database connection
         self._initialize_db_connection()
         
         # Only initialize embeddings if not skipped
         if not skip_embeddings:
-            # Initialize embeddings model
-            self._initialize_embeddings_model()
+            # Initialize embeddings model, reusing one that is already loaded if given
+            if model is not None:
+                self.model = model
+            else:
+                self._initialize_embeddings_model()
             
             # Load existing embeddings if available and schema hasn't changed
             if self.embeddings_exist():
@@ -200,11 +227,25 @@ class SchemaManager:
                 1e-12  # Avoid division by zero
             )
     
-    def similarity_search(self, query: str, k: int = 3, threshold: float = 0.5) -> List[Dict]:
-        """Optimized similarity search using normalized embeddings"""
-        # Encode and normalize query
+    def encode_query(self, query: str) -> np.ndarray:
+        """Encode and normalize a query for cosine similarity"""
         query_embedding = self.model.encode([query])[0]
-        query_norm = query_embedding / np.maximum(norm(query_embedding), 1e-12)
+        return query_embedding / np.maximum(norm(query_embedding), 1e-12)
+    
+    def encode_queries(self, queries: List[str]) -> np.ndarray:
+        """Encode and normalize a batch of queries in one model call"""
+        embeddings = self.model.encode(queries, batch_size=32, show_progress_bar=False, convert_to_numpy=True)
+        return embeddings / np.maximum(norm(embeddings, axis=1, keepdims=True), 1e-12)
+    
+    async def aencode_query(self, query: str) -> np.ndarray:
+        """Encode a query on the embedding worker without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._embedding_executor, self.encode_query, query)
+    
+    def similarity_search(self, query: str, k: int = 3, threshold: float = 0.5, query_embedding: np.ndarray = None) -> List[Dict]:
+        """Optimized similarity search using normalized embeddings"""
+        # Encode and normalize query unless the caller already did
+        query_norm = query_embedding if query_embedding is not None else self.encode_query(query)
         
         # Compute similarities using normalized vectors (dot product = cosine similarity)
         similarities = np.dot(self.normalized_embeddings, query_norm)
@@ -229,6 +270,9 @@ class SchemaManager:
         """Update schema embeddings with optimization and progress tracking"""
         print("Updating vector store...")
         schema_info = self.get_schema_info()
+        self._schema_graph = None
+        self._join_planner = None
+        self._intent_matcher = None
         self.schema_texts = []
         self.schema_metadata = []
         
@@ -308,10 +352,105 @@ class SchemaManager:
         
         # Save to files
         self._save_stored_data()
+        
+        # Refresh the statistics alongside the embeddings; prompts work without them
+        if os.getenv("TABLE_STATS_ENABLED", "true").lower() == "true":
+            try:
+                self.update_table_stats()
+            except Exception as e:
+                print(f"Error profiling tables: {str(e)}")
+        
+        # Built after the statistics so their NDV can rule out high-cardinality columns
+        if os.getenv("VALUE_INDEX_ENABLED", "true").lower() == "true":
+            try:
+                self.update_value_index()
+            except Exception as e:
+                print(f"Error building value index: {str(e)}")
 
-    def semantic_table_search(self, query: str, min_score: float = 0.6) -> List[Dict]:
+    def schema_graph(self) -> SchemaGraph:
+        """Foreign-key graph of this schema"""
+        if self._schema_graph is None:
+            self._schema_graph = SchemaGraph.from_engine(self.engine, self.schema_name)
+        return self._schema_graph
+    
+    def join_planner(self, max_hops: int = 3) -> JoinPlanner:
+        """Shared planner so cached join paths survive across questions"""
+        if self._join_planner is None or self._join_planner.max_hops != max_hops:
+            self._join_planner = JoinPlanner(self.schema_graph(), max_hops=max_hops)
+        return self._join_planner
+    
+    def intent_matcher(self) -> IntentMatcher:
+        """Fast-path matcher over the embedded table metadata, shared across chats"""
+        if self._intent_matcher is None:
+            self._intent_matcher = IntentMatcher(
+                self.schema_metadata,
+                self.schema_name,
+                default_rows=int(os.getenv("FAST_PATH_DEFAULT_ROWS", "10")),
+                max_rows=int(os.getenv("FAST_PATH_MAX_ROWS", "1000"))
+            )
+        return self._intent_matcher
+    
+    def update_table_stats(self, progress_callback=None) -> Dict:
+        """Profile the schema's tables and store the statistics next to the embeddings"""
+        profiler = TableProfiler(
+            self.engine,
+            self.schema_name,
+            sample_rows=int(os.getenv("TABLE_STATS_SAMPLE_ROWS", "10000")),
+            max_workers=int(os.getenv("TABLE_STATS_WORKERS", "2")),
+            statement_timeout=float(os.getenv("TABLE_STATS_TIMEOUT_SECONDS", "30"))
+        )
+        stats = profiler.profile(progress_callback)
+        save_stats(stats, self.stats_file)
+        self._table_stats = stats
+        return stats
+    
+    def table_stats(self) -> Dict:
+        """Stored table statistics, or an empty dict when the schema has not been profiled"""
+        if self._table_stats is None:
+            try:
+                self._table_stats = load_stats(self.stats_file)
+            except Exception as e:
+                print(f"Error loading table stats: {str(e)}")
+                self._table_stats = {}
+        return self._table_stats
+    
+    def update_value_index(self) -> ValueIndex:
+        """Collect distinct values of text columns and store them next to the embeddings"""
+        index = ValueIndex.build(
+            self.engine,
+            self.schema_name,
+            max_distinct=int(os.getenv("VALUE_INDEX_MAX_DISTINCT", "1000")),
+            sample_rows=int(os.getenv("VALUE_INDEX_SAMPLE_ROWS", "50000")),
+            max_workers=int(os.getenv("TABLE_STATS_WORKERS", "2")),
+            statement_timeout=float(os.getenv("TABLE_STATS_TIMEOUT_SECONDS", "30")),
+            table_stats=self.table_stats()
+        )
+        index.save(self.values_file)
+        self._value_index = index
+        self._value_index_loaded = True
+        return index
+    
+    def value_index(self) -> ValueIndex:
+        """Stored value index, or None when it has not been built"""
+        if not self._value_index_loaded:
+            try:
+                self._value_index = ValueIndex.load(self.values_file)
+            except Exception as e:
+                print(f"Error loading value index: {str(e)}")
+                self._value_index = None
+            self._value_index_loaded = True
+        return self._value_index
+    
+    def table_text(self, table_name: str) -> str:
+        """Embedded description of a table, as used in prompts"""
+        for schema_text, metadata in zip(self.schema_texts, self.schema_metadata):
+            if metadata.get('table') == table_name:
+                return schema_text
+        return None
+    
+    def semantic_table_search(self, query: str, min_score: float = 0.6, query_embedding: np.ndarray = None) -> List[Dict]:
         """Search for semantically similar tables"""
-        results = self.similarity_search(query, k=len(self.schema_texts), threshold=min_score)
+        results = self.similarity_search(query, k=len(self.schema_texts), threshold=min_score, query_embedding=query_embedding)
         
         # Group by table and aggregate scores
         table_scores = {}
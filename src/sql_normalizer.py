@@ -0,0 +1,167 @@
+import hashlib
+from decimal import Decimal
+from typing import List, Tuple
+
+# Keywords that make the following string a typed literal (DATE '2024-01-01'), which cannot take a placeholder
+_TYPED_LITERAL_KEYWORDS = {"DATE", "TIME", "TIMESTAMP"}
+_CLAUSE_KEYWORDS = {"SELECT", "FROM", "WHERE", "GROUP", "HAVING", "ORDER", "LIMIT", "ON", "JOIN", "UNION"}
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch in "_$"
+
+
+def _read_quoted(sql_query: str, start: int) -> int:
+    """Index just past the quoted token starting at start, honouring doubled quotes and backslashes"""
+    quote = sql_query[start]
+    i = start + 1
+    while i < len(sql_query):
+        ch = sql_query[i]
+        if ch == "\\" and quote != "`":
+            i += 2
+            continue
+        if ch == quote:
+            if i + 1 < len(sql_query) and sql_query[i + 1] == quote:
+                i += 2
+                continue
+            return i + 1
+        i += 1
+    return len(sql_query)
+
+
+def _unquote(token: str) -> str:
+    quote = token[0]
+    body = token[1:-1].replace(quote * 2, quote)
+    escapes = {"n": "\n", "t": "\t", "r": "\r", "0": "\0", "Z": "\x1a"}
+    out = []
+    i = 0
+    while i < len(body):
+        if body[i] == "\\" and i + 1 < len(body):
+            out.append(escapes.get(body[i + 1], body[i + 1]))
+            i += 2
+        else:
+            out.append(body[i])
+            i += 1
+    return "".join(out)
+
+
+def _number(token: str):
+    if "e" in token.lower():
+        return float(token)
+    if "." in token:
+        return Decimal(token)
+    return int(token)
+
+
+def normalize_sql(sql_query: str) -> Tuple[str, List]:
+    """Lift string and number literals into ? placeholders.
+
+    Returns the statement shape and the literal values in order. Whitespace is
+    collapsed so formatting differences share a shape and line comments are dropped,
+    since collapsing their ending newline would comment out the rest of the statement.
+    Block comments and optimizer hints, quoted identifiers, typed and prefixed literals
+    (DATE '...', X'...', N'...') and ORDER BY / GROUP BY positions are left in place.
+    """
+    sql_query = sql_query.strip().rstrip(';').rstrip()
+    out = []
+    params = []
+    previous = ""  # Last significant token, upper-cased
+    depth = 0
+    clause_at = {}
+    i = 0
+    n = len(sql_query)
+    while i < n:
+        ch = sql_query[i]
+        if ch.isspace():
+            while i < n and sql_query[i].isspace():
+                i += 1
+            if not out or out[-1] != " ":
+                out.append(" ")
+            continue
+
+        if sql_query.startswith("/*", i):
+            end = sql_query.find("*/", i + 2)
+            end = n if end == -1 else end + 2
+            out.append(sql_query[i:end])
+            i = end
+            continue
+        if ch == "#" or (sql_query.startswith("--", i) and (i + 2 == n or sql_query[i + 2].isspace())):
+            end = sql_query.find("\n", i)
+            # The newline that ends the comment still separates the tokens around it
+            i = n if end == -1 else end
+            continue
+
+        if ch in "'\"`":
+            end = _read_quoted(sql_query, i)
+            token = sql_query[i:end]
+            prefixed = out and out[-1] and _is_word_char(out[-1][-1])
+            if ch == "`" or prefixed or previous in _TYPED_LITERAL_KEYWORDS:
+                out.append(token)
+            else:
+                params.append(_unquote(token))
+                out.append("?")
+            previous = token.upper()
+            i = end
+            continue
+
+        leading_point = (ch == "." and i + 1 < n and sql_query[i + 1].isdigit()
+                         and not (out and out[-1] and (_is_word_char(out[-1][-1]) or out[-1][-1] in "`)")))
+        if ch.isdigit() or leading_point:
+            end = i
+            while end < n and sql_query[end].isdigit():
+                end += 1
+            if end < n and sql_query[end] == ".":
+                end += 1
+                while end < n and sql_query[end].isdigit():
+                    end += 1
+            if end < n and sql_query[end] in "eE" and end + 1 < n and (sql_query[end + 1].isdigit() or sql_query[end + 1] in "+-"):
+                end += 2
+                while end < n and sql_query[end].isdigit():
+                    end += 1
+            token = sql_query[i:end]
+            if end < n and _is_word_char(sql_query[end]):
+                # Hex literal or an identifier that starts with digits, e.g. 0x1F or 1st_quarter
+                while end < n and _is_word_char(sql_query[end]):
+                    end += 1
+                out.append(sql_query[i:end])
+                previous = sql_query[i:end].upper()
+            elif clause_at.get(depth) in ("ORDER", "GROUP") and previous in ("BY", ","):
+                # Column positions change meaning as placeholders
+                out.append(token)
+                previous = token
+            else:
+                params.append(_number(token))
+                out.append("?")
+                previous = "?"
+            i = end
+            continue
+
+        if _is_word_char(ch):
+            end = i
+            while end < n and _is_word_char(sql_query[end]):
+                end += 1
+            token = sql_query[i:end]
+            upper = token.upper()
+            if upper in _CLAUSE_KEYWORDS:
+                clause_at[depth] = upper
+            out.append(token)
+            previous = upper
+            i = end
+            continue
+
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            clause_at.pop(depth, None)
+            depth = max(depth - 1, 0)
+        out.append(ch)
+        previous = ch
+        i += 1
+
+    return "".join(out).strip(), params
+
+
+def sql_fingerprint(sql_query: str) -> str:
+    """Stable id for a statement's shape, shared by every literal variant of it"""
+    shape, _ = normalize_sql(sql_query)
+    return hashlib.sha1(shape.encode("utf-8")).hexdigest()[:16]
@@ -0,0 +1,132 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Dict, List
+from sqlalchemy import text
+from schema_graph import load_catalog
+from query_executor import quote_identifier, with_max_execution_time
+
+# Column types whose distinct values and ranges are too expensive or meaningless to profile
+_UNPROFILED_TYPES = ("blob", "binary", "json", "geometry", "point", "polygon")
+_RANGE_TYPES = ("int", "decimal", "numeric", "float", "double", "date", "time", "year")
+
+
+class TableProfiler:
+    """Collects table sizes and sampled per-column statistics with bounded database load.
+
+    Sizes come from INFORMATION_SCHEMA.TABLES; column statistics come from one aggregate
+    query per table over at most sample_rows rows, run on a small worker pool and capped
+    by MAX_EXECUTION_TIME.
+    """
+
+    def __init__(self, engine, schema_name: str = None, sample_rows: int = 10000, max_workers: int = 2,
+                 statement_timeout: float = 30):
+        self.engine = engine
+        self.schema_name = schema_name
+        self.sample_rows = sample_rows
+        self.max_workers = max_workers
+        self.statement_timeout = statement_timeout
+
+    def table_sizes(self) -> Dict[str, Dict]:
+        """Estimated row counts and on-disk sizes per table"""
+        with self.engine.connect() as conn:
+            rows = conn.execute(text("""
+                SELECT TABLE_NAME, TABLE_ROWS, DATA_LENGTH, INDEX_LENGTH
+                FROM INFORMATION_SCHEMA.TABLES
+                WHERE TABLE_SCHEMA = COALESCE(:schema, DATABASE()) AND TABLE_TYPE = 'BASE TABLE'
+            """), {"schema": self.schema_name}).fetchall()
+        return {
+            table: {"rows": int(table_rows or 0), "data_bytes": int(data or 0), "index_bytes": int(index or 0)}
+            for table, table_rows, data, index in rows
+        }
+
+    def profile_table(self, table: str, columns: List, table_rows: int) -> Dict[str, Dict]:
+        """NDV, null fraction and min/max per column over a sample of the table"""
+        expressions = ["COUNT(*)"]
+        layout = []
+        for column, column_type in columns:
+            quoted = quote_identifier(column)
+            lowered = column_type.lower()
+            kinds = ["nulls"]
+            expressions.append(f"SUM({quoted} IS NULL)")
+            if not any(t in lowered for t in _UNPROFILED_TYPES):
+                kinds.append("ndv")
+                expressions.append(f"COUNT(DISTINCT {quoted})")
+                if any(t in lowered for t in _RANGE_TYPES):
+                    kinds += ["min", "max"]
+                    expressions += [f"MIN({quoted})", f"MAX({quoted})"]
+            layout.append((column, column_type, kinds))
+
+        sample_columns = ", ".join(quote_identifier(column) for column, _ in columns)
+        sql_query = (
+            f"SELECT {', '.join(expressions)} FROM "
+            f"(SELECT {sample_columns} FROM {quote_identifier(table)} LIMIT {int(self.sample_rows)}) AS _sample"
+        )
+        with self.engine.connect() as conn:
+            values = list(conn.execute(text(with_max_execution_time(sql_query, self.statement_timeout * 1000))).fetchone())
+
+        sampled = int(values.pop(0) or 0)
+        stats = {}
+        for column, column_type, kinds in layout:
+            column_stats = {"type": column_type}
+            for kind in kinds:
+                column_stats[kind] = values.pop(0)
+            nulls = int(column_stats.pop("nulls") or 0)
+            column_stats["null_fraction"] = round(nulls / sampled, 4) if sampled else None
+            if "ndv" in column_stats:
+                sampled_ndv = int(column_stats.pop("ndv") or 0)
+                column_stats["sampled_ndv"] = sampled_ndv
+                # A column that is (nearly) all distinct in the sample scales with the table
+                non_null = sampled - nulls
+                if non_null and sampled_ndv >= 0.9 * non_null and table_rows > sampled:
+                    column_stats["ndv"] = int(sampled_ndv * table_rows / sampled)
+                else:
+                    column_stats["ndv"] = sampled_ndv
+            for kind in ("min", "max"):
+                if column_stats.get(kind) is not None:
+                    column_stats[kind] = str(column_stats[kind])
+            stats[column] = column_stats
+        return {"sampled_rows": sampled, "columns": stats}
+
+    def profile(self, progress_callback=None) -> Dict:
+        """Profile every table in parallel and return the stats document"""
+        sizes = self.table_sizes()
+        columns, _ = load_catalog(self.engine, self.schema_name)
+        columns_by_table = {}
+        for table, column, column_type in columns:
+            columns_by_table.setdefault(table, []).append((column, column_type))
+
+        tables = {table: dict(size) for table, size in sizes.items()}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="profile") as pool:
+            futures = {
+                pool.submit(self.profile_table, table, columns_by_table.get(table, []), size["rows"]): table
+                for table, size in sizes.items() if columns_by_table.get(table)
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                table = futures[future]
+                try:
+                    tables[table].update(future.result())
+                except Exception as e:
+                    print(f"[TableProfiler] Skipping column stats for {table}: {e}")
+                if progress_callback:
+                    progress_callback(done / len(futures))
+
+        return {
+            "schema": self.schema_name,
+            "profiled_at": datetime.now(timezone.utc).isoformat(),
+            "sample_rows": self.sample_rows,
+            "tables": tables
+        }
+
+
+def save_stats(stats: Dict, path: str):
+    with open(path, "w") as f:
+        json.dump(stats, f, default=str)
+
+
+def load_stats(path: str) -> Dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
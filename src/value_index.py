@@ -0,0 +1,157 @@
+import json
+import os
+import re
+import unicodedata
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from sqlalchemy import text
+from schema_graph import load_catalog
+from query_executor import quote_identifier, with_max_execution_time
+
+_STOPWORDS = {
+    "a", "an", "the", "in", "of", "for", "to", "from", "by", "with", "and", "or", "on", "at", "is", "are",
+    "was", "were", "be", "all", "any", "each", "every", "how", "many", "much", "what", "which", "who",
+    "whose", "where", "when", "show", "list", "give", "get", "find", "me", "my", "our", "their", "top",
+    "count", "number", "total", "average", "per", "than", "more", "less", "not", "no", "that", "this",
+    "those", "these", "there", "have", "has", "had", "do", "does", "did", "it", "its", "as", "between"
+}
+
+
+def normalize_value(value: str) -> str:
+    """Case- and accent-insensitive form used for matching"""
+    value = unicodedata.normalize("NFKD", str(value))
+    value = "".join(ch for ch in value if not unicodedata.combining(ch))
+    return " ".join(value.casefold().split())
+
+
+def trigrams(value: str) -> set:
+    padded = f"  {value} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _is_text_type(column_type: str) -> bool:
+    lowered = column_type.lower()
+    return "char" in lowered or lowered.startswith(("enum", "set"))
+
+
+class ValueIndex:
+    """Distinct values of low-to-medium-cardinality text columns, searchable by exact form and trigrams.
+
+    Literals in a question are resolved to the exact stored value and its column, so the
+    generated SQL can use an equality predicate instead of guessing with LIKE '%...%'.
+    """
+
+    def __init__(self, values: List[List[str]]):
+        # values: [value, table, column] triples
+        self.values = values
+        self._exact: Dict[str, List[int]] = {}
+        self._trigrams: Dict[str, List[int]] = {}
+        self._sizes = []
+        for position, (value, _, _) in enumerate(values):
+            normalized = normalize_value(value)
+            self._exact.setdefault(normalized, []).append(position)
+            grams = trigrams(normalized)
+            self._sizes.append(len(grams))
+            for gram in grams:
+                self._trigrams.setdefault(gram, []).append(position)
+
+    @classmethod
+    def build(cls, engine, schema_name: str = None, max_distinct: int = 1000, sample_rows: int = 50000,
+              max_workers: int = 2, statement_timeout: float = 30, table_stats: Dict = None) -> "ValueIndex":
+        """Sampled SELECT DISTINCT per text column; columns above max_distinct values are skipped"""
+        columns, _ = load_catalog(engine, schema_name)
+        stats = (table_stats or {}).get("tables", {})
+        candidates = []
+        for table, column, column_type in columns:
+            if not _is_text_type(column_type):
+                continue
+            # Profiled NDV rules out high-cardinality columns without querying them
+            ndv = stats.get(table, {}).get("columns", {}).get(column, {}).get("ndv")
+            if ndv is not None and (ndv == 0 or ndv > max_distinct):
+                continue
+            candidates.append((table, column))
+
+        def distinct_values(table, column):
+            quoted = quote_identifier(column)
+            sql_query = (
+                f"SELECT DISTINCT {quoted} FROM (SELECT {quoted} FROM {quote_identifier(table)} "
+                f"WHERE {quoted} IS NOT NULL LIMIT {int(sample_rows)}) AS _sample LIMIT {int(max_distinct) + 1}"
+            )
+            try:
+                with engine.connect() as conn:
+                    rows = conn.execute(text(with_max_execution_time(sql_query, statement_timeout * 1000))).fetchall()
+            except Exception as e:
+                print(f"[ValueIndex] Skipping {table}.{column}: {e}")
+                return []
+            if len(rows) > max_distinct:
+                return []
+            return [[str(row[0]), table, column] for row in rows if str(row[0]).strip()]
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="values") as pool:
+            results = pool.map(lambda candidate: distinct_values(*candidate), candidates)
+            values = [value for column_values in results for value in column_values]
+        return cls(values)
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump({"values": self.values}, f)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["ValueIndex"]:
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return cls(json.load(f)["values"])
+
+    def lookup(self, phrase: str, min_similarity: float = 0.75) -> List[Dict]:
+        """Stored values matching a phrase exactly (after normalization) or by trigram similarity"""
+        normalized = normalize_value(phrase)
+        if normalized in self._exact:
+            return [self._match(phrase, position, 1.0) for position in self._exact[normalized]]
+
+        grams = trigrams(normalized)
+        overlap = Counter()
+        for gram in grams:
+            overlap.update(self._trigrams.get(gram, ()))
+        matches = []
+        for position, shared in overlap.items():
+            # Dice coefficient over trigram sets
+            similarity = 2 * shared / (len(grams) + self._sizes[position])
+            if similarity >= min_similarity:
+                matches.append(self._match(phrase, position, round(similarity, 3)))
+        return sorted(matches, key=lambda match: -match["score"])
+
+    def _match(self, phrase: str, position: int, score: float) -> Dict:
+        value, table, column = self.values[position]
+        return {"phrase": phrase, "value": value, "table": table, "column": column, "score": score}
+
+    def resolve(self, question: str, max_matches: int = 5, min_similarity: float = 0.75) -> List[Dict]:
+        """Best stored value per literal in the question, longest phrases first"""
+        quoted = re.findall(r"[\"']([^\"']{2,})[\"']", question)
+        words = re.findall(r"[\w][\w.&-]*", question)
+        phrases = list(quoted)
+        for size in (3, 2, 1):
+            for start in range(len(words) - size + 1):
+                window = words[start:start + size]
+                if window[0].lower() in _STOPWORDS or window[-1].lower() in _STOPWORDS:
+                    continue
+                phrase = " ".join(window)
+                if len(phrase) >= 3 and not phrase.replace(".", "").isdigit():
+                    phrases.append(phrase)
+
+        matches = []
+        covered = set()
+        for phrase in dict.fromkeys(phrases):
+            phrase_words = set(normalize_value(phrase).split())
+            # A longer phrase that already matched claims its words
+            if phrase_words <= covered:
+                continue
+            found = self.lookup(phrase, min_similarity)
+            if found:
+                best_score = found[0]["score"]
+                matches.extend(match for match in found if match["score"] == best_score)
+                covered |= phrase_words
+            if len(matches) >= max_matches:
+                break
+        return matches[:max_matches]
@@ -0,0 +1,52 @@
+from conversation_memory import ConversationMemory, sql_tables
+
+
+def test_sql_tables_in_order_without_duplicates():
+    sql = "SELECT * FROM `orders` JOIN customers ON 1 LEFT JOIN orders o2 ON 1"
+    assert sql_tables(sql) == ["orders", "customers"]
+    assert sql_tables(None) == []
+
+
+def test_recent_turns_are_kept_verbatim():
+    memory = ConversationMemory(recent_turns=2)
+    memory.add("how many orders?", "There are 5 orders.", "SELECT COUNT(*) FROM orders")
+    rendered = memory.render()
+    assert "Q: how many orders?" in rendered
+    assert "SQL: SELECT COUNT(*) FROM orders" in rendered
+    assert "A: There are 5 orders." in rendered
+    assert memory.last_tables() == ["orders"]
+
+
+def test_older_turns_are_compressed_into_the_summary():
+    memory = ConversationMemory(recent_turns=1)
+    memory.add("orders from 2023", "...", "SELECT * FROM orders WHERE YEAR(order_date) = 2023 ORDER BY id")
+    memory.add("and customers?", "...", "SELECT * FROM customers")
+    assert memory.summary == ['- "orders from 2023" (tables: orders) filtered by YEAR(order_date) = 2023']
+    assert [turn["question"] for turn in memory.turns] == ["and customers?"]
+
+
+def test_summary_overflow_folds_into_earlier_tables():
+    memory = ConversationMemory(recent_turns=1, summary_token_budget=12)
+    for table in ("orders", "customers", "products", "stores"):
+        memory.add(f"show {table}", "...", f"SELECT * FROM {table}")
+    assert memory.earlier_tables == ["orders", "customers"]
+    assert len(memory.summary) == 1
+    assert memory.render().startswith("Tables used earlier: orders, customers")
+
+
+def test_render_stays_within_budget_and_falls_back_to_questions():
+    memory = ConversationMemory(recent_turns=3, token_budget=40)
+    memory.add("first question", "x" * 300, "SELECT 1")
+    memory.add("second question", "short", "SELECT 2")
+    rendered = memory.render()
+    assert "Q: first question\n\nQ: second question" in rendered
+    assert "x" * 50 not in rendered
+
+
+def test_deferred_answers_and_clear():
+    memory = ConversationMemory(answer_chars=5)
+    turn = memory.add("q", None, "SELECT * FROM t")
+    memory.set_response(turn, "a long answer")
+    assert memory.turns[0]["response"] == "a lon"
+    memory.clear()
+    assert memory.render() == "(no previous questions)"
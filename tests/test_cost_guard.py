@@ -0,0 +1,125 @@
+import pytest
+from cost_guard import CostGuard, add_limit, has_limit, is_aggregate, outer_limit, scan_limit
+
+
+def test_has_limit_only_checks_the_outer_query():
+    assert has_limit("SELECT * FROM t LIMIT 10;")
+    assert has_limit("SELECT * FROM t LIMIT 10, 20")
+    assert has_limit("SELECT * FROM t LIMIT 10 OFFSET 20")
+    assert not has_limit("SELECT * FROM (SELECT * FROM t LIMIT 10) x WHERE a = 1")
+
+
+def test_add_limit_keeps_an_existing_limit():
+    assert add_limit("SELECT * FROM t;", 1000) == "SELECT * FROM t\nLIMIT 1000"
+    assert add_limit("SELECT * FROM t LIMIT 5", 1000) == "SELECT * FROM t LIMIT 5"
+
+
+def test_is_aggregate():
+    assert is_aggregate("SELECT COUNT(*) FROM t")
+    assert is_aggregate("SELECT a FROM t GROUP BY a")
+    assert not is_aggregate("SELECT amount, counter FROM t")
+
+
+def test_huge_tables_match_whole_table_names_only():
+    guard = CostGuard(huge_table_rows=1000)
+    rows = {"events": 5000, "events_archive": 9000, "users": 10}
+    assert guard.huge_tables("SELECT * FROM `events` JOIN users ON users.id = events.user_id", rows) == ["events"]
+    assert guard.huge_tables("SELECT * FROM users, events_archive", rows) == ["events_archive"]
+    assert guard.huge_tables("SELECT * FROM users", rows) == []
+
+
+def test_analyze_flags_full_scans_and_large_sorts():
+    guard = CostGuard(max_estimated_rows=1_000_000, max_scan_rows=100_000, max_sort_rows=50_000)
+    plan = guard.analyze({
+        "query_block": {
+            "cost_info": {"query_cost": "123.4"},
+            "ordering_operation": {
+                "using_filesort": True,
+                "nested_loop": [
+                    {"table": {"table_name": "orders", "access_type": "ALL", "rows_examined_per_scan": 200000}},
+                    {"table": {"table_name": "customers", "access_type": "eq_ref", "key": "PRIMARY",
+                               "rows_examined_per_scan": 1}},
+                ]
+            }
+        }
+    })
+    assert plan["estimated_rows"] == 200000
+    assert plan["using_filesort"]
+    assert plan["violations"] == [
+        "full table scan of orders (~200,000 rows)",
+        "filesort/temporary table over ~200,000 rows",
+    ]
+
+
+def test_analyze_multiplies_nested_loop_rows():
+    plan = CostGuard(max_estimated_rows=1000).analyze({"query_block": {"nested_loop": [
+        {"table": {"table_name": "a", "access_type": "ref", "key": "k", "rows_examined_per_scan": 100}},
+        {"table": {"table_name": "b", "access_type": "ref", "key": "k", "rows_examined_per_scan": 50}},
+    ]}})
+    assert plan["estimated_rows"] == 5000
+    assert plan["violations"] == ["estimated 5,000 rows examined (limit 1,000)"]
+
+
+def test_unknown_action_is_rejected():
+    with pytest.raises(ValueError):
+        CostGuard(action="ignore")
+
+
+FULL_SCAN = {"query_block": {"table": {"table_name": "orders", "access_type": "ALL", "rows_examined_per_scan": 5_000_000}}}
+
+
+def test_outer_and_scan_limits():
+    assert outer_limit("SELECT * FROM t LIMIT 10") == 10
+    assert outer_limit("SELECT * FROM t LIMIT 20, 10") == 30
+    assert outer_limit("SELECT * FROM t LIMIT 10 OFFSET 5") == 15
+    assert outer_limit("SELECT * FROM t") is None
+    assert scan_limit("SELECT * FROM orders LIMIT 10") == 10
+    assert scan_limit("SELECT * FROM orders ORDER BY created_at LIMIT 10") is None
+    assert scan_limit("SELECT DISTINCT status FROM orders LIMIT 10") is None
+    assert scan_limit("SELECT status, COUNT(*) FROM orders GROUP BY status LIMIT 10") is None
+
+
+def test_already_limited_full_scan_is_not_flagged():
+    guard = CostGuard(max_scan_rows=1_000_000, action="reject")
+    sql_query = "SELECT * FROM orders LIMIT 10"
+    plan = guard.analyze(FULL_SCAN, row_limit=scan_limit(sql_query))
+    assert plan["estimated_rows"] == 10
+    assert plan["violations"] == []
+
+
+def test_limit_action_never_rejects_a_query_for_already_having_a_limit():
+    guard = CostGuard(max_scan_rows=1_000_000, action="limit")
+    sql_query = "SELECT * FROM orders ORDER BY created_at LIMIT 10"
+    plan = guard.analyze(FULL_SCAN, row_limit=scan_limit(sql_query))
+    assert plan["violations"]
+    assert guard.settle(sql_query, plan) == (sql_query, "kept existing LIMIT")
+    assert guard.settle("SELECT * FROM orders", guard.analyze(FULL_SCAN)) == (
+        "SELECT * FROM orders\nLIMIT 1000", "added LIMIT 1000"
+    )
+
+
+def test_other_actions_leave_flagged_queries_to_the_caller():
+    guard = CostGuard(max_scan_rows=1_000_000, action="reject")
+    plan = guard.analyze(FULL_SCAN)
+    assert guard.settle("SELECT * FROM orders", plan) == ("SELECT * FROM orders", None)
+
+
+def test_capped_query_on_a_huge_table_runs():
+    guard = CostGuard(max_estimated_rows=10_000_000, max_scan_rows=1_000_000, action="reject",
+                      huge_table_rows=10_000_000)
+    sql_query, action = guard.cap_huge_tables("SELECT * FROM orders ORDER BY created_at", {"orders": 20_000_000})
+    assert sql_query == "SELECT * FROM orders ORDER BY created_at\nLIMIT 1000"
+    assert action == "added LIMIT 1000 (huge tables: orders)"
+
+    huge_scan = {"query_block": {"table": {"table_name": "orders", "access_type": "ALL",
+                                           "rows_examined_per_scan": 20_000_000}}}
+    plan = guard.analyze(huge_scan, row_limit=scan_limit(sql_query))
+    plan["action"] = action
+    assert plan["violations"]
+    assert guard.settle(sql_query, plan, capped=True) == (sql_query, action)
+
+
+def test_aggregates_and_small_tables_are_not_capped():
+    guard = CostGuard(huge_table_rows=1000)
+    assert guard.cap_huge_tables("SELECT COUNT(*) FROM orders", {"orders": 5000}) == ("SELECT COUNT(*) FROM orders", None)
+    assert guard.cap_huge_tables("SELECT * FROM users", {"orders": 5000, "users": 10}) == ("SELECT * FROM users", None)
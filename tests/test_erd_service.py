@@ -0,0 +1,34 @@
+import pytest
+
+pytest.importorskip("graphviz")
+from erd_service import ErdService
+
+
+class CountingErdService(ErdService):
+    """Serves a fixed catalog and counts how often it is read"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.loads = 0
+
+    def load_metadata(self, engine, schema_name):
+        self.loads += 1
+        return [("orders", "id", "int")], []
+
+
+def test_catalog_is_read_once_per_ttl_and_again_after_invalidate(tmp_path):
+    service = CountingErdService(cache_dir=str(tmp_path), metadata_ttl=300)
+    first = service._current(None, "shop")
+    assert service._current(None, "shop") == first
+    assert service.loads == 1
+
+    service.invalidate("shop")
+    service._current(None, "shop")
+    assert service.loads == 2
+
+
+def test_expired_catalog_is_reloaded(tmp_path):
+    service = CountingErdService(cache_dir=str(tmp_path), metadata_ttl=0)
+    service._current(None, "shop")
+    service._current(None, "shop")
+    assert service.loads == 2
@@ -0,0 +1,59 @@
+import pandas as pd
+from intent_matcher import IntentMatcher, name_variants
+
+TABLES = [
+    {"table": "customers", "description": "", "columns": [
+        {"name": "id"}, {"name": "name"}, {"name": "email", "description": "Email address"}, {"name": "revenue"}
+    ]},
+    {"table": "order_items", "description": "", "columns": [{"name": "order_id"}, {"name": "quantity"}]},
+    {"table": "categories", "description": "", "columns": [{"name": "label"}]},
+]
+
+matcher = IntentMatcher(TABLES, schema_name="shop")
+
+
+def test_name_variants_cover_spacing_and_number():
+    assert {"order_items", "order items", "order item"} <= name_variants("order_items")
+    assert {"category", "categories"} <= name_variants("categories")
+
+
+def test_count_questions():
+    intent = matcher.match("How many customers are there?")
+    assert intent["intent"] == "count"
+    assert intent["sql"] == "SELECT COUNT(*) AS row_count FROM `customers`"
+    assert matcher.match("number of rows in the order items table")["table"] == "order_items"
+
+
+def test_first_rows_with_columns():
+    intent = matcher.match("show me the first 5 names and email addresses of customers")
+    assert intent["sql"] == "SELECT `name`, `email` FROM `customers` LIMIT 5"
+    assert matcher.match("show 3 rows from categories")["sql"] == "SELECT * FROM `categories` LIMIT 3"
+    assert matcher.match("list some customers")["limit"] == 10
+
+
+def test_ranking_questions_go_to_the_llm():
+    assert matcher.match("show top 10 customers") is None
+    assert matcher.match("show me the top 5 customers") is None
+    assert matcher.match("list the 10 latest order items") is None
+    assert matcher.match("show the 3 biggest customers") is None
+    assert matcher.match("show first 5 customers with the highest revenue") is None
+
+
+def test_unknown_or_partial_matches_go_to_the_llm():
+    assert matcher.match("how many customers bought shoes") is None
+    assert matcher.match("show first 5 phone numbers of customers") is None
+    assert matcher.match("show customers") is None
+
+
+def test_columns_question_uses_information_schema():
+    intent = matcher.match("describe the customers table")
+    assert intent["intent"] == "columns"
+    assert "TABLE_SCHEMA = 'shop' AND TABLE_NAME = 'customers'" in intent["sql"]
+
+
+def test_answers():
+    count = matcher.match("how many categories")
+    assert matcher.answer(count, pd.DataFrame({"row_count": [1]})) == "The categories table has 1 row."
+    rows = matcher.match("show first 2 customers")
+    assert matcher.answer(rows, pd.DataFrame({"id": [1, 2]})) == "Here are the first 2 rows of customers."
+    assert matcher.answer(rows, pd.DataFrame({"id": []})) == "The customers table is empty."
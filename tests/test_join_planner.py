@@ -0,0 +1,63 @@
+from join_planner import JoinPlanner
+from schema_graph import SchemaGraph
+
+COLUMNS = [
+    ("customers", "id", "int"),
+    ("orders", "id", "int"), ("orders", "customer_id", "int"),
+    ("order_items", "order_id", "int"), ("order_items", "line_no", "int"), ("order_items", "product_id", "int"),
+    ("shipments", "order_id", "int"), ("shipments", "line_no", "int"),
+    ("products", "id", "int"),
+    ("suppliers", "id", "int"),
+]
+RELATIONSHIPS = [
+    ("orders", "customer_id", "customers", "id", "fk_orders_customer"),
+    ("order_items", "order_id", "orders", "id", "fk_items_order"),
+    ("order_items", "product_id", "products", "id", "fk_items_product"),
+    ("shipments", "order_id", "order_items", "order_id", "fk_shipments_item"),
+    ("shipments", "line_no", "order_items", "line_no", "fk_shipments_item"),
+]
+
+
+def planner(max_hops=3):
+    return JoinPlanner(SchemaGraph(COLUMNS, RELATIONSHIPS), max_hops=max_hops)
+
+
+def test_composite_foreign_key_is_one_edge_with_every_column_pair():
+    graph = SchemaGraph(COLUMNS, RELATIONSHIPS)
+    assert graph.adjacency["shipments"]["order_items"] == [(
+        ("shipments", "order_id", "order_items", "order_id"),
+        ("shipments", "line_no", "order_items", "line_no"),
+    )]
+    assert len(graph.edges) == 5 and all(len(edge) == 4 for edge in graph.edges)
+
+
+def test_skeleton_joins_on_every_column_of_a_composite_key():
+    join_planner = planner()
+    plan = join_planner.connect(["order_items", "shipments"])
+    assert join_planner.skeleton(plan) == (
+        "FROM order_items\n"
+        "JOIN shipments ON shipments.order_id = order_items.order_id AND shipments.line_no = order_items.line_no"
+    )
+
+
+def test_bridge_tables_are_added_along_the_shortest_path():
+    join_planner = planner()
+    plan = join_planner.connect(["customers", "products"])
+    assert plan["tables"] == ["customers", "orders", "order_items", "products"]
+    assert plan["bridges"] == ["orders", "order_items"]
+    assert join_planner.skeleton(plan) == (
+        "FROM customers\n"
+        "JOIN orders ON orders.customer_id = customers.id\n"
+        "JOIN order_items ON order_items.order_id = orders.id\n"
+        "JOIN products ON order_items.product_id = products.id"
+    )
+
+
+def test_unconnected_and_distant_tables_are_reported():
+    assert planner().connect(["customers", "suppliers"])["unreachable"] == ["suppliers"]
+    assert planner(max_hops=1).connect(["customers", "products"])["unreachable"] == ["products"]
+
+
+def test_relationships_without_constraint_names_stay_single_column_keys():
+    graph = SchemaGraph(COLUMNS, [edge[:4] for edge in RELATIONSHIPS])
+    assert len(graph.adjacency["shipments"]["order_items"]) == 2
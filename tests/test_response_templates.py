@@ -0,0 +1,70 @@
+from datetime import date
+from decimal import Decimal
+import numpy as np
+import pandas as pd
+from response_templates import ResponseTemplates, is_identifier_column
+
+templates = ResponseTemplates()
+
+
+def test_large_integers_keep_every_digit():
+    assert templates.format_value(1234567890123456789) == "1,234,567,890,123,456,789"
+    assert templates.format_value(np.int64(1234567890123456789)) == "1,234,567,890,123,456,789"
+    assert templates.format_value(Decimal("1234567890123456789")) == "1,234,567,890,123,456,789"
+
+
+def test_identifier_year_and_code_columns_are_not_grouped():
+    assert templates.format_value(1234567890123456789, "order_id") == "1234567890123456789"
+    assert templates.format_value(np.int64(2023), "year") == "2023"
+    assert templates.format_value(2023, "YEAR(order_date)") == "2023"
+    assert templates.format_value(10115.0, "postal_code") == "10115"
+    assert templates.format_value(48213, "customerId") == "48213"
+
+
+def test_identifier_column_detection():
+    assert is_identifier_column("id")
+    assert is_identifier_column("invoice_number")
+    assert is_identifier_column("fiscal_year_start")
+    assert not is_identifier_column("amount")
+    assert not is_identifier_column("paid")
+    assert not is_identifier_column("COUNT(*)")
+    assert not is_identifier_column(None)
+
+
+def test_real_numbers_use_two_decimals():
+    assert templates.format_value(1234.5678) == "1,234.57"
+    assert templates.format_value(np.float32(2.5)) == "2.50"
+    assert templates.format_value(Decimal("19.999")) == "20.00"
+    assert templates.format_value(1500.0) == "1,500"
+    assert templates.format_value(0.012345) == "0.01235"
+    assert templates.format_value(Decimal("0.125")) == "0.125"
+
+
+def test_other_values():
+    assert templates.format_value(None) == "no value"
+    assert templates.format_value(float("nan")) == "no value"
+    assert templates.format_value(np.bool_(True)) == "yes"
+    assert templates.format_value(False) == "no"
+    assert templates.format_value(date(2024, 3, 5)) == "March 5, 2024"
+    assert templates.format_value(pd.Timestamp("2024-03-05 14:30")) == "March 5, 2024 14:30"
+
+
+def test_render_single_value_and_row():
+    count = pd.DataFrame({"COUNT(*)": [np.int64(12345)]})
+    assert templates.render("how many?", "SELECT COUNT(*) FROM orders", count) == "The number of orders is 12,345."
+
+    row = pd.DataFrame({"customer_id": [1001], "signup_year": [2021], "total": [1234.5]})
+    assert templates.render("q", "SELECT ...", row) == (
+        "Here is the matching row: customer id: 1001; signup year: 2021; total: 1,234.50."
+    )
+
+
+def test_render_short_list_and_empty_result():
+    years = pd.DataFrame({"year": [2021, 2022, 2023]})
+    assert templates.render("q", "SELECT ...", years) == "Found 3 results (year): 2021, 2022 and 2023."
+    assert templates.render(" which? ", "SELECT ...", years.iloc[0:0]) == 'No matching rows were found for "which?".'
+
+
+def test_render_leaves_large_results_to_the_llm():
+    assert templates.render("q", "SELECT ...", pd.DataFrame({"a": range(20), "b": range(20)})) is None
+    assert templates.render("q", "SELECT ...", "not a frame") is None
@@ -0,0 +1,45 @@
+import pandas as pd
+from result_summarizer import ResultSummarizer
+
+
+def test_duplicate_column_names_are_summarized_separately():
+    df = pd.DataFrame([[i, i * 2, f"name-{i % 3}", f"city-{i % 2}"] for i in range(100)],
+                      columns=["id", "id", "name", "name"])
+    summary = ResultSummarizer().summarize(df)
+    assert "- id: min=0, max=99" in summary
+    assert "- id_2: min=0, max=198" in summary
+    assert "- name: 3 distinct values" in summary
+    assert "- name_2: 2 distinct values" in summary
+
+
+def test_unhashable_values_are_counted_as_text():
+    df = pd.DataFrame({"tags": [["a", "b"], ["a"], ["a", "b"], None]})
+    summary = ResultSummarizer().summarize(df)
+    assert "- tags: 2 distinct values; top: ['a', 'b'] (2), ['a'] (1)" in summary
+
+
+def test_summary_stays_within_budget():
+    df = pd.DataFrame({f"col_{i}": range(1000) for i in range(50)})
+    summarizer = ResultSummarizer(token_budget=300)
+    summary = summarizer.summarize(df)
+    assert "Row count: 1000" in summary
+    assert "(remaining column statistics omitted)" in summary
+    assert summarizer._tokens(summary) <= 300
+
+
+def test_arrow_decimal_and_date_columns_get_numeric_and_date_stats():
+    import datetime
+    from decimal import Decimal
+    import pyarrow as pa
+    df = pd.DataFrame({
+        "quantity": pd.array(list(range(60)), dtype=pd.ArrowDtype(pa.int64())),
+        "price": pd.array([Decimal(f"{i}.50") for i in range(60)], dtype=pd.ArrowDtype(pa.decimal128(10, 2))),
+        "order_date": pd.array([datetime.date(2024, 1, 1) + datetime.timedelta(days=i) for i in range(60)],
+                               dtype=pd.ArrowDtype(pa.date32())),
+        "active": pd.array([i % 2 == 0 for i in range(60)], dtype=pd.ArrowDtype(pa.bool_())),
+    })
+    summary = ResultSummarizer().summarize(df)
+    assert "- quantity: min=0, max=59, mean=29.5, nulls=0" in summary
+    assert "- price: min=0.5, max=59.5, mean=30, nulls=0" in summary
+    assert "- order_date: earliest=2024-01-01, latest=2024-02-29" in summary
+    assert "- active: 2 distinct values" in summary
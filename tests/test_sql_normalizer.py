@@ -0,0 +1,78 @@
+from decimal import Decimal
+from sql_normalizer import normalize_sql, sql_fingerprint
+
+
+def test_line_comment_does_not_swallow_following_clauses():
+    shape, params = normalize_sql(
+        "SELECT orders.id FROM orders -- unshipped only\nWHERE orders.shipped_date IS NULL"
+    )
+    assert shape == "SELECT orders.id FROM orders WHERE orders.shipped_date IS NULL"
+    assert params == []
+
+
+def test_hash_comment_is_dropped_and_literals_after_it_are_lifted():
+    shape, params = normalize_sql("SELECT * FROM t # note\nWHERE a = 5")
+    assert shape == "SELECT * FROM t WHERE a = ?"
+    assert params == [5]
+
+
+def test_comment_at_end_of_statement():
+    shape, params = normalize_sql("SELECT * FROM t WHERE a = 'x' -- trailing")
+    assert shape == "SELECT * FROM t WHERE a = ?"
+    assert params == ["x"]
+
+
+def test_double_dash_without_space_is_not_a_comment():
+    shape, params = normalize_sql("SELECT 5--3")
+    assert shape == "SELECT ?--?"
+    assert params == [5, 3]
+
+
+def test_block_comments_and_hints_are_kept():
+    shape, params = normalize_sql("SELECT /*+ MAX_EXECUTION_TIME(1000) */ a FROM t /* keep\nme */ WHERE b = 2")
+    assert shape == "SELECT /*+ MAX_EXECUTION_TIME(1000) */ a FROM t /* keep\nme */ WHERE b = ?"
+    assert params == [2]
+
+
+def test_comment_markers_inside_strings_are_literals():
+    shape, params = normalize_sql("SELECT * FROM t WHERE note = '-- not a comment' AND tag = '#x'")
+    assert shape == "SELECT * FROM t WHERE note = ? AND tag = ?"
+    assert params == ["-- not a comment", "#x"]
+
+
+def test_quoted_strings_with_escapes_and_doubled_quotes():
+    shape, params = normalize_sql("SELECT * FROM t WHERE a = 'O''Brien' AND b = \"say \\\"hi\\\"\" AND c = 'line\\nbreak'")
+    assert shape == "SELECT * FROM t WHERE a = ? AND b = ? AND c = ?"
+    assert params == ["O'Brien", 'say "hi"', "line\nbreak"]
+
+
+def test_identifiers_typed_and_prefixed_literals_stay_in_place():
+    shape, params = normalize_sql(
+        "SELECT `order id` FROM t WHERE d >= DATE '2024-01-01' AND h = X'1F' AND n = N'abc' AND m = 0x1F"
+    )
+    assert shape == "SELECT `order id` FROM t WHERE d >= DATE '2024-01-01' AND h = X'1F' AND n = N'abc' AND m = 0x1F"
+    assert params == []
+
+
+def test_numeric_edge_cases():
+    shape, params = normalize_sql("SELECT * FROM t WHERE a = .5 AND b = 1.25 AND c = 3e2 AND d = 1.5E-3 AND e = 7")
+    assert shape == "SELECT * FROM t WHERE a = ? AND b = ? AND c = ? AND d = ? AND e = ?"
+    assert params == [Decimal("0.5"), Decimal("1.25"), 300.0, 0.0015, 7]
+
+
+def test_digits_after_qualifier_and_in_identifiers_are_not_literals():
+    shape, params = normalize_sql("SELECT t.1st_quarter, `t`.col FROM t WHERE q1 = 1")
+    assert shape == "SELECT t.1st_quarter, `t`.col FROM t WHERE q1 = ?"
+    assert params == [1]
+
+
+def test_order_and_group_by_positions_are_kept():
+    shape, params = normalize_sql("SELECT a, COUNT(*) FROM t WHERE b > 10 GROUP BY 1 ORDER BY 2 DESC LIMIT 5")
+    assert shape == "SELECT a, COUNT(*) FROM t WHERE b > ? GROUP BY 1 ORDER BY 2 DESC LIMIT ?"
+    assert params == [10, 5]
+
+
+def test_fingerprint_ignores_literals_whitespace_and_line_comments():
+    first = sql_fingerprint("SELECT * FROM t WHERE a = 1;")
+    assert first == sql_fingerprint("SELECT *\n  FROM t -- any value\n WHERE a = 42")
+    assert first != sql_fingerprint("SELECT * FROM t WHERE b = 1")
@@ -0,0 +1,50 @@
+from value_index import ValueIndex, normalize_value, trigrams
+
+VALUES = [
+    ["Bavaria", "customers", "state"],
+    ["Baden-Württemberg", "customers", "state"],
+    ["New York", "stores", "city"],
+    ["York", "stores", "city"],
+    ["shipped", "orders", "status"],
+    ["Shipped", "returns", "status"],
+]
+
+index = ValueIndex(VALUES)
+
+
+def test_normalization_ignores_case_accents_and_spacing():
+    assert normalize_value("  Baden-WÜRTTEMBERG ") == "baden-wurttemberg"
+    assert trigrams("ab") == {"  a", " ab", "ab "}
+
+
+def test_exact_lookup_returns_every_column_holding_the_value():
+    matches = index.lookup("SHIPPED")
+    assert {(match["table"], match["value"]) for match in matches} == {("orders", "shipped"), ("returns", "Shipped")}
+    assert all(match["score"] == 1.0 for match in matches)
+
+
+def test_fuzzy_lookup_tolerates_typos_and_missing_accents():
+    assert index.lookup("bavarria")[0]["value"] == "Bavaria"
+    assert index.lookup("bavria") == []
+    assert index.lookup("bavria", min_similarity=0.6)[0]["value"] == "Bavaria"
+    assert index.lookup("baden wurttemberg")[0]["value"] == "Baden-Württemberg"
+    assert index.lookup("texas") == []
+
+
+def test_resolve_prefers_longer_phrases():
+    matches = index.resolve("how many stores are in new york")
+    assert [(match["value"], match["score"]) for match in matches] == [("New York", 1.0)]
+
+
+def test_resolve_uses_quoted_literals_and_skips_stopwords_and_numbers():
+    matches = index.resolve("list customers in 'bavaria' with more than 100 orders")
+    assert [(match["table"], match["column"], match["value"]) for match in matches] == [("customers", "state", "Bavaria")]
+    assert index.resolve("show all of the 2024 data") == []
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = tmp_path / "values.json"
+    index.save(str(path))
+    loaded = ValueIndex.load(str(path))
+    assert loaded.values == VALUES
+    assert ValueIndex.load(str(tmp_path / "missing.json")) is None